@@ -4,12 +4,17 @@
 # standard library.
 import sys
 
+from scipy.special import ndtr
 import statsmodels.api as sm
 import numpy as np
 
 
 # project library
 from grmpy.clsMeta import MetaCls
+import grmpy.tools.msc as msc
+
+# module variables
+PROBIT = sm.families.Binomial(sm.families.links.Probit())
 
 
 class ModelCls(MetaCls):
@@ -25,11 +30,14 @@ class ModelCls(MetaCls):
         self.attr['X_ex_ante'] = None
         self.attr['G'] = None
         self.attr['Z'] = None
+        self.attr['C'] = None
+        self.attr['W'] = None
         self.attr['num_covars_excl_bene_ex_post'] = None
         self.attr['num_covars_excl_bene_ex_ante'] = None
         self.attr['num_covars_excl_cost'] = None
 
         # Endogenous objects
+        self.attr['num_obs'] = None
         self.attr['P'] = None
         self.attr['x_ex_post_eval'] = None
         self.attr['x_ex_ante_eval'] = None
@@ -38,6 +46,8 @@ class ModelCls(MetaCls):
         self.attr['common_support'] = None
         self.attr['without_prediction'] = None
         self.attr['surp_estimation'] = None
+        self.attr['partition'] = None
+        self.attr['partition_single'] = None
 
         # Optional arguments
         self.attr['algorithm'] = None
@@ -50,10 +60,86 @@ class ModelCls(MetaCls):
         self.attr['version'] = None
         self.attr['hessian'] = None
         self.attr['alpha'] = None
+        self.attr['workers'] = None
+        self.attr['precision'] = None
+        self.attr['chunk'] = None
+        self.attr['stages'] = None
+        self.attr['stage_tol'] = None
+        self.attr['multistart'] = None
 
         # Status
         self.is_locked = False
 
+    def get_blocks(self, subgroup, precision='double'):
+        """ Iterate over the data of the treated or untreated agents in
+            chunks of rows. Without a chunk size, the whole block is
+            returned at once.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+        assert (subgroup in ['treated', 'untreated'])
+        assert (precision in ['double', 'single'])
+
+        # Distribute attributes
+        if precision == 'double':
+            block = self.attr['partition'][subgroup]
+        else:
+            block = self.attr['partition_single'][subgroup]
+
+        chunk = self.attr['chunk']
+
+        num_agents = block['idx'].shape[0]
+
+        if chunk is None:
+            chunk = max(num_agents, 1)
+
+        # Iterate over chunks
+        for start in range(0, num_agents, chunk):
+
+            yield dict((type_, block[type_][start:start + chunk])
+                       for type_ in block.keys())
+
+    def get_subsample(self, fraction):
+        """ Draw a random subsample of the agents, which is held in memory.
+            The subsample inherits the options and the common support of the
+            full sample.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+        assert (0.0 < fraction < 1.0)
+
+        # Distribute attributes
+        num_agents = self.attr['num_agents']
+
+        # Draw agents
+        num_subsample = max(int(fraction * num_agents), 1)
+
+        idx = np.random.choice(num_agents, size=num_subsample, replace=False)
+
+        idx = np.sort(idx)
+
+        # Construct subsample
+        sub_obj = ModelCls()
+
+        for key_ in ['Y', 'D', 'X_ex_post', 'X_ex_ante', 'G', 'Z', 'C', 'W',
+                     'P']:
+            if self.attr[key_] is not None:
+                sub_obj.set_attr(key_, np.array(self.attr[key_][idx]))
+
+        for key_ in ['num_covars_excl_bene_ex_post',
+                     'num_covars_excl_bene_ex_ante', 'num_covars_excl_cost',
+                     'common_support', 'algorithm', 'epsilon', 'differences',
+                     'gtol', 'maxiter', 'with_asymptotics', 'num_draws',
+                     'version', 'hessian', 'alpha', 'workers', 'multistart']:
+            sub_obj.set_attr(key_, self.attr[key_])
+
+        sub_obj.set_attr('precision', 'double')
+
+        sub_obj.lock()
+
+        # Finishing
+        return sub_obj
+
     """ Private class methods.
     """
 
@@ -63,14 +149,27 @@ class ModelCls(MetaCls):
         # Number of agents 
         self.attr['num_agents'] = self.attr['X_ex_post'].shape[0]
 
-        # Evaluation points 
-        self.attr['x_ex_post_eval'] = self.attr['X_ex_post'].mean(axis=0)
-        self.attr['x_ex_ante_eval'] = self.attr['X_ex_ante'].mean(axis=0)
-        self.attr['z_eval'] = self.attr['Z'].mean(axis=0)
-        self.attr['c_eval'] = self.attr['G'].mean(axis=0)
+        # Frequency weights, each agent represents a single observation
+        # unless duplicate agents are compressed.
+        if self.attr['W'] is None:
+            self.attr['W'] = np.ones(self.attr['num_agents'])
+
+        self.attr['num_obs'] = int(round(self.attr['W'].sum()))
+
+        # Evaluation points, the weighted averages are computed without a
+        # temporary copy of the covariates.
+        w = self.attr['W'] / self.attr['W'].sum()
+
+        self.attr['x_ex_post_eval'] = np.dot(w, self.attr['X_ex_post'])
+        self.attr['x_ex_ante_eval'] = np.dot(w, self.attr['X_ex_ante'])
+        self.attr['z_eval'] = np.dot(w, self.attr['Z'])
+        self.attr['c_eval'] = np.dot(w, self.attr['G'])
 
         # Common Support 
-        self.attr['P'], self.attr['common_support'] = self._get_common_support()
+        if self.attr['common_support'] is None:
+            with msc.stage('common_support'):
+                self.attr['P'], self.attr['common_support'] = \
+                    self._get_common_support()
 
         # Prediction 
         self.attr['without_prediction'] = \
@@ -80,6 +179,147 @@ class ModelCls(MetaCls):
         self.attr['surp_estimation'] = \
             (self.attr['num_covars_excl_bene_ex_ante'] > 0)
 
+        # Partition by treatment status
+        self.attr['partition'] = self._get_partition()
+
+        if self.attr['precision'] == 'mixed':
+            self.attr['partition_single'] = self._get_partition_single()
+
+    def _get_partition(self):
+        """ Split the data into contiguous blocks of treated and untreated
+            agents. The position of the agents in the original dataset is
+            retained to restore their order if required.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+
+        # Distribute attributes
+        d = self.attr['D']
+
+        chunk = self.attr['chunk']
+
+        # Out-of-core data
+        if chunk is not None:
+            return self._get_partition_chunks()
+
+        # Construct blocks
+        rslt = dict()
+
+        for subgroup in ['treated', 'untreated']:
+
+            if subgroup == 'treated':
+                idx = np.flatnonzero(d == 1)
+            else:
+                idx = np.flatnonzero(d == 0)
+
+            rslt[subgroup] = dict()
+
+            rslt[subgroup]['idx'] = idx
+
+            for type_ in ['Y', 'X_ex_post', 'Z', 'W']:
+                rslt[subgroup][type_] = np.ascontiguousarray(
+                    self.attr[type_][idx])
+
+        # Finishing
+        return rslt
+
+    def _get_partition_chunks(self):
+        """ Split the data into blocks of treated and untreated agents in
+            chunks of rows. The blocks are written to the binary store.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+
+        # Distribute attributes
+        num_agents = self.attr['num_agents']
+
+        chunk = self.attr['chunk']
+
+        # Auxiliary function
+        def _split_chunks():
+            """ Split each chunk of rows by treatment status.
+            """
+            for start in range(0, num_agents, chunk):
+
+                d = self.attr['D'][start:start + chunk]
+
+                rslt = dict()
+
+                for subgroup in ['treated', 'untreated']:
+
+                    if subgroup == 'treated':
+                        is_subgroup = (d == 1)
+                    else:
+                        is_subgroup = (d == 0)
+
+                    rslt[subgroup + '.idx'] = \
+                        start + np.flatnonzero(is_subgroup)
+
+                    for type_ in ['Y', 'X_ex_post', 'Z', 'W']:
+                        rslt[subgroup + '.' + type_] = \
+                            self.attr[type_][start:start + chunk][is_subgroup]
+
+                yield rslt
+
+        # Construct blocks
+        stores = msc.create_stores(_split_chunks())
+
+        rslt = dict()
+
+        for subgroup in ['treated', 'untreated']:
+
+            rslt[subgroup] = dict()
+
+            for type_ in ['idx', 'Y', 'X_ex_post', 'Z', 'W']:
+                rslt[subgroup][type_] = stores[subgroup + '.' + type_]
+
+        # Finishing
+        return rslt
+
+    def _get_partition_single(self):
+        """ Construct single-precision copies of the blocks of treated and
+            untreated agents for the early iterations of the estimation.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+
+        # Distribute attributes
+        partition = self.attr['partition']
+
+        chunk = self.attr['chunk']
+
+        # Construct blocks
+        rslt = dict()
+
+        for subgroup in ['treated', 'untreated']:
+
+            block = partition[subgroup]
+
+            if chunk is None:
+                rslt[subgroup] = dict()
+                for type_ in ['Y', 'X_ex_post', 'Z']:
+                    rslt[subgroup][type_] = block[type_].astype('float32')
+
+            else:
+                labels = dict((type_, 'single.' + subgroup + '.' + type_)
+                              for type_ in ['Y', 'X_ex_post', 'Z'])
+
+                chunks = (dict((labels[type_], chunk_[type_].astype('float32'))
+                               for type_ in labels.keys())
+                          for chunk_ in self.get_blocks(subgroup))
+
+                stores = msc.create_stores(chunks)
+
+                rslt[subgroup] = dict((type_, stores[labels[type_]])
+                                      for type_ in labels.keys())
+
+            rslt[subgroup]['idx'] = block['idx']
+
+            rslt[subgroup]['W'] = block['W']
+
+        # Finishing
+        return rslt
+
     def _get_common_support(self):
         """ Calculate common support.
         """
@@ -89,13 +329,22 @@ class ModelCls(MetaCls):
         # Distribute attributes
         d = self.get_attr('D')
         z = self.get_attr('Z')
-
-        # Probit estimation
-        stdout_current = sys.stdout
-        sys.stdout = open('/dev/null', 'w')
-        rslt = sm.Probit(d, z)
-        p = rslt.predict(rslt.fit().params)
-        sys.stdout = stdout_current
+        w = self.get_attr('W')
+
+        chunk = self.attr['chunk']
+
+        # Probit estimation, weighted by the frequency of the agents. The
+        # out-of-core data is processed in chunks of rows.
+        if chunk is None:
+            stdout_current = sys.stdout
+            sys.stdout = open('/dev/null', 'w')
+            rslt = sm.GLM(d, z, family=PROBIT, freq_weights=w)
+            p = rslt.predict(rslt.fit().params)
+            sys.stdout = stdout_current
+        else:
+            coeffs = msc.fit_probit(d, z, w, chunk)
+            p = np.concatenate([ndtr(np.dot(z[start:start + chunk], coeffs))
+                                for start in range(0, len(d), chunk)])
 
         # Determine common support
         lower_bound = np.round(max(min(p[d == 1]), min(p[d == 0])), decimals=2)
@@ -113,10 +362,24 @@ class ModelCls(MetaCls):
         # Outcome and treatment variable
         for type_ in ['Y', 'D']:
             assert (isinstance(self.attr[type_], np.ndarray))
-            assert (np.all(np.isfinite(self.attr[type_])))
+            assert (self._is_finite(self.attr[type_]))
             assert (self.attr[type_].dtype == 'float')
             assert (self.attr[type_].shape == (self.attr['num_agents'],))
 
+        # Frequency weights
+        assert (isinstance(self.attr['W'], np.ndarray))
+        assert (self.attr['W'].shape == (self.attr['num_agents'],))
+        assert (np.all(self.attr['W'] >= 1.0))
+
+        assert (isinstance(self.attr['num_obs'], int))
+        assert (self.attr['num_obs'] >= self.attr['num_agents'])
+
+        # Cluster identifiers
+        if self.attr['C'] is not None:
+            assert (isinstance(self.attr['C'], np.ndarray))
+            assert (self._is_finite(self.attr['C']))
+            assert (self.attr['C'].shape == (self.attr['num_agents'],))
+
         # Prediction step
         assert (self.attr['without_prediction'] in [True, False])
 
@@ -134,7 +397,7 @@ class ModelCls(MetaCls):
         for type_ in ['X_ex_post', 'X_ex_ante', 'G', 'Z']:
             if self.attr[type_] is not None:
                 assert (isinstance(self.attr[type_], np.ndarray))
-                assert (np.all(np.isfinite(self.attr[type_])))
+                assert (self._is_finite(self.attr[type_]))
                 assert (self.attr[type_].ndim == 2)
 
         # Propensity score
@@ -153,18 +416,40 @@ class ModelCls(MetaCls):
             assert (np.all(np.isfinite(self.attr[type_])))
             assert (self.attr[type_].ndim == 1)
 
+        # Partition
+        assert (isinstance(self.attr['partition'], dict))
+
+        num_agents = 0
+
+        for subgroup in ['treated', 'untreated']:
+            block = self.attr['partition'][subgroup]
+            num_agents += len(block['idx'])
+            for type_ in ['Y', 'X_ex_post', 'Z', 'W']:
+                assert (block[type_].flags['C_CONTIGUOUS'])
+                assert (block[type_].shape[0] == len(block['idx']))
+
+        assert (num_agents == self.attr['num_agents'])
+
+        if self.attr['partition_single'] is not None:
+            for subgroup in ['treated', 'untreated']:
+                block = self.attr['partition_single'][subgroup]
+                for type_ in ['Y', 'X_ex_post', 'Z']:
+                    assert (block[type_].dtype == 'float32')
+                    assert (block[type_].shape[0] == len(block['idx']))
+
         # Common support 
         assert (isinstance(self.attr['common_support'], tuple))
         assert (len(self.attr['common_support']) == 2)
 
         # version
-        assert (self.attr['version'] in ['fast', 'slow'])
+        assert (self.attr['version'] in ['fast', 'slow', 'log', 'jit'])
 
         # with_asymptotics 
         assert (self.attr['with_asymptotics'] in [True, False])
 
         # Algorithm
-        assert (self.attr['algorithm'] in ['bfgs', 'powell'])
+        assert (self.attr['algorithm'] in ['bfgs', 'lbfgsb', 'trust-ncg',
+                                          'powell'])
 
         # Maximum iteration 
         if self.attr['maxiter'] is not None:
@@ -184,10 +469,55 @@ class ModelCls(MetaCls):
         assert (self.attr['epsilon'] > 0.00)
 
         # differences
-        assert (self.attr['differences'] in ['one-sided', 'two-sided'])
+        assert (self.attr['differences'] in ['one-sided', 'two-sided',
+                                           'analytic'])
 
         # hessian
-        assert (self.attr['hessian'] in ['bfgs', 'numdiff'])
+        assert (self.attr['hessian'] in ['bfgs', 'numdiff', 'opg'])
+
+        if self.attr['algorithm'] in ['trust-ncg', 'powell']:
+            assert (self.attr['hessian'] in ['numdiff', 'opg'])
+
+        # workers
+        assert (isinstance(self.attr['workers'], int))
+        assert (self.attr['workers'] > 0)
+
+        # multistart
+        assert (isinstance(self.attr['multistart'], int))
+        assert (self.attr['multistart'] > 0)
+
+        # precision
+        assert (self.attr['precision'] in ['double', 'mixed'])
+
+        if self.attr['precision'] == 'mixed':
+            assert (self.attr['partition_single'] is not None)
+
+        # chunk
+        if self.attr['chunk'] is not None:
+            assert (isinstance(self.attr['chunk'], int))
+            assert (self.attr['chunk'] > 0)
 
-        if self.attr['algorithm'] == 'powell':
-            assert (self.attr['hessian'] == 'numdiff')
+        # stages
+        if self.attr['stages'] is not None:
+            assert (isinstance(self.attr['stages'], list))
+            assert (all(0.0 < stage < 1.0 for stage in self.attr['stages']))
+            assert (isinstance(self.attr['stage_tol'], float))
+            assert (self.attr['stage_tol'] > 0.00)
+
+    def _is_finite(self, array):
+        """ Check that all elements of a data matrix are finite, in chunks
+            of rows if requested.
+        """
+        # Distribute attributes
+        chunk = self.attr['chunk']
+
+        if chunk is None:
+            return np.all(np.isfinite(array))
+
+        # Iterate over chunks
+        for start in range(0, array.shape[0], chunk):
+            if not np.all(np.isfinite(array[start:start + chunk])):
+                return False
+
+        # Finishing
+        return True
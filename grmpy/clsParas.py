@@ -7,6 +7,7 @@ import numpy as np
 # project library
 from grmpy.clsMeta import MetaCls
 from grmpy.clsModel import ModelCls
+import grmpy.tools.msc as msc
 
 
 class ParasCls(MetaCls):
@@ -25,7 +26,35 @@ class ParasCls(MetaCls):
         self.attr['para_objs'] = []
         self.attr['num_paras'] = 0
         self.attr['num_free'] = 0
-        self.attr['factor'] = None
+        self.attr['operator'] = None
+
+        # Parameter values and bounds, with one entry for each parameter. The
+        # missing bounds are NaN.
+        self.attr['values'] = np.array([], dtype='float')
+        self.attr['lower'] = np.array([], dtype='float')
+        self.attr['upper'] = np.array([], dtype='float')
+
+        self.attr['is_free'] = np.array([], dtype='bool')
+        self.attr['has_lower'] = np.array([], dtype='bool')
+        self.attr['has_upper'] = np.array([], dtype='bool')
+        self.attr['has_bounds'] = np.array([], dtype='bool')
+
+        self.attr['free'] = np.array([], dtype='int')
+
+        # Parameter information
+        self.attr['ids'] = []
+        self.attr['cols'] = []
+        self.attr['types'] = []
+        self.attr['subgroups'] = []
+        self.attr['bounds'] = []
+        self.attr['pvalues'] = []
+        self.attr['confis'] = []
+
+        # Positions of the parameters by type and subgroup
+        self.attr['groups'] = dict()
+
+        # Evaluation plan, which is compiled when the class is locked
+        self.attr['plan'] = None
 
         self.attr['num_covars_excl_bene_ex_ante'] = model_obj.get_attr(
             'num_covars_excl_bene_ex_ante')
@@ -38,6 +67,7 @@ class ParasCls(MetaCls):
 
         self.attr['X_ex_ante'] = model_obj.get_attr('X_ex_ante')
         self.attr['X_ex_post'] = model_obj.get_attr('X_ex_post')
+        self.attr['W'] = model_obj.get_attr('W')
 
         self.attr['num_agents'] = model_obj.get_attr('num_agents')
 
@@ -50,7 +80,7 @@ class ParasCls(MetaCls):
     def add_parameter(self, type_, subgroup, value, is_free, bounds, col):
         """ Add parameters to class instance.
         """
-        # Antibugging. 
+        # Antibugging.
         assert (is_free in [True, False])
         assert (len(bounds) == 2)
         assert (type_ in ['outc', 'cost', 'sd', 'rho'])
@@ -68,73 +98,81 @@ class ParasCls(MetaCls):
         # Initialize parameters.
         count = self.attr['num_paras']
 
-        para_obj = _ParaContainer()
+        lower_bound, upper_bound = bounds
 
         if is_free:
-            id_ = self.attr['num_free']
-            para_obj.set_attr('id', id_)
+            self.attr['ids'].append(self.attr['num_free'])
         else:
-            para_obj.set_attr('id', None)
+            self.attr['ids'].append(None)
+
+        self.attr['cols'].append(col)
+        self.attr['types'].append(type_)
+        self.attr['subgroups'].append(subgroup)
+        self.attr['bounds'].append(tuple(bounds))
+        self.attr['pvalues'].append(None)
+        self.attr['confis'].append((None, None))
 
-        para_obj.set_attr('col', col)
-        para_obj.set_attr('count', count)
-        para_obj.set_attr('type', type_)
-        para_obj.set_attr('subgroup', subgroup)
-        para_obj.set_attr('value', value)
-        para_obj.set_attr('is_free', is_free)
-        para_obj.set_attr('bounds', bounds)
-        para_obj.lock()
+        for key_, arg in [('values', value), ('is_free', is_free),
+                          ('lower', np.nan), ('upper', np.nan),
+                          ('has_lower', lower_bound is not None),
+                          ('has_upper', upper_bound is not None),
+                          ('has_bounds', np.any(bounds) is not None)]:
+            self.attr[key_] = np.append(self.attr[key_], arg)
+
+        if lower_bound is not None:
+            self.attr['lower'][count] = lower_bound
+
+        if upper_bound is not None:
+            self.attr['upper'][count] = upper_bound
+
+        # Parameter groups
+        key_ = (type_, subgroup)
+
+        if key_ not in self.attr['groups'].keys():
+            self.attr['groups'][key_] = np.array([], dtype='int')
+
+        self.attr['groups'][key_] = np.append(self.attr['groups'][key_], count)
+
+        self.attr['para_objs'].append(_ParaContainer(self, count))
 
         # Update class attributes.
-        self.attr['para_objs'].append(para_obj)
         self.attr['num_paras'] += 1
 
         if is_free:
             self.attr['num_free'] += 1
 
+        self.attr['free'] = np.flatnonzero(self.attr['is_free'])
+
     def get_parameter(self, count):
-        """ Get a single parameter object identified by its count. It is 
+        """ Get a single parameter object identified by its count. It is
             important to note, that the selection mechanism refers to all
-            parameters not just the true ones. 
+            parameters not just the true ones.
         """
-        # Antibugging 
+        # Antibugging
         assert (self.get_status() is True)
         assert (count < self.get_attr('num_paras'))
 
-        # Algorithm 
-        para_objs = self.get_attr('para_objs')
-
-        for para_obj in para_objs:
-            para_count = para_obj.get_attr('count')
-            if para_count == count:
-                return para_obj
-
-        # Finishing 
-        assert (False is True)
+        # Finishing
+        return self.attr['para_objs'][count]
 
     def get_parameters(self, type_, subgroup, is_obj=False):
         """ Get parameter groups.
         """
-        # Antibugging 
+        # Antibugging
         assert (self._check_request(type_, subgroup, is_obj) is True)
 
-        # Collect request 
+        # Collect request
         rslt_list = []
 
         if type_ in ['outc', 'cost', 'rho', 'sd']:
-            for para_obj in self.attr['para_objs']:
-                if para_obj.get_attr('type') != type_:
-                    continue
-
-                if para_obj.get_attr('subgroup') != subgroup:
-                    continue
+            idx = self.attr['groups'].get((type_, subgroup), [])
 
-                if is_obj:
-                    rslt_list.append(para_obj)
-                else:
-                    rslt_list.append(para_obj.get_attr('value'))
+            if is_obj:
+                rslt_list = [self.attr['para_objs'][count] for count in idx]
+            else:
+                rslt_list = self.attr['values'][idx]
 
-        # Special types: Covariances 
+        # Special types: Covariances
         if type_ == 'cov':
             var_one = subgroup.split(',')[0]
             var_two = subgroup.split(',')[1]
@@ -142,12 +180,12 @@ class ParasCls(MetaCls):
             sd_one = self.get_parameters('sd', var_one)
             sd_two = self.get_parameters('sd', var_two)
 
-            rslt_list.append(rho * sd_one * sd_two)
+            rslt_list = [rho * sd_one * sd_two]
 
-        # Special types: Variances 
+        # Special types: Variances
         if type_ == 'var':
             sd_one = self.get_parameters('sd', subgroup)
-            rslt_list.append(sd_one ** 2)
+            rslt_list = [sd_one ** 2]
 
         if type_ == 'bene':
             assert (subgroup in ['exPost', 'exAnte'])
@@ -165,69 +203,84 @@ class ParasCls(MetaCls):
                 rslt_list = coeffs_bene_ex_ante
 
         if type_ == 'choice':
-            num_covars_excl_cost = self.get_attr('num_covars_excl_cost')
-            num_covar_excl_bene_ex_ante = self.get_attr(
-                'num_covars_excl_bene_ex_ante')
+            rslt_list = self._get_choice(self.attr['values'])
 
-            coeffs_bene_ex_ante = self.get_parameters('bene', 'exAnte')
-            coeffs_cost = self.get_parameters('cost', None)
-
-            coeffs_bene = np.concatenate(
-                (coeffs_bene_ex_ante, np.tile(0.0, num_covars_excl_cost)))
-            coeffs_cost = np.concatenate(
-                (np.tile(0.0, num_covar_excl_bene_ex_ante), coeffs_cost))
-
-            rslt_list = coeffs_bene - coeffs_cost
-
-        # Dealing with objects 
+        # Dealing with objects
         if is_obj and type_ in ['rho', 'sd', 'var', 'cov']:
             return rslt_list[0]
 
-        # Type conversion 
+        if is_obj:
+            return rslt_list
+
+        # Type conversion
         rslt = np.array(rslt_list[:])
 
         if type_ in ['rho', 'sd', 'var', 'cov']:
             rslt = np.array(rslt[0])
 
-        # Quality check 
-        if is_obj is False:
-            assert (isinstance(rslt, np.ndarray))
-            assert (np.all(np.isfinite(rslt)))
+        # Quality check
+        assert (isinstance(rslt, np.ndarray))
+        assert (np.all(np.isfinite(rslt)))
 
         # Finishing.
         return rslt
 
-    def get_values(self, version, which):
-        """ Get all free parameter values.
+    def get_structural(self, values=None):
+        """ Get all structural parameters required for the evaluation of the
+            criterion function at once, using the compiled evaluation plan.
+            For a matrix of internal values of all parameters, the first axis
+            of the structural parameters refers to its rows.
         """
-        # Antibugging  
+        # Antibugging
         assert (self.get_status() is True)
-        assert (self._check_integrity() is True)
-        assert (version in ['external', 'internal'])
-        assert (which in ['free', 'all'])
 
-        # Main algorithm 
-        para_objs = self.attr['para_objs']
+        # Distribute class attributes
+        plan = self.attr['plan']
 
-        rslt = []
+        if values is None:
+            values = self.attr['values']
 
-        for para_obj in para_objs:
+        assert (values.shape[-1] == self.attr['num_paras'])
 
-            is_fixed = (para_obj.get_attr('is_free') is False)
+        # Collect parameters
+        rslt = dict()
 
-            if is_fixed and (which == 'free'):
-                continue
+        rslt['outc_treated'] = values[..., plan['outc_treated']]
+        rslt['outc_untreated'] = values[..., plan['outc_untreated']]
+        rslt['coeffs_cost'] = values[..., plan['cost']]
+        rslt['coeffs_choc'] = self._get_choice(values)
 
-            value = para_obj.get_attr('value')
+        sd_u1, sd_u0, sd_v, rho_u1_v, rho_u0_v = \
+            np.moveaxis(values[..., plan['scalars']], -1, 0)
 
-            if version == 'external':
-                value = self._transform_to_external(para_obj,
-                                                    para_obj.get_attr('value'))
+        rslt['sd_u1'], rslt['sd_u0'], rslt['sd_v'] = sd_u1, sd_u0, sd_v
+        rslt['var_v'] = sd_v ** 2
 
-            rslt.append(value)
+        rslt['rho_u1_v'], rslt['rho_u0_v'] = rho_u1_v, rho_u0_v
 
-        # Type conversion
-        rslt = np.array(rslt)
+        # Quality check
+        for key_ in rslt.keys():
+            assert (np.all(np.isfinite(rslt[key_])))
+
+        # Finishing
+        return rslt
+
+    def get_values(self, version, which):
+        """ Get all free parameter values.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (self._check_integrity() is True)
+        assert (version in ['external', 'internal'])
+        assert (which in ['free', 'all'])
+
+        # Main algorithm
+        idx = self._get_index(which)
+
+        rslt = self.attr['values'][idx]
+
+        if version == 'external':
+            rslt = self._to_external(rslt, idx)
 
         # Quality checks
         assert (isinstance(rslt, np.ndarray))
@@ -242,7 +295,7 @@ class ParasCls(MetaCls):
         # Finishing.
         return rslt
 
-    """ All methods related to updating the parameters. 
+    """ All methods related to updating the parameters.
     """
 
     def update(self, x, version, which):
@@ -264,159 +317,395 @@ class ParasCls(MetaCls):
             assert (x.shape == (self.get_attr('num_free'),))
 
         # Distribute class attributes
-        para_objs = self.get_attr('para_objs')
+        values = self.attr['values']
 
-        counter = 0
+        idx = self._get_index(which)
 
-        for para_obj in para_objs:
+        # Transformation of the bounded parameters
+        if version == 'external':
+            bounded = self.attr['has_bounds'][idx]
 
-            is_fixed = (para_obj.get_attr('is_free') is False)
+            x = x.copy()
 
-            if is_fixed and (which == 'free'):
-                continue
+            x[bounded] = self._to_internal(x[bounded], idx[bounded])
 
-            value = x[counter]
+        # Checks, the values of the fixed parameters remain unchanged.
+        assert (np.all(self.attr['is_free'][idx] | (values[idx] == x)))
 
-            if para_obj.get_attr('has_bounds') and (version == 'external'):
-                value = self._transform_to_internal(para_obj, value)
+        self._check_bounds(values[idx], idx)
 
-            para_obj.set_value(value)
+        # Update
+        values[idx] = x
 
-            counter += 1
-
-        # Finishing 
+        # Finishing
         return True
 
-    def _transform_to_external(self, para_obj, internal_value):
-        """ Transform internal values for external use by maximization 
-            routine.
+    def get_values_batch(self, x):
+        """ Get the internal values of all parameters for each row of a
+            matrix of external values of the free parameters. The values of
+            the fixed parameters are taken from the class instance.
         """
-        # Antibugging 
-        assert (isinstance(para_obj, _ParaContainer))
-        assert (para_obj.get_status() is True)
-        assert (isinstance(internal_value, float))
-        assert (np.isfinite(internal_value))
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(x, np.ndarray))
+        assert (np.all(np.isfinite(x)))
+        assert (x.dtype == 'float')
+        assert (x.ndim == 2)
+        assert (x.shape[1] == self.get_attr('num_free'))
 
-        # Auxiliary objects 
-        lower_bound, upper_bound = para_obj.get_attr('bounds')
+        # Distribute class attributes
+        free = self.attr['free']
 
-        has_lower_bound = (lower_bound is not None)
-        has_upper_bound = (upper_bound is not None)
+        bounded = self.attr['has_bounds'][free]
 
-        # Stabilization
-        internal_value = self._clip_internal_value(para_obj, internal_value)
+        # Initialize container
+        rslt = np.tile(self.attr['values'], (x.shape[0], 1))
 
-        # Upper bound only
-        if (not has_lower_bound) and has_upper_bound:
-            external_value = np.log(upper_bound - internal_value)
+        rslt[:, free] = x
 
-        # Lower bound only
-        elif has_lower_bound and (not has_upper_bound):
-            external_value = np.log(internal_value - lower_bound)
+        rslt[:, free[bounded]] = self._to_internal(x[:, bounded],
+                                                   free[bounded])
 
-        # Upper and lower bounds
-        elif has_lower_bound and has_upper_bound:
-            interval = upper_bound - lower_bound
-            transform = (internal_value - lower_bound) / interval
-            external_value = np.log(transform / (1.0 - transform))
+        # Quality checks
+        assert (np.all(np.isfinite(rslt)))
 
-        # No bounds.
-        else:
-            external_value = internal_value
+        # Finishing
+        return rslt
 
-        # Quality Check.
-        assert (isinstance(external_value, float))
-        assert (np.isfinite(external_value))
+    def get_bounds(self):
+        """ Get the bounds on the external values of the free parameters.
+            The external values of the bounded parameters are only bounded
+            from above by the stabilization of the transformation.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
 
-        # Finishing.
-        return external_value
+        # Distribute class attributes
+        has_bounds = self.attr['has_bounds'][self.attr['free']]
 
-    def _transform_to_internal(self, para_obj, external_value):
-        """ Transform external values to internal para_obj.
+        rslt = []
+
+        for is_bounded in has_bounds:
+
+            if is_bounded:
+                rslt.append((None, 10.0))
+            else:
+                rslt.append((None, None))
+
+        # Quality checks
+        assert (len(rslt) == self.get_attr('num_free'))
+
+        # Finishing
+        return rslt
+
+    def get_jacobian(self, x):
+        """ Get the derivatives of the internal free parameters with respect
+            to their external counterparts.
         """
-        # Antibugging 
-        assert (isinstance(para_obj, _ParaContainer))
-        assert (para_obj.get_status() is True)
-        assert (isinstance(external_value, float))
-        assert (np.isfinite(external_value))
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(x, np.ndarray))
+        assert (np.all(np.isfinite(x)))
+        assert (x.dtype == 'float')
+        assert (x.shape == (self.get_attr('num_free'),))
+
+        # Distribute class attributes
+        free = self.attr['free']
+
+        bounded = self.attr['has_bounds'][free]
+
+        rslt = np.ones(x.shape)
+
+        rslt[bounded] = self._to_derivative(x[bounded], free[bounded])
+
+        # Quality checks
+        assert (np.all(np.isfinite(rslt)))
+        assert (rslt.shape == x.shape)
 
+        # Finishing
+        return rslt
+
+    def _get_index(self, which):
+        """ Get the positions of the requested parameters.
+        """
+        # Antibugging
+        assert (which in ['free', 'all'])
+
+        # Finishing
+        if which == 'free':
+            return self.attr['free']
+
+        return np.arange(self.attr['num_paras'])
+
+    def _to_derivative(self, external_values, idx):
+        """ Derivative of the transformation from external to internal values
+            for the parameters at the positions idx, which refer to the last
+            axis of the external values.
+        """
         # Auxiliary objects
-        lower_bound, upper_bound = para_obj.get_attr('bounds')
-        has_bounds = para_obj.get_attr('has_bounds')
+        lower, upper = self.attr['lower'][idx], self.attr['upper'][idx]
 
-        has_lower_bound = (lower_bound is not None)
-        has_upper_bound = (upper_bound is not None)
+        has_lower = self.attr['has_lower'][idx]
+        has_upper = self.attr['has_upper'][idx]
 
-        # Stabilization
-        if has_bounds:
-            external_value = np.clip(external_value, None, 10)
+        # Derivatives, all cases are evaluated before selecting the relevant
+        # one for each parameter.
+        with np.errstate(over='ignore'):
+            exp_value = np.exp(external_values)
+            exp_neg = np.exp(-external_values)
 
-        # Upper bound only
-        if (not has_lower_bound) and has_upper_bound:
-            internal_value = upper_bound - np.exp(external_value)
+            interval = upper - lower
 
-        # Lower bound only
-        elif has_lower_bound and (not has_upper_bound):
-            internal_value = lower_bound + np.exp(external_value)
+            rslt = np.where(has_lower & has_upper,
+                            interval * exp_neg / (1.0 + exp_neg) ** 2, 1.0)
 
-        # Upper and lower bounds
-        elif has_lower_bound and has_upper_bound:
-            interval = upper_bound - lower_bound
-            internal_value = lower_bound + interval / (
-                1.0 + np.exp(-external_value))
+        rslt = np.where(has_lower & (~ has_upper), exp_value, rslt)
+        rslt = np.where((~ has_lower) & has_upper, -exp_value, rslt)
 
-            # No bounds
-        else:
-            internal_value = external_value
+        # Stabilization, the clipping in _to_internal is flat
+        rslt = np.where(external_values > 10, 0.0, rslt)
+
+        # Finishing.
+        return rslt
+
+    def _to_external(self, internal_values, idx):
+        """ Transform internal values for external use by maximization
+            routine. The positions idx of the parameters refer to the last
+            axis of the internal values.
+        """
+        # Auxiliary objects
+        lower, upper = self.attr['lower'][idx], self.attr['upper'][idx]
+
+        has_lower = self.attr['has_lower'][idx]
+        has_upper = self.attr['has_upper'][idx]
 
         # Stabilization
-        internal_value = self._clip_internal_value(para_obj, internal_value)
+        internal_values = self._clip_internal(internal_values, idx)
 
-        # Quality Check
-        assert (isinstance(internal_value, float))
-        assert (np.isfinite(internal_value))
+        # Transformation, all cases are evaluated before selecting the
+        # relevant one for each parameter.
+        with np.errstate(invalid='ignore', divide='ignore'):
+            interval = upper - lower
+            transform = (internal_values - lower) / interval
+
+            rslt = np.where(has_lower & has_upper,
+                            np.log(transform / (1.0 - transform)),
+                            internal_values)
+
+            rslt = np.where(has_lower & (~ has_upper),
+                            np.log(internal_values - lower), rslt)
+            rslt = np.where((~ has_lower) & has_upper,
+                            np.log(upper - internal_values), rslt)
 
         # Finishing.
-        return internal_value
+        return rslt
 
-    @staticmethod
-    def _clip_internal_value(para_obj, internal_value):
-        """ Assure that internal value not exactly equal to bounds.
+    def _to_internal(self, external_values, idx):
+        """ Transform external values to internal values. The positions idx
+            of the parameters refer to the last axis of the external values.
         """
-        # Antibugging.
-        assert (isinstance(para_obj, _ParaContainer))
-        assert (para_obj.get_status() is True)
-        assert (isinstance(internal_value, float))
-        assert (np.isfinite(internal_value))
+        # Auxiliary objects
+        lower, upper = self.attr['lower'][idx], self.attr['upper'][idx]
+
+        has_lower = self.attr['has_lower'][idx]
+        has_upper = self.attr['has_upper'][idx]
+
+        # Stabilization
+        external_values = np.where(self.attr['has_bounds'][idx],
+                                   np.minimum(external_values, 10),
+                                   external_values)
+
+        # Transformation, all cases are evaluated before selecting the
+        # relevant one for each parameter.
+        with np.errstate(over='ignore'):
+            interval = upper - lower
+
+            rslt = np.where(has_lower & has_upper, lower + interval / (
+                1.0 + np.exp(-external_values)), external_values)
+
+            rslt = np.where(has_lower & (~ has_upper),
+                            lower + np.exp(external_values), rslt)
+            rslt = np.where((~ has_lower) & has_upper,
+                            upper - np.exp(external_values), rslt)
 
+        # Stabilization
+        rslt = self._clip_internal(rslt, idx)
+
+        # Finishing.
+        return rslt
+
+    def _clip_internal(self, internal_values, idx):
+        """ Assure that internal values not exactly equal to bounds.
+        """
         # Auxiliary objects
-        lower_bound, upper_bound = para_obj.get_attr('bounds')
-        has_lower_bound = (lower_bound is not None)
-        has_upper_bound = (upper_bound is not None)
+        lower, upper = self.attr['lower'][idx], self.attr['upper'][idx]
+
+        has_lower = self.attr['has_lower'][idx]
+        has_upper = self.attr['has_upper'][idx]
 
         # Check bounds
-        if has_lower_bound and (internal_value == lower_bound):
-            internal_value += 0.01
+        rslt = np.where(has_lower & (internal_values == lower),
+                        internal_values + 0.01, internal_values)
 
-        if has_upper_bound and (internal_value == upper_bound):
-            internal_value -= 0.01
+        rslt = np.where(has_upper & (rslt == upper), rslt - 0.01, rslt)
 
         # Quality Check
+        assert (np.all(np.isfinite(rslt)))
+
+        assert (np.all((~ has_lower) | (lower < rslt)))
+        assert (np.all((~ has_upper) | (upper > rslt)))
+
+        # Finishing.
+        return rslt
+
+    def _check_bounds(self, values, idx):
+        """ Check that the values of the bounded parameters at the positions
+            idx are within their bounds.
+        """
+        # Distribute class attributes
+        has_bounds = self.attr['has_bounds'][idx]
+
+        lower, upper = self.attr['lower'][idx], self.attr['upper'][idx]
+
+        # Checks
+        with np.errstate(invalid='ignore'):
+            assert (np.all((~ has_bounds) | np.isnan(lower) | (values > lower)))
+            assert (np.all((~ has_bounds) | np.isnan(upper) | (values < upper)))
+
+    def _transform_to_external(self, para_obj, internal_value):
+        """ Transform the internal value of a single parameter for external
+            use by maximization routine.
+        """
+        # Antibugging
+        assert (isinstance(para_obj, _ParaContainer))
         assert (isinstance(internal_value, float))
         assert (np.isfinite(internal_value))
 
-        if has_lower_bound:
-            assert (lower_bound < internal_value)
-        if has_upper_bound:
-            assert (upper_bound > internal_value)
+        # Transformation
+        count = para_obj.get_attr('count')
+
+        rslt = self._to_external(np.array([internal_value]), [count])
 
         # Finishing.
-        return internal_value
+        return float(rslt[0])
+
+    def _transform_to_internal(self, para_obj, external_value):
+        """ Transform the external value of a single parameter to its internal
+            value.
+        """
+        # Antibugging
+        assert (isinstance(para_obj, _ParaContainer))
+        assert (isinstance(external_value, float))
+        assert (np.isfinite(external_value))
+
+        # Transformation
+        count = para_obj.get_attr('count')
+
+        rslt = self._to_internal(np.array([external_value]), [count])
+
+        # Finishing.
+        return float(rslt[0])
 
     """ Additional private methods.
     """
 
-    def _prediction_step(self):
+    def derived_attributes(self):
+        """ Compile the evaluation plan, which maps the vector of parameter
+            values directly to the structural parameters by a few index
+            operations.
+        """
+        # Distribute class attributes
+        groups = self.attr['groups']
+
+        num_covars_excl_bene_ex_ante = \
+            self.attr['num_covars_excl_bene_ex_ante']
+        num_covars_excl_cost = self.attr['num_covars_excl_cost']
+
+        # The plan is only available once all parameters are added.
+        keys = [('sd', 'U1'), ('sd', 'U0'), ('sd', 'V'), ('rho', 'U1,V'),
+                ('rho', 'U0,V')]
+
+        if not all(key_ in groups.keys() for key_ in keys):
+            self.attr['plan'] = None
+            return
+
+        # Compile plan
+        plan = dict()
+
+        plan['outc_treated'] = groups.get(('outc', 'treated'),
+                                          np.array([], dtype='int'))
+        plan['outc_untreated'] = groups.get(('outc', 'untreated'),
+                                            np.array([], dtype='int'))
+        plan['cost'] = groups.get(('cost', None), np.array([], dtype='int'))
+
+        plan['scalars'] = np.array([groups[key_][0] for key_ in keys])
+
+        # Layout of the choice coefficients, the ex ante benefit coefficients
+        # are followed by the covariates that only enter the cost.
+        num_choice = num_covars_excl_bene_ex_ante + plan['cost'].shape[0]
+
+        plan['num_choice'] = num_choice
+        plan['num_bene'] = num_choice - num_covars_excl_cost
+        plan['choice_cost'] = np.arange(num_covars_excl_bene_ex_ante,
+                                        num_choice)
+
+        self.attr['plan'] = plan
+
+        # The operator of the prediction step is only constructed once for
+        # each sample.
+        if self.attr['operator'] is None and \
+                (not self.attr['without_prediction']):
+            self.attr['operator'] = self._get_operator()
+
+    def _get_operator(self):
+        """ Construct the operator of the prediction step, which maps the ex
+            post to the ex ante benefit coefficients. It contains the
+            coefficients of the weighted least-squares projection of the ex
+            post on the ex ante benefit covariates, which are obtained from an
+            orthogonal factorization of the covariates rather than the normal
+            equations. The out-of-core data is processed in chunks of rows.
+        """
+        # Distribute class attributes
+        x_ex_post = self.attr['X_ex_post']
+        x_ex_ante = self.attr['X_ex_ante']
+        w = self.attr['W']
+
+        chunk = self.attr['model_obj'].get_attr('chunk')
+
+        # The projection is weighted by the frequency of the agents
+        if chunk is None:
+            root = np.sqrt(w)[:, None]
+            rslt = np.linalg.lstsq(x_ex_ante * root, x_ex_post * root,
+                                   rcond=None)[0]
+        else:
+            rslt = msc.fit_least_squares(x_ex_ante, x_ex_post, w, chunk)
+
+        # Quality checks
+        assert (np.all(np.isfinite(rslt)))
+        assert (rslt.shape == (x_ex_ante.shape[1], x_ex_post.shape[1]))
+
+        # Finishing
+        return rslt
+
+    def _get_choice(self, values):
+        """ Construct the coefficients of the choice equation from the vector
+            of parameter values, or from each row of a matrix of values.
+        """
+        # Distribute class attributes
+        plan = self.attr['plan']
+
+        # Construct coefficients
+        coeffs_bene_ex_ante = self._prediction_step(values)
+
+        rslt = np.zeros(values.shape[:-1] + (plan['num_choice'],))
+
+        rslt[..., :plan['num_bene']] = coeffs_bene_ex_ante
+        rslt[..., plan['choice_cost']] -= values[..., plan['cost']]
+
+        # Finishing
+        return rslt
+
+    def _prediction_step(self, values=None):
         """ Prediction step to account for benefit shifters unknown to the agent
             at the time of treatment decision. 
         """
@@ -425,23 +714,20 @@ class ParasCls(MetaCls):
 
         # Distribute class attributes
         without_prediction = self.get_attr('without_prediction')
-        coeffs_bene_ex_post = self.get_parameters('bene', 'exPost')
+
+        if values is None:
+            coeffs_bene_ex_post = self.get_parameters('bene', 'exPost')
+        else:
+            plan = self.attr['plan']
+            coeffs_bene_ex_post = values[..., plan['outc_treated']] - \
+                values[..., plan['outc_untreated']]
 
         # Check applicability
         if without_prediction:
             return coeffs_bene_ex_post
 
-        x_ex_post = self.get_attr('X_ex_post')
-        x_ex_ante = self.get_attr('X_ex_ante')
-
-        # Construct index
-        idx_bene = np.dot(coeffs_bene_ex_post, x_ex_post.T)
-
-        if self.attr['factor'] is None:
-            pinv = np.linalg.pinv(np.dot(x_ex_ante.T, x_ex_ante))
-            self.attr['factor'] = np.dot(pinv, x_ex_ante.T)
-
-        rslt = np.dot(self.attr['factor'], idx_bene)
+        # Projection on the ex ante benefit covariates
+        rslt = np.dot(coeffs_bene_ex_post, self.attr['operator'].T)
 
         # Type conversion
         rslt = np.array(rslt)
@@ -489,38 +775,54 @@ class ParasCls(MetaCls):
 
 
 class _ParaContainer(MetaCls):
-    """ Container for parameter class.
+    """ View on a single parameter of the parameter class. All information
+        is stored by the parameter class.
     """
-    counter = 0
+    # Attributes of the view and their storage in the parameter class
+    keys = {'id': 'ids', 'col': 'cols', 'type': 'types',
+            'subgroup': 'subgroups', 'bounds': 'bounds', 'value': 'values',
+            'is_free': 'is_free', 'has_bounds': 'has_bounds',
+            'pvalue': 'pvalues', 'confi': 'confis'}
 
-    def __init__(self):
+    def __init__(self, paras_obj, count):
         """ Parameter initialization.
         """
 
         # Attach attributes
         self.attr = dict()
 
-        self.attr['id'] = None
-        self.attr['col'] = None
+        self.attr['paras_obj'] = paras_obj
+        self.attr['count'] = count
+
+        self.is_locked = True
 
-        self.attr['count'] = None
+    """ Public get/set methods.
+    """
+
+    def get_attr(self, key):
+        """ Get attribute.
+        """
+        # Antibugging
+        assert (self.check_key(key) is True)
 
-        self.attr['bounds'] = (None, None)
+        # Distribute class attributes
+        paras_obj = self.attr['paras_obj']
+        count = self.attr['count']
 
-        self.attr['subgroup'] = None
-        self.attr['type'] = None
-        self.attr['value'] = None
-        self.attr['is_free'] = None
+        if key == 'count':
+            return count
 
-        self.attr['pvalue'] = None
-        self.attr['confi'] = (None, None)
+        rslt = paras_obj.attr[self.keys[key]][count]
 
-        self.attr['has_bounds'] = False
+        # Type conversion
+        if key == 'value':
+            rslt = float(rslt)
 
-        self.is_locked = False
+        if key in ['is_free', 'has_bounds']:
+            rslt = bool(rslt)
 
-    """ Public get/set methods.
-    """
+        # Finishing
+        return rslt
 
     def set_value(self, arg):
         """ Set value of parameter object.
@@ -529,13 +831,13 @@ class _ParaContainer(MetaCls):
         assert (isinstance(arg, float))
 
         # Distribute class attributes.
-        is_free = self.attr['is_free']
+        is_free = self.get_attr('is_free')
 
-        value = self.attr['value']
+        value = self.get_attr('value')
 
-        has_bounds = self.attr['has_bounds']
+        has_bounds = self.get_attr('has_bounds')
 
-        lower, upper = self.attr['bounds']
+        lower, upper = self.get_attr('bounds')
 
         # Checks
         if not is_free:
@@ -549,77 +851,32 @@ class _ParaContainer(MetaCls):
                 assert (value < upper)
 
         # Set attribute
-        self.attr['value'] = arg
+        self.set_attr('value', arg)
 
     def set_attr(self, key, arg):
         """ Set attribute.
-        
+
             Development Note:
-            
-                This function overrides the metaCls method. Otherwise, 
+
+                This function overrides the metaCls method. Otherwise,
                 the updating step during estimation is too tedious.
-        
+
         """
         # Antibugging
-        assert (self.check_key(key) is True)
-
-        # Set attribute
-        self.attr[key] = arg
-
-    """ Private methods
-    """
+        assert (key in ['value', 'pvalue', 'confi'])
 
-    def derived_attributes(self):
-        """ Update endogenous attributes.
-        """
+        # Distribute class attributes
+        paras_obj = self.attr['paras_obj']
+        count = self.attr['count']
 
-        if np.any(self.attr['bounds']) is not None:
-            self.attr['has_bounds'] = True
+        # Set attribute
+        paras_obj.attr[self.keys[key]][count] = arg
 
-    def _check_integrity(self):
-        """ Check integrity.
+    def check_key(self, key):
+        """ Check that key is present.
         """
-        # type
-        assert (self.get_attr('type') in ['outc', 'cost', 'rho', 'sd'])
-
-        # column
-        if self.get_attr('col') is not None:
-            col = self.get_attr('col')
-
-            assert (isinstance(col, int) or (col == 'int'))
-            if col != 'int':
-                assert (col >= 0)
-
-        # subgroup
-        if self.get_attr('subgroup') is not None:
-            assert (isinstance(self.get_attr('subgroup'), str))
-
-        # value
-        assert (isinstance(self.get_attr('value'), float))
-        assert (np.isfinite(self.get_attr('value')))
-
-        # is_free
-        assert (self.get_attr('is_free') in [True, False])
-
-        # has_bounds
-        assert (isinstance(self.attr['bounds'], tuple))
-        assert (len(self.attr['bounds']) == 2)
-
-        # value
-        assert (isinstance(self.attr['value'], float))
-        assert (np.isfinite(self.attr['value']))
-
-        # confi
-        assert (isinstance(self.attr['confi'], tuple))
-        assert (len(self.attr['confi']) == 2)
-
-        # pvalue
-        if self.attr['pvalue'] is not None:
-            assert (isinstance(self.attr['pvalue'], float))
-            assert (np.isfinite(self.attr['pvalue']))
-
-        # isLocked
-        assert (self.is_locked in [True, False])
+        # Check presence.
+        assert (key in list(self.keys.keys()) + ['count'])
 
         # Finishing.
         return True
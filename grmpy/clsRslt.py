@@ -2,12 +2,11 @@
 """
 
 # standard library
+import multiprocessing as mp
 import pickle as pkl
-import random
-import copy
 
 import numpy as np
-import scipy
+import scipy.stats
 
 
 
@@ -17,6 +16,37 @@ from grmpy.clsModel import ModelCls
 from grmpy.clsParas import ParasCls
 
 
+# module variables, plotting positions of the quantiles
+ALPHAP, BETAP = 0.4, 0.4
+
+# The draws of the parameters are simulated in blocks, each with its own
+# random stream. The order statistics are located by histograms with a fixed
+# number of bins.
+SEED = 123
+
+BLOCK_SIZE = 1000
+
+NUM_BINS = 256
+
+# Each pass narrows the intervals of the order statistics by the number of
+# bins, so a few passes suffice to isolate a single value. The values in the
+# remaining intervals are collected after the last pass.
+MAX_PASSES = 16
+
+# Results object and distribution of the draws of a worker
+_RSLT_OBJ = None
+
+_MEAN = None
+
+_COV = None
+
+# Grid of evaluation points for the marginal effects of treatment and the
+# corresponding quantiles of the standard normal distribution
+EVAL_POINTS = np.round(np.arange(0.01, 1.0, 0.01), decimals=2)
+
+GRID = scipy.stats.norm.ppf(EVAL_POINTS)
+
+
 class RsltCls(MetaCls):
     """ This class contains all results provided back to the user from the
         maximization setup.
@@ -75,42 +105,34 @@ class RsltCls(MetaCls):
         model_obj = self.get_attr('model_obj')
         paras_obj = self.get_attr('paras_obj')
 
-        num_agents = model_obj.get_attr('num_agents')
+        num_obs = model_obj.get_attr('num_obs')
 
         alpha = model_obj.get_attr('alpha')
-        num_draws = model_obj.get_attr('num_draws')
         with_asymptotics = model_obj.get_attr('with_asymptotics')
 
         # Auxiliary objects.
-        paras_copy = copy.deepcopy(paras_obj)
-
         para_objs = paras_obj.get_attr('para_objs')
 
-        scale = 1.0 / num_agents
+        scale = 1.0 / num_obs
         cov = scale * cov_mat
 
-        # Sampling.
-        np.random.seed(123), random.seed(456)
-
+        # Sampling, the draws are simulated in blocks and only the
+        # quantiles and the signs of the draws are retained.
         external_values = paras_obj.get_values(version='external', which='free')
 
-        if with_asymptotics:
-
-            random_parameters = np.random.multivariate_normal(external_values,
-                                                              cov, num_draws)
-
-        else:
+        quantiles, pvalues = None, None
 
-            random_parameters = np.zeros((len(external_values), num_draws))
+        if with_asymptotics:
+            quantiles, pvalues = self._simulate(
+                external_values, cov, [alpha * 0.5, 1.0 - alpha * 0.5])
 
         ''' Core Structural Parameters.
         '''
-        counter = 0
+        is_free = paras_obj.get_attr('is_free')
 
-        for para_obj in para_objs:
+        for counter, para_obj in enumerate(para_objs):
 
-            if (para_obj.get_attr('is_free') is False) or \
-                    (not with_asymptotics):
+            if (not is_free[counter]) or (not with_asymptotics):
 
                 para_obj.set_attr('confi', ('---', '---'))
 
@@ -118,40 +140,15 @@ class RsltCls(MetaCls):
 
             else:
 
-                rslt = []
-
-                for random_para in random_parameters:
-                    paras_copy.update(random_para, version='external',
-                                      which='free')
-
-                    para_copy = paras_copy.get_parameter(counter)
-
-                    rslt.append(para_copy.get_attr('value'))
-
-                # Confidence intervals.
-                lower, upper = scipy.stats.mstats.mquantiles(rslt,
-                                                             prob=[
-                                                                 (alpha * 0.5),
-                                                                 (
-                                                                     1.0 - alpha * 0.5)])
-
-                confi = (lower, upper)
+                confi = (quantiles[0, counter], quantiles[1, counter])
 
                 para_obj.set_attr('confi', confi)
 
-                # p values.
-                estimate = para_obj.get_attr('value')
-
-                pvalue = sum(np.sign(rslt) != np.sign(estimate)) / float(
-                    num_draws)
-
-                para_obj.set_attr('pvalue', pvalue)
-
-            counter += 1
+                para_obj.set_attr('pvalue', pvalues[counter])
 
         ''' Marginal Effects of Treatment. '''
 
-        self._add_results(random_parameters)
+        self._add_results(quantiles)
 
         ''' Store to file. '''
 
@@ -230,32 +227,22 @@ class RsltCls(MetaCls):
 
                     file_.write(struct.format([u, est, lower, upper]))
 
-    def _add_results(self, random_parameters):
-        """ Add results on marginal effects of treatment.
+    def _add_results(self, quantiles):
+        """ Add results on marginal effects of treatment. The quantiles of the
+            simulated statistics are only available with asymptotics.
         """
         # Antibugging.
         assert (self.get_status() == True)
-        assert (isinstance(random_parameters, np.ndarray))
-        assert (np.all(np.isfinite(random_parameters)))
-        assert (random_parameters.dtype == 'float')
-        assert (random_parameters.ndim == 2)
 
         # Distribute class attributes.
         model_obj = self.get_attr('model_obj')
         paras_obj = self.get_attr('paras_obj')
 
         with_asymptotics = model_obj.get_attr('with_asymptotics')
-        alpha = model_obj.get_attr('alpha')
-        surp_estimation = paras_obj.get_attr('surp_estimation')
-
-        # Auxiliary objects.
-        paras_copy = copy.deepcopy(paras_obj)
+        num_paras = paras_obj.get_attr('num_paras')
 
         # Initialize parameters.
-        parameter_list = ['bmte_ex_post']
-
-        if surp_estimation:
-            parameter_list += ['smte_ex_ante', 'cmte_ex_ante']
+        parameter_list = self._get_parameter_list()
 
         for parameter in parameter_list:
             self.attr[parameter] = {}
@@ -263,56 +250,339 @@ class RsltCls(MetaCls):
             self.attr[parameter]['confi'] = {}
 
         # Point estimates.
-        args = {}
+        paras = paras_obj.get_values('internal', 'all')
 
-        for parameter in parameter_list:
-            args['which'] = parameter
+        estimates = self._construct_marginal_effects(model_obj, paras_obj,
+                                                     paras)
 
-            self.attr[parameter]['estimate'] = \
-                self._construct_marginal_effects(model_obj, paras_obj, args)
+        for parameter in parameter_list:
+            self.attr[parameter]['estimate'] = estimates[parameter]
 
         # Confidence bounds.
         if not with_asymptotics:
             return None
 
-        rslt = {}
+        assert (isinstance(quantiles, np.ndarray))
+        assert (np.all(np.isfinite(quantiles)))
 
-        args = {}
+        # The effects follow the parameters in the simulated statistics.
+        for i, parameter in enumerate(parameter_list):
 
-        for parameter in parameter_list:
+            start = num_paras + i * 99
+
+            lower, upper = quantiles[:, start:start + 99]
+
+            self.attr[parameter]['confi']['upper'] = list(upper)
+            self.attr[parameter]['confi']['lower'] = list(lower)
+
+        # Finishing.
+        return None
+
+    def _get_parameter_list(self):
+        """ Get the marginal effects of treatment that are available.
+        """
+        # Distribute class attributes.
+        paras_obj = self.get_attr('paras_obj')
+
+        surp_estimation = paras_obj.get_attr('surp_estimation')
+
+        # Construct list.
+        parameter_list = ['bmte_ex_post']
+
+        if surp_estimation:
+            parameter_list += ['smte_ex_ante', 'cmte_ex_ante']
+
+        # Finishing.
+        return parameter_list
+
+    def _simulate(self, mean, cov, probs, block_size=BLOCK_SIZE):
+        """ Simulate the quantiles of the parameters and the marginal effects
+            of treatment and the p values of the parameters. The draws are
+            simulated in blocks, which are distributed across the workers.
+            Each pass over the blocks only retains summaries, so the memory
+            does not grow with the number of draws. A few passes locate the
+            required order statistics of each statistic by histograms, until
+            their bins are small enough to be collected. As the random stream
+            of each block is fixed, the quantiles are exact.
+        """
+        # Antibugging.
+        assert (self.get_status() is True)
+
+        # Distribute class attributes.
+        model_obj = self.get_attr('model_obj')
+        paras_obj = self.get_attr('paras_obj')
+
+        num_draws = model_obj.get_attr('num_draws')
+        workers = model_obj.get_attr('workers')
+
+        num_paras = paras_obj.get_attr('num_paras')
+
+        estimates = paras_obj.get_values('internal', 'all')
+
+        num_blocks = int(np.ceil(num_draws / float(block_size)))
+
+        # A single block is processed in memory.
+        if num_blocks == 1:
+            stats = self._simulate_block(0, mean, cov, block_size)
+
+            quantiles = _get_quantiles(stats, probs)
+
+            pvalues = np.sum(np.sign(stats[:, :num_paras]) !=
+                             np.sign(estimates), axis=0) / float(num_draws)
+
+            return quantiles, pvalues
+
+        # Distribute blocks
+        pool = None
+
+        if workers > 1:
+            pool = mp.Pool(min(workers, num_blocks), _initialize_worker,
+                           (self, mean, cov))
+
+        args = (mean, cov, block_size, num_blocks)
+
+        # Range of the statistics and the signs of the parameters.
+        mins, maxs, signs = None, None, 0
+
+        for block_mins, block_maxs, block_signs in self._map_blocks(
+                pool, args, 'range'):
+
+            if mins is None:
+                mins, maxs = block_mins, block_maxs
+            else:
+                mins, maxs = np.minimum(mins, block_mins), \
+                    np.maximum(maxs, block_maxs)
+
+            signs = signs + block_signs
+
+        pvalues = signs / float(num_draws)
+
+        # Targets, all required order statistics of each statistic.
+        lower, upper, gamma = _get_ranks(num_draws, probs)
+
+        ranks = np.unique(np.concatenate((lower, upper)))
+
+        cols = np.repeat(np.arange(mins.shape[0]), ranks.shape[0])
+
+        targets = dict()
+
+        targets['rank'] = np.tile(ranks, mins.shape[0])
+        targets['lo'] = mins[cols]
+        targets['hi'] = np.nextafter(maxs[cols], np.inf)
+
+        counts = np.tile(num_draws, cols.shape[0])
+
+        order = np.tile(np.nan, cols.shape[0])
+
+        # Refinement of the intervals [lo, hi) that contain the targets.
+        for _ in range(MAX_PASSES):
+
+            # Intervals with a single value
+            is_single = (np.nextafter(targets['lo'], np.inf) >= targets['hi'])
+
+            order[is_single] = targets['lo'][is_single]
+
+            pending = (counts > block_size) & (~ is_single)
+
+            if not np.any(pending):
+                break
+
+            idx = np.flatnonzero(pending)
+
+            intervals = (cols[idx], targets['lo'][idx], targets['hi'][idx])
+
+            below, hist = 0, 0
+
+            for block_below, block_hist in self._map_blocks(
+                    pool, args, 'histogram', intervals):
+                below, hist = below + block_below, hist + block_hist
+
+            # Select the bins of the targets
+            edges = _get_edges(targets['lo'][idx], targets['hi'][idx])
+
+            cumulative = below[:, None] + np.cumsum(hist, axis=1)
 
-            args['which'] = parameter
+            bins = np.argmax(cumulative > targets['rank'][idx][:, None],
+                             axis=1)
 
-            # Simulation.
-            rslt[parameter] = []
+            rows = np.arange(idx.shape[0])
 
-            for randomPara in random_parameters:
-                paras_copy.update(randomPara, version='external', which='free')
+            targets['lo'][idx] = edges[rows, bins]
+            targets['hi'][idx] = edges[rows, bins + 1]
 
-                rslt[parameter].append(
-                    self._construct_marginal_effects(model_obj, paras_copy,
-                                                     args))
+            counts[idx] = hist[rows, bins]
 
-            # Type conversion.
-            rslt[parameter] = np.array(rslt[parameter])
+        # Collect the values in the intervals and select the order statistics
+        idx = np.flatnonzero(np.isnan(order))
 
-            # Confidence intervals.
-            self.attr[parameter]['confi']['upper'] = []
-            self.attr[parameter]['confi']['lower'] = []
+        if idx.shape[0] > 0:
 
-            for i in range(99):
-                lower, upper = scipy.stats.mstats.mquantiles(
-                    rslt[parameter][:, i],
-                    prob=[(alpha * 0.5), (1.0 - alpha * 0.5)], axis=0)
+            intervals = (cols[idx], targets['lo'][idx], targets['hi'][idx])
 
-                self.attr[parameter]['confi']['upper'].append(upper)
-                self.attr[parameter]['confi']['lower'].append(lower)
+            below, values = 0, [[] for _ in idx]
+
+            for block_below, block_values in self._map_blocks(
+                    pool, args, 'collect', intervals):
+
+                below = below + block_below
+
+                for i, value in enumerate(block_values):
+                    values[i] += [value]
+
+            for i, j in enumerate(idx):
+                value = np.sort(np.concatenate(values[i]))
+
+                assert (0 <= targets['rank'][j] - below[i] < value.shape[0])
+
+                order[j] = value[targets['rank'][j] - below[i]]
+
+        # Shut down pool of workers
+        if pool is not None:
+            pool.close()
+
+            pool.join()
+
+        # Interpolation of the order statistics
+        order = order.reshape((mins.shape[0], ranks.shape[0])).T
+
+        gamma = gamma[:, None]
+
+        quantiles = (1.0 - gamma) * order[np.searchsorted(ranks, lower)] + \
+            gamma * order[np.searchsorted(ranks, upper)]
 
         # Finishing.
-        return None
+        return quantiles, pvalues
+
+    def _map_blocks(self, pool, args, request, intervals=None):
+        """ Process all blocks for a request. The summaries of the blocks are
+            returned one at a time and in order.
+        """
+        # Distribute arguments.
+        mean, cov, block_size, num_blocks = args
+
+        # Construct tasks.
+        tasks = [(block, block_size, request, intervals)
+                 for block in range(num_blocks)]
+
+        # Finishing.
+        if pool is None:
+            return (self._process_block(task, mean, cov) for task in tasks)
+
+        return pool.imap(_run_block, tasks)
+
+    def _process_block(self, task, mean, cov):
+        """ Simulate a block of draws and summarize the statistics for the
+            request. The summaries of all blocks are added up.
+        """
+        # Distribute task.
+        block, block_size, request, intervals = task
+
+        # Simulate statistics.
+        stats = self._simulate_block(block, mean, cov, block_size)
+
+        # Range of the statistics and the signs of the parameters.
+        if request == 'range':
+            paras_obj = self.get_attr('paras_obj')
+
+            num_paras = paras_obj.get_attr('num_paras')
+            estimates = paras_obj.get_values('internal', 'all')
+
+            signs = np.sum(np.sign(stats[:, :num_paras]) !=
+                           np.sign(estimates), axis=0)
+
+            return stats.min(axis=0), stats.max(axis=0), signs
+
+        # Values below and within the intervals of the targets.
+        cols, lo, hi = intervals
+
+        values = stats[:, cols]
+
+        below = np.sum(values < lo, axis=0)
+
+        is_inside = (values >= lo) & (values < hi)
+
+        if request == 'collect':
+            return below, [values[is_inside[:, i], i]
+                           for i in range(cols.shape[0])]
+
+        # Histograms of the values within the intervals. The bins are
+        # computed directly and then aligned with the edges, which are
+        # constructed in the same way as by _get_edges().
+        num_targets = cols.shape[0]
+
+        width = hi - lo
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            shares = np.nan_to_num((values - lo) / width) * NUM_BINS
+
+        bins = np.floor(shares.clip(0, NUM_BINS - 1)).astype('int')
+
+        for _ in range(NUM_BINS):
+            edge_lower = lo + width * (bins / float(NUM_BINS))
+            edge_upper = np.where(bins == NUM_BINS - 1, hi,
+                                  lo + width * ((bins + 1) / float(NUM_BINS)))
+
+            is_below = is_inside & (values < edge_lower)
+            is_above = is_inside & (values >= edge_upper)
+
+            if not (np.any(is_below) or np.any(is_above)):
+                break
+
+            bins = bins - is_below + is_above
+
+        # Antibugging.
+        assert not (np.any(is_below) or np.any(is_above))
+
+        # Values outside the intervals are counted in an additional bin.
+        bins = np.where(is_inside, bins + np.arange(num_targets) * NUM_BINS,
+                        num_targets * NUM_BINS)
+
+        hist = np.bincount(bins.ravel(), minlength=num_targets * NUM_BINS + 1)
+
+        hist = hist[:-1].reshape((num_targets, NUM_BINS))
+
+        # Finishing.
+        return below, hist
+
+    def _simulate_block(self, block, mean, cov, block_size):
+        """ Simulate a block of draws of the parameters and collect the
+            internal values of all parameters and the marginal effects of
+            treatment for each draw. The random stream of each block is
+            determined by its position only.
+        """
+        # Distribute class attributes.
+        model_obj = self.get_attr('model_obj')
+        paras_obj = self.get_attr('paras_obj')
+
+        num_draws = model_obj.get_attr('num_draws')
+
+        # Sampling.
+        num_block = min(block_size, num_draws - block * block_size)
+
+        random_state = np.random.RandomState([SEED, block])
+
+        random_parameters = random_state.multivariate_normal(mean, cov,
+                                                             num_block)
+
+        random_values = paras_obj.get_values_batch(random_parameters)
+
+        # Statistics.
+        effects = self._construct_marginal_effects(model_obj, paras_obj,
+                                                   random_values)
+
+        stats = [random_values]
+
+        for parameter in self._get_parameter_list():
+            stats += [effects[parameter]]
+
+        # Finishing.
+        return np.concatenate(stats, axis=1)
 
-    def _construct_marginal_effects(self, model_obj, paras_obj, args):
-        """ Get effects.
+    def _construct_marginal_effects(self, model_obj, paras_obj, values):
+        """ Construct the marginal effects of treatment on the grid of
+            evaluation points for the internal values of all parameters. For a
+            matrix of values, the effects are constructed for each row at once
+            and the first axis of the effects refers to the rows.
         """
         # Antibugging.
         assert (self.get_status() is True)
@@ -320,72 +590,144 @@ class RsltCls(MetaCls):
         assert (model_obj.get_status() == True)
         assert (isinstance(paras_obj, ParasCls))
         assert (paras_obj.get_status() == True)
+        assert (isinstance(values, np.ndarray))
+        assert (values.ndim in [1, 2])
 
         # Distribute class attributes.
         x_ex_post_eval = model_obj.get_attr('x_ex_post_eval')
         z_eval = model_obj.get_attr('z_eval')
         c_eval = model_obj.get_attr('c_eval')
 
-        # Marginal benefit of treatment.
-        rho_u1_v = paras_obj.get_parameters('rho', 'U1,V')
-        rho_u0_v = paras_obj.get_parameters('rho', 'U0,V')
+        # Distribute parametrizations, scalar parameters are aligned with
+        # the grid of evaluation points.
+        structural = paras_obj.get_structural(values)
 
-        coeffs_bene_ex_post = paras_obj.get_parameters('bene', 'exPost')
-        coeffs_cost = paras_obj.get_parameters('cost', None)
-        coeffs_choc = paras_obj.get_parameters('choice', None)
+        coeffs_bene_ex_post = structural['outc_treated'] - \
+            structural['outc_untreated']
+        coeffs_cost = structural['coeffs_cost']
+        coeffs_choc = structural['coeffs_choc']
 
-        sd_v = paras_obj.get_parameters('sd', 'V')
-        sd_u1 = paras_obj.get_parameters('sd', 'U1')
-        sd_u0 = paras_obj.get_parameters('sd', 'U0')
+        rho_u1_v = np.expand_dims(structural['rho_u1_v'], -1)
+        rho_u0_v = np.expand_dims(structural['rho_u0_v'], -1)
 
-        bmte_level = np.dot(coeffs_bene_ex_post, x_ex_post_eval)
-        smte_level = np.dot(coeffs_choc, z_eval)
-        cmte_level = np.dot(coeffs_cost, c_eval)
+        sd_v = np.expand_dims(structural['sd_v'], -1)
+        sd_u1 = np.expand_dims(structural['sd_u1'], -1)
+        sd_u0 = np.expand_dims(structural['sd_u0'], -1)
 
-        bmte_ex_post = np.tile(np.nan, 99)
-        cmte_ex_post = np.tile(np.nan, 99)
-        smte_ex_ante = np.tile(np.nan, 99)
+        # Levels.
+        bmte_level = np.expand_dims(np.dot(coeffs_bene_ex_post,
+                                           x_ex_post_eval), -1)
+        smte_level = np.expand_dims(np.dot(coeffs_choc, z_eval), -1)
+        cmte_level = np.expand_dims(np.dot(coeffs_cost, c_eval), -1)
 
-        eval_points = np.round(np.arange(0.01, 1.0, 0.01), decimals=2)
-        quantiles = scipy.stats.norm.ppf(eval_points, loc=0, scale=sd_v)
+        # Quantiles of the unobservable in the choice equation.
+        quantiles = GRID * sd_v
 
-        # Construct marginal benefit of treatment (ex post)
-        bmte_slopes = ((sd_u1 / sd_v) * rho_u1_v - (
-            sd_u0 / sd_v) * rho_u0_v) * quantiles
-        smte_slopes = -quantiles
-        cmte_slopes = (((sd_u1 / sd_v) * rho_u1_v - (sd_u0 / sd_v) * rho_u0_v) +
-                       1.0) * quantiles
+        # Construct marginal effects of treatment.
+        slopes = (sd_u1 / sd_v) * rho_u1_v - (sd_u0 / sd_v) * rho_u0_v
 
-        # Construct marginal benefit of treatment (ex post)
-        for i in range(99):
-            bmte_ex_post[i] = bmte_level + bmte_slopes[i]
+        rslt = dict()
 
-        # Construct marginal surplus of treatment (ex ante).
-        for i in range(99):
-            smte_ex_ante[i] = smte_level + smte_slopes[i]
+        rslt['bmte_ex_post'] = bmte_level + slopes * quantiles
+        rslt['smte_ex_ante'] = smte_level + (-quantiles)
+        rslt['cmte_ex_ante'] = cmte_level + (slopes + 1.0) * quantiles
 
-        # Construct marginal cost of treatment (ex ante).
-        for i in range(99):
-            cmte_ex_post[i] = cmte_level + cmte_slopes[i]
+        # Quality checks.
+        for key_ in rslt.keys():
+            assert (isinstance(rslt[key_], np.ndarray))
+            assert (np.all(np.isfinite(rslt[key_])))
+            assert (rslt[key_].dtype == 'float')
+            assert (rslt[key_].shape == values.shape[:-1] + (99,))
 
-        rslt = None
-        if args['which'] == 'bmte_ex_post':
+        # Finishing.
+        return rslt
 
-            rslt = bmte_ex_post
 
-        elif args['which'] == 'cmte_ex_ante':
+""" Private methods of the module.
+"""
 
-            rslt = cmte_ex_post
 
-        elif args['which'] == 'smte_ex_ante':
+def _get_quantiles(values, probs):
+    """ Get the quantiles of the values along the first axis, which refers to
+        the draws. The plotting positions are the defaults of MQUANTILES, so
+        the confidence intervals do not depend on the implementation.
+    """
+    # Antibugging
+    assert (isinstance(values, np.ndarray))
+    assert (values.shape[0] > 0)
 
-            rslt = smte_ex_ante
+    # Positions of the order statistics
+    num_draws = values.shape[0]
 
-        # Quality checks.
-        assert (isinstance(rslt, np.ndarray))
-        assert (np.all(np.isfinite(rslt)))
-        assert (rslt.dtype == 'float')
-        assert (rslt.shape == (99,))
+    lower, upper, gamma = _get_ranks(num_draws, probs)
 
-        # Finishing.
-        return rslt
+    # Order statistics, only the required ones are put in place.
+    kth = np.unique(np.concatenate((lower, upper)))
+
+    order = np.partition(values, kth, axis=0)
+
+    gamma = gamma.reshape((-1,) + (1,) * (values.ndim - 1))
+
+    rslt = (1.0 - gamma) * order[lower] + gamma * order[upper]
+
+    # Finishing
+    return rslt
+
+
+def _get_edges(lo, hi):
+    """ Get the edges of the bins of the histograms for the intervals
+        [lo, hi).
+    """
+    # Construct edges
+    shares = np.arange(NUM_BINS + 1) / float(NUM_BINS)
+
+    rslt = lo[:, None] + (hi - lo)[:, None] * shares
+
+    rslt[:, -1] = hi
+
+    # Finishing
+    return rslt
+
+
+def _get_ranks(num_draws, probs):
+    """ Get the positions of the two order statistics that are interpolated
+        for each quantile and the weight of the upper one.
+    """
+    # Plotting positions
+    probs = np.array(probs, ndmin=1)
+
+    positions = ALPHAP + probs * (1.0 - ALPHAP - BETAP)
+
+    aleph = num_draws * probs + positions
+
+    # Single draw
+    if num_draws == 1:
+        zeros = np.zeros(probs.shape, dtype='int')
+        return zeros, zeros, np.zeros(probs.shape)
+
+    # Positions, counting from zero
+    upper = np.floor(aleph.clip(1, num_draws - 1)).astype(int)
+
+    gamma = (aleph - upper).clip(0, 1)
+
+    # Finishing
+    return upper - 1, upper, gamma
+
+
+''' Private functions executed by the workers.
+'''
+
+
+def _initialize_worker(rslt_obj, mean, cov):
+    """ Attach the results object and the distribution of the draws to the
+        worker.
+    """
+    global _RSLT_OBJ, _MEAN, _COV
+
+    _RSLT_OBJ, _MEAN, _COV = rslt_obj, mean, cov
+
+
+def _run_block(task):
+    """ Process a single block of draws.
+    """
+    return _RSLT_OBJ._process_block(task, _MEAN, _COV)
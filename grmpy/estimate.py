@@ -2,6 +2,7 @@
 """
 
 # standard library
+from functools import partial
 import glob
 import sys
 import os
@@ -22,18 +23,42 @@ from grmpy.clsRslt import RsltCls
 '''
 
 
-def estimate(init='init.ini', resume=False, use_simulation=False):
-    """ Estimate specified model.
+def estimate(init='init.ini', resume=False, use_simulation=False,
+             callbacks=None, profile=False):
+    """ Estimate specified model. The callbacks receive an event for each
+        iteration and each evaluation of the criterion function, which are
+        also written to the telemetry file. The profile of the stages of
+        the estimation is written to file if requested.
     """
+    # Antibugging
+    if callbacks is None:
+        callbacks = []
+
+    assert (isinstance(callbacks, list))
+    assert (profile in [True, False])
+
     # Cleanup
     _cleanup(resume)
 
+    # Profiling
+    if profile:
+        msc.start_profiling()
+
     # Process initialization file
-    model_obj, paras_obj, _ = user.initialize(init, use_simulation)
+    with msc.stage('initialize'):
+        model_obj, paras_obj, _ = user.initialize(init, use_simulation)
+
+    # Update parameter objects, the latest checkpoint takes precedence over
+    # the results of a completed run.
+    checkpoint = None
 
-    # Update parameter objects.
     if resume:
-        paras_obj = msc.update_parameters(paras_obj)
+        checkpoint = msc.read_checkpoint()
+
+        if checkpoint is None:
+            paras_obj = msc.update_parameters(paras_obj)
+        else:
+            paras_obj.update(checkpoint['x'], 'external', 'free')
 
     paras = paras_obj.get_values('internal', 'all')
 
@@ -51,13 +76,21 @@ def estimate(init='init.ini', resume=False, use_simulation=False):
     # Distribute auxiliary objects
     max_obj = opt.MaxCls(model_obj, paras_obj)
 
+    max_obj.set_attr('checkpoint', checkpoint)
+
+    telemetry = msc.open_telemetry()
+
+    max_obj.set_attr('callbacks', [partial(msc.write_event, telemetry)] +
+                     callbacks)
+
     max_obj.lock()
 
     stdout_current = sys.stdout
 
     sys.stdout = open('/dev/null', 'w')
 
-    max_rslt = max_obj.maximize()
+    with msc.stage('maximization'):
+        max_rslt = max_obj.maximize()
 
     sys.stdout = stdout_current
 
@@ -71,7 +104,13 @@ def estimate(init='init.ini', resume=False, use_simulation=False):
     cov_mat = np.tile(np.nan, (len(xopt), len(xopt)))
 
     if with_asymptotics:
-        cov_mat = _add_asymptotics(max_rslt, max_obj, hessian)
+        with msc.stage('asymptotics'):
+            cov_mat = _add_asymptotics(max_rslt, max_obj, hessian)
+
+    # Shut down pool of workers
+    max_obj.get_attr('crit_func').terminate()
+
+    telemetry.close()
 
     # Construct result class
     rslt = RsltCls(paras_obj)
@@ -80,10 +119,14 @@ def estimate(init='init.ini', resume=False, use_simulation=False):
 
     rslt.set_attr('cov_mat', cov_mat)
 
-    rslt.lock()
+    with msc.stage('results'):
+        rslt.lock()
 
     rslt.store('rslt.grmpy.pkl')
 
+    if profile:
+        msc.stop_profiling('estimate')
+
     # Finishing
     return rslt
 
@@ -98,6 +141,8 @@ def _add_asymptotics(max_rslt, max_obj, hessian):
     # Distribute objects
     xopt = max_rslt['xopt']
 
+    clusters = max_obj.get_attr('model_obj').get_attr('C')
+
     # Initialize container
     cov_mat = None
 
@@ -106,14 +151,134 @@ def _add_asymptotics(max_rslt, max_obj, hessian):
         cov_mat = max_rslt['covMat']
     elif hessian == 'numdiff':
         crit_func = max_obj.get_attr('crit_func')
-        nd_obj = nd.Hessian(lambda x: opt.scipy_wrapper_function(x, crit_func))
-        hess = nd_obj(xopt)
+        hess = _approximate_hessian(xopt, crit_func)
         cov_mat = np.linalg.pinv(hess)
+    elif hessian == 'opg':
+        crit_func = max_obj.get_attr('crit_func')
+        info = _approximate_information(xopt, crit_func)
+        cov_mat = np.linalg.pinv(info)
+
+    # Cluster-robust covariance
+    if clusters is not None:
+        crit_func = max_obj.get_attr('crit_func')
+        cov_mat = _add_clustering(cov_mat, xopt, crit_func, clusters)
+
+    # Finishing
+    return cov_mat
+
+
+def _add_clustering(bread, x, crit_func, clusters):
+    """ Cluster-robust sandwich covariance. The individual scores are summed
+        within clusters in a single pass over the agents sorted by their
+        cluster identifiers. The finite-cluster adjustment G/(G - 1) is
+        applied.
+    """
+    # Distribute class attributes
+    model_obj = crit_func.get_attr('model_obj')
+
+    num_obs = model_obj.get_attr('num_obs')
+    w = model_obj.get_attr('W')
+
+    # Individual scores
+    scores = crit_func.evaluate_scores(x) * w[:, None]
+
+    # Cluster scores
+    sums = _get_cluster_scores(scores, clusters)
+
+    num_clusters = sums.shape[0]
+
+    # Sandwich
+    meat = np.dot(sums.T, sums) / num_obs
+
+    if num_clusters > 1:
+        meat *= num_clusters / (num_clusters - 1.0)
+
+    cov_mat = np.dot(np.dot(bread, meat), bread)
 
     # Finishing
     return cov_mat
 
 
+def _get_cluster_scores(scores, clusters):
+    """ Sum of the individual scores within each cluster, the rows are
+        sorted by the cluster identifiers and reduced segment by segment.
+    """
+    # Antibugging
+    assert (scores.ndim == 2)
+    assert (clusters.shape == (scores.shape[0],))
+
+    # Sort agents by cluster
+    order = np.argsort(clusters, kind='mergesort')
+
+    sorted_ = clusters[order]
+
+    # Start of each segment
+    starts = np.flatnonzero(np.concatenate(([True],
+                                            sorted_[1:] != sorted_[:-1])))
+
+    # Reduction
+    sums = np.add.reduceat(scores[order], starts, axis=0)
+
+    # Finishing
+    return sums
+
+
+def _approximate_hessian(x, crit_func):
+    """ Numerical approximation of the hessian. The evaluation points of
+        numdifftools do not depend on the function values. They are
+        recorded first and then evaluated as a single batch.
+    """
+    # Record evaluation points
+    points = []
+
+    def _record(x_):
+        points.append(x_.copy())
+        return 0.0
+
+    nd.Hessian(_record)(x)
+
+    # Batch evaluation
+    fvals = crit_func.evaluate_batch(np.array(points))
+
+    cache = dict()
+
+    for point, fval in zip(points, fvals):
+        cache[point.tobytes()] = fval
+
+    # Replay with the stored function values
+    def _replay(x_):
+        try:
+            return cache[x_.tobytes()]
+        except KeyError:
+            return opt.scipy_wrapper_function(x_, crit_func)
+
+    hess = nd.Hessian(_replay)(x)
+
+    # Finishing
+    return hess
+
+
+def _approximate_information(x, crit_func):
+    """ Approximation of the information matrix by the outer product of
+        the individual scores, which requires only a single pass over the
+        agents.
+    """
+    # Distribute class attributes
+    model_obj = crit_func.get_attr('model_obj')
+
+    num_obs = model_obj.get_attr('num_obs')
+    w = model_obj.get_attr('W')
+
+    # Individual scores
+    scores = crit_func.evaluate_scores(x)
+
+    # Outer product of gradients
+    info = np.dot(scores.T * w, scores) / num_obs
+
+    # Finishing
+    return info
+
+
 def _write_starting_values(paras):
     """ Write starting values to file.
     """
@@ -163,6 +328,26 @@ def _write_optimization_results(max_rslt, paras_obj):
 
         file_.write('''\n      Message:    ''' + msg + '\n\n\n\n')
 
+    # Write summary of multistart maximization
+    if 'multistart' not in max_rslt.keys():
+        return
+
+    with open('info.grmpy.out', 'a') as file_:
+
+        file_.write('''\n MULTISTART \n\n''')
+
+        str_ = '  {0:>5} {1:>25} {2:>10} {3:>10} {4:>10}\n'
+
+        file_.write(str_.format('Start', 'Function', 'Iterations', 'Success',
+                                'Stopped'))
+
+        for rslt in max_rslt['multistart']:
+            file_.write(str_.format(rslt['start'], rslt['fun'], rslt['nit'],
+                                    str(rslt['success']),
+                                    str(rslt['stopped'])))
+
+        file_.write('\n\n')
+
 
 def _cleanup(resume):
     """ Cleanup from previous estimation run.
@@ -174,10 +359,14 @@ def _cleanup(resume):
     file_list = glob.glob('*.grmpy.*')
 
     if resume:
-        file_list.remove('info.grmpy.out')
+        for file_ in ['info.grmpy.out', msc.CHECKPOINT] + \
+                glob.glob(msc.TELEMETRY.format('*')):
+            if file_ in file_list:
+                file_list.remove(file_)
 
     # Remove information from simulated data
-    for file_ in ['*.infos.grmpy.out']:
+    for file_ in ['*.infos.grmpy.out', 'simulate.profile.grmpy.out',
+                  'simulate.trace.grmpy.json']:
         try:
             file_list.remove(glob.glob(file_)[0])
         except IndexError:
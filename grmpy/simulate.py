@@ -18,14 +18,22 @@ import grmpy.tools.optimization as opt
 '''
 
 
-def simulate(init='init.ini', update=False):
-    """ Simulate dataset for grmToolbox.
+def simulate(init='init.ini', update=False, profile=False):
+    """ Simulate dataset for grmToolbox. The profile of the stages of the
+        simulation is written to file if requested.
     """
+    # Antibugging
+    assert (profile in [True, False])
+
+    # Profiling
+    if profile:
+        msc.start_profiling()
 
     is_mock = _create_mock(init)
 
     # Process initialization file
-    _, paras_obj, init_dict = user.initialize(init, is_simulation=True)
+    with msc.stage('initialize'):
+        _, paras_obj, init_dict = user.initialize(init, is_simulation=True)
 
     # Distribute information
     target = init_dict['SIMULATION']['target']
@@ -52,9 +60,10 @@ def simulate(init='init.ini', update=False):
 
     sim_dat[:, :] = np.nan
 
-    sim_dat = _simulate_exogenous(sim_dat, init_dict)
+    with msc.stage('simulation'):
+        sim_dat = _simulate_exogenous(sim_dat, init_dict)
 
-    sim_dat = _simulate_endogenous(sim_dat, paras_obj, init_dict)
+        sim_dat = _simulate_endogenous(sim_dat, paras_obj, init_dict)
 
     # Update for prediction step
     rslt = msc.create_matrices(sim_dat, init_dict)
@@ -65,15 +74,24 @@ def simulate(init='init.ini', update=False):
 
     paras_obj.set_attr('X_ex_ante', rslt['X_ex_ante'])
 
+    paras_obj.set_attr('W', np.ones(sim_agents))
+
+    paras_obj.set_attr('operator', None)
+
     paras_obj.lock()
 
     # Save dataset
-    np.savetxt(target, sim_dat, fmt='%15.10f')
+    with msc.stage('save_dataset'):
+        np.savetxt(target, sim_dat, fmt='%15.10f')
 
-    likl = _get_likelihood(init)
+    with msc.stage('likelihood'):
+        likl = _get_likelihood(init)
 
     _write_info(paras_obj, target, rslt, likl)
 
+    if profile:
+        msc.stop_profiling('simulate')
+
 
 ''' Auxiliary functions.
 '''
@@ -126,7 +144,7 @@ def _create_mock(init):
 
     sim_dat[:, :] = np.random.randn(obs_agents, max_ + 1)
 
-    sim_dat[:, pos] = np.random.random_integers(0, 1, obs_agents)
+    sim_dat[:, pos] = np.random.randint(0, 2, obs_agents)
 
     source = init_dict['DATA']['source']
 
@@ -223,6 +241,8 @@ def _simulate_exogenous(sim_dat, init_dict):
 
     treatment = init_dict['DATA']['treatment']
 
+    cluster = init_dict['ESTIMATION']['cluster']
+
     # Restrict to exogenous positions
     for pos in [outcome, treatment]:
         all_.remove(pos)
@@ -252,6 +272,10 @@ def _simulate_exogenous(sim_dat, init_dict):
         for pos in all_:
             sim_dat[:, pos] = np.random.randn(sim_agents)
 
+        # Cluster identifiers, the agents are assigned to a few groups.
+        if cluster is not None:
+            sim_dat[:, cluster] = np.random.randint(0, 10, sim_agents)
+
     # Quality checks.
     assert (isinstance(sim_dat, np.ndarray))
     assert (np.all(np.isfinite(sim_dat[:, all_])))
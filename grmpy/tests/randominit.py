@@ -45,12 +45,12 @@ def random_dict(dict_=None):
     if 'version' in dict_.keys():
         version = dict_['version']
     else:
-        version = np.random.choice(['fast', 'slow'])
+        version = np.random.choice(['fast', 'slow', 'log', 'jit'])
 
     if 'maxiter' in dict_.keys():
         maxiter = dict_['maxiter']
     else:
-        maxiter = np.random.random_integers(0, MAX_ITER)
+        maxiter = np.random.randint(0, MAX_ITER + 1)
 
     if 'asymptotics' in dict_.keys():
         asymptotics = dict_['asymptotics']
@@ -60,12 +60,14 @@ def random_dict(dict_=None):
     if 'optimizer' in dict_.keys():
         optimizer = dict_['optimizer']
     else:
-        optimizer = np.random.choice(['bfgs', 'powell'])
+        optimizer = np.random.choice(['bfgs', 'lbfgsb', 'trust-ncg',
+                                      'powell'])
 
     if 'differences' in dict_.keys():
         differences = dict_['differences']
     else:
-        differences = np.random.choice(['one-sided', 'two-sided'])
+        differences = np.random.choice(['one-sided', 'two-sided',
+                                        'analytic'])
 
     if 'starts' in dict_.keys():
         starts = dict_['starts']
@@ -75,24 +77,59 @@ def random_dict(dict_=None):
     if 'hess' in dict_.keys():
         hess = dict_['hess']
     else:
-        hess = np.random.choice(['bfgs', 'numdiff'])
+        hess = np.random.choice(['bfgs', 'numdiff', 'opg'])
+
+    if 'workers' in dict_.keys():
+        workers = dict_['workers']
+    else:
+        workers = np.random.randint(1, 3)
+
+    if 'multistart' in dict_.keys():
+        multistart = dict_['multistart']
+    else:
+        multistart = np.random.randint(1, 4)
+
+    if 'precision' in dict_.keys():
+        precision = dict_['precision']
+    else:
+        precision = np.random.choice(['double', 'mixed'])
+
+    if 'chunk' in dict_.keys():
+        chunk = dict_['chunk']
+    else:
+        chunk = np.random.choice([None, np.random.randint(50, 501)])
+
+    if 'cluster' in dict_.keys():
+        cluster = dict_['cluster']
+    else:
+        cluster = np.random.choice([True, False])
+
+    if 'stages' in dict_.keys():
+        stages = dict_['stages']
+    else:
+        stages = [None, [0.5], [0.25, 0.5]][np.random.randint(0, 3)]
+
+    if 'compress' in dict_.keys():
+        compress = dict_['compress']
+    else:
+        compress = np.random.choice(['true', 'false'])
 
     if 'AGENTS' in dict_.keys():
         agents = dict_['AGENTS']
     else:
-        agents = np.random.random_integers(MIN_AGENTS, MAX_AGENTS)
+        agents = np.random.randint(MIN_AGENTS, MAX_AGENTS + 1)
 
     ''' Overall
     '''
-    num_bene = np.random.random_integers(1, MAX_COEFFS)
+    num_bene = np.random.randint(1, MAX_COEFFS + 1)
 
-    num_cost = np.random.random_integers(1, MAX_COEFFS)
+    num_cost = np.random.randint(1, MAX_COEFFS + 1)
 
     num_coeffs = 2*num_bene + num_cost + 6 + 2
 
     positions = list(range(1, num_coeffs + 5))
 
-    num_sim = np.random.random_integers(MIN_AGENTS, MAX_AGENTS)
+    num_sim = np.random.randint(MIN_AGENTS, MAX_AGENTS + 1)
 
     constraints = np.random.choice(['!', ' '], size=num_coeffs).tolist()
 
@@ -109,6 +146,8 @@ def random_dict(dict_=None):
     dict_['DATA']['agents'] = agents
     dict_['DATA']['outcome'] = 0
     dict_['DATA']['treatment'] = 1
+    dict_['DATA']['chunk'] = chunk
+    dict_['DATA']['compress'] = compress
 
     ''' BENEFITS
     '''
@@ -165,6 +204,12 @@ def random_dict(dict_=None):
         val = round(np.random.ranf(), 2)
         dict_['COST']['coeff'] += [[pos, constr, val]]
 
+    # Cluster identifiers
+    if cluster:
+        cluster = positions.pop()
+    else:
+        cluster = None
+
     ''' RHO
     '''
     dict_['RHO'] = {}
@@ -189,13 +234,20 @@ def random_dict(dict_=None):
 
     dict_['ESTIMATION']['hessian'] = hess
 
-    if dict_['ESTIMATION']['algorithm'] == 'powell':
-        dict_['ESTIMATION']['hessian'] = 'numdiff'
+    if dict_['ESTIMATION']['algorithm'] in ['trust-ncg', 'powell']:
+        if dict_['ESTIMATION']['hessian'] == 'bfgs':
+            dict_['ESTIMATION']['hessian'] = 'numdiff'
 
     dict_['ESTIMATION']['alpha'] = np.random.choice([0.01, 0.05, 0.1])
-    dict_['ESTIMATION']['draws'] = np.random.random_integers(1, MAX_DRAWS)
+    dict_['ESTIMATION']['draws'] = np.random.randint(1, MAX_DRAWS + 1)
 
     dict_['ESTIMATION']['version'] = version
+    dict_['ESTIMATION']['workers'] = workers
+    dict_['ESTIMATION']['multistart'] = multistart
+    dict_['ESTIMATION']['precision'] = precision
+    dict_['ESTIMATION']['cluster'] = cluster
+    dict_['ESTIMATION']['stages'] = stages
+    dict_['ESTIMATION']['stage_tol'] = np.random.uniform(1e-6, 1e-4)
 
     ''' SIMULATION
     '''
@@ -203,7 +255,7 @@ def random_dict(dict_=None):
 
     dict_['SIMULATION']['agents'] = num_sim
 
-    dict_['SIMULATION']['seed'] = np.random.random_integers(1, 100)
+    dict_['SIMULATION']['seed'] = np.random.randint(1, 101)
 
     dict_['SIMULATION']['target'] = 'simulation.dat'
 
@@ -212,7 +264,8 @@ def random_dict(dict_=None):
     # As the criterion function is only evaluated at the starting values,
     # there is no call to the BFGS algorithm.
     if (maxiter == 0) and (dict_['ESTIMATION']['asymptotics'] == 'true'):
-        dict_['ESTIMATION']['hessian'] = 'numdiff'
+        if dict_['ESTIMATION']['hessian'] == 'bfgs':
+            dict_['ESTIMATION']['hessian'] = 'numdiff'
 
     # Finishing.    
     return dict_
@@ -233,8 +286,8 @@ def print_dict(dict_):
 
         file_.write('DATA' + '\n')
 
-        for keys_ in ['source', 'agents']:
-            file_.write(str_.format('   ' + keys_, dict_['DATA'][keys_]))
+        for keys_ in ['source', 'agents', 'chunk', 'compress']:
+            file_.write(str_.format('   ' + keys_, str(dict_['DATA'][keys_])))
 
         file_.write('\n')
 
@@ -334,8 +387,21 @@ def print_dict(dict_):
 
         file_.write('\n')
 
-        for key_ in ['draws', 'alpha', 'version']:
-            file_.write(str_.format('   ' + key_, dict_['ESTIMATION'][key_]))
+        for key_ in ['draws', 'alpha', 'version', 'workers', 'multistart',
+                     'precision', 'cluster']:
+            file_.write(str_.format('   ' + key_,
+                                    str(dict_['ESTIMATION'][key_])))
+
+        file_.write('\n')
+
+        stages = dict_['ESTIMATION']['stages']
+
+        if stages is not None:
+            stages = ','.join([str(stage) for stage in stages])
+
+        file_.write(str_.format('   ' + 'stages', str(stages)))
+        file_.write(str_.format('   ' + 'stage_tol',
+                                dict_['ESTIMATION']['stage_tol']))
 
         file_.write('\n')
 
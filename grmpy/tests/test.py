@@ -3,12 +3,16 @@
 """
 # standard library
 import signal
+import multiprocessing as mp
+import importlib
+import json
 import shutil
 import glob
 import sys
 import os
 
 import numpy as np
+import scipy.stats
 
 
 # module variables
@@ -32,6 +36,10 @@ sys.path.insert(0, dir_)
 # project library
 import grmpy
 import grmpy.tools.user as user
+import grmpy.tools.optimization as opt
+import grmpy.tools.msc as msc
+import grmpy.tools.optimization.clsMax as clsMax
+import grmpy.clsRslt as clsRslt
 import grmpy.tests.randominit as aux
 from grmpy.tests.exceptions import TimedOutError
 
@@ -178,8 +186,8 @@ class Tests(object):
 
     @staticmethod
     def test_4():
-        """ Testing if the fast and slow evaluation of the criterion function
-        result in same value.
+        """ Testing if the fast, slow, and compiled evaluation of the
+        criterion function result in same value.
         """
         # Initialize containers
         fval = None
@@ -195,8 +203,8 @@ class Tests(object):
         # Lock in simulated dataset
         grmpy.simulate('test.grmpy.ini')
 
-        # Loop over fast and slow evaluation of criterion function.
-        for version in ['fast', 'slow']:
+        # Loop over fast, slow, and compiled evaluation of criterion function.
+        for version in ['fast', 'slow', 'jit']:
 
             # Impose constraints to initialization file
             dict_['ESTIMATION']['version'] = version
@@ -225,6 +233,1215 @@ class Tests(object):
             # Generate a random initialization file.
             aux.generate_init_file()
 
+    @staticmethod
+    def test_6():
+        """ Testing if the analytic gradient of the criterion function is in
+        line with a numerical approximation.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Construct criterion function
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        # Evaluate gradient at true values
+        x = paras_obj.get_values('external', 'free')
+
+        grad = crit_obj._evaluate_gradient_analytic(x)
+
+        approx = np.zeros(len(x))
+
+        for k in range(len(x)):
+            d = np.zeros(len(x))
+            d[k] = 1e-5
+
+            upper = crit_obj.evaluate(x + d, 'function')
+            lower = crit_obj.evaluate(x - d, 'function')
+
+            approx[k] = (upper - lower) / (2.0 * d[k])
+
+        # Check result
+        assert (np.allclose(grad, approx, rtol=1e-4, atol=1e-4))
+
+    @staticmethod
+    def test_7():
+        """ Testing if the batch evaluation of the criterion function is in
+        line with the evaluation at each parametrization separately.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Construct criterion function
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        # Random parametrizations around the true values
+        x = paras_obj.get_values('external', 'free')
+
+        num_batch = np.random.randint(1, 101)
+
+        batch = x + np.random.normal(scale=0.1, size=(num_batch, len(x)))
+
+        # Evaluate criterion function
+        fvals = crit_obj.evaluate_batch(batch)
+
+        for i in range(num_batch):
+            fval = crit_obj.evaluate(batch[i, :], 'function')
+
+            assert (np.abs(fvals[i] - fval) < SMALL)
+
+    @staticmethod
+    def test_8():
+        """ Testing if the parallel evaluation of the criterion function is
+        identical to the serial one.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'workers': 2})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Construct serial and parallel criterion functions
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        serial_obj = opt.CritCls(model_obj, paras_obj)
+
+        serial_obj.lock()
+
+        pool_obj = opt.PoolCls(model_obj, paras_obj)
+
+        pool_obj.lock()
+
+        parallel_obj = opt.CritCls(model_obj, paras_obj)
+
+        parallel_obj.set_attr('pool_obj', pool_obj)
+
+        parallel_obj.lock()
+
+        # Random parametrizations around the true values
+        x = paras_obj.get_values('external', 'free')
+
+        batch = x + np.random.normal(scale=0.1, size=(50, len(x)))
+
+        # Evaluation
+        serial = [serial_obj.evaluate_batch(batch),
+                  serial_obj.evaluate(x, 'gradient')]
+
+        parallel = [parallel_obj.evaluate_batch(batch),
+                    parallel_obj.evaluate(x, 'gradient')]
+
+        parallel_obj.terminate()
+
+        # Check results
+        for i in range(2):
+            assert (np.all(serial[i] == parallel[i]))
+
+    @staticmethod
+    def test_9():
+        """ Testing if the evaluation of the criterion function in log space
+        results in the same value as the fast and slow evaluation at the true
+        parameter values.
+        """
+        # Initialize containers
+        fval = None
+
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Loop over all versions of the criterion function.
+        for version in ['fast', 'slow', 'log']:
+
+            model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+            model_obj.unlock()
+
+            model_obj.set_attr('version', version)
+
+            model_obj.lock()
+
+            crit_obj = opt.CritCls(model_obj, paras_obj)
+
+            crit_obj.lock()
+
+            # Evaluate at true values
+            x = paras_obj.get_values('external', 'free')
+
+            likl = crit_obj.evaluate(x, 'function')
+
+            # Check evaluation result
+            if fval is None:
+                fval = likl
+            else:
+                assert (np.abs(likl - fval) < SMALL)
+
+    @staticmethod
+    def test_10():
+        """ Testing if the evaluation of the criterion function and its
+        analytic gradient in chunks of agents from the binary store results in
+        the same values as the evaluation in memory. The same holds for the
+        propensity scores, the automatic starting values and the operator of
+        the prediction step, which are estimated in chunks as well.
+        """
+        # Initialize containers
+        fval, grad = None, None
+
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'chunk': None, 'starts': 'manual'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Loop over in-memory and chunked evaluation.
+        for chunk in [None, np.random.randint(1, 101)]:
+
+            dict_['DATA']['chunk'] = chunk
+
+            aux.print_dict(dict_)
+
+            model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+            crit_obj = opt.CritCls(model_obj, paras_obj)
+
+            crit_obj.lock()
+
+            # Evaluate at true values
+            x = paras_obj.get_values('external', 'free')
+
+            likl = crit_obj.evaluate(x, 'function')
+
+            deriv = crit_obj._evaluate_gradient_analytic(x)
+
+            # Check evaluation result
+            if fval is None:
+                fval, grad = likl, deriv
+            else:
+                assert (np.abs(likl - fval) < SMALL)
+                assert (np.max(np.abs(deriv - grad)) < SMALL)
+
+        # Auxiliary estimations
+        dict_['ESTIMATION']['start'] = 'auto'
+
+        rslt = dict()
+
+        for chunk in [None, np.random.randint(1, 101)]:
+
+            dict_['DATA']['chunk'] = chunk
+
+            aux.print_dict(dict_)
+
+            model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+            rslt[chunk is None] = [model_obj.get_attr('P'),
+                                   paras_obj.get_values('internal', 'all'),
+                                   paras_obj.get_attr('operator')]
+
+        for i in range(2):
+            assert (np.max(np.abs(rslt[True][i] - rslt[False][i])) < 1e-5)
+
+        if rslt[True][2] is not None:
+            assert (np.max(np.abs(rslt[True][2] - rslt[False][2])) < SMALL)
+
+        # Binary stores are not written to the current directory
+        assert (glob.glob('store.*') == [])
+
+    @staticmethod
+    def test_11():
+        """ Testing if the evaluation of the criterion function with the
+        single-precision copies of the data is close to the evaluation in
+        double precision.
+        """
+        # Initialize containers
+        fval = None
+
+        # Generate a random initialization file.
+        aux.generate_init_file({'precision': 'mixed'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        # Loop over both precisions.
+        for precision in ['double', 'single']:
+
+            crit_obj.unlock()
+
+            crit_obj.set_attr('precision', precision)
+
+            crit_obj.lock()
+
+            # Evaluate at true values
+            x = paras_obj.get_values('external', 'free')
+
+            likl = crit_obj.evaluate(x, 'function')
+
+            # Check evaluation result
+            if fval is None:
+                fval = likl
+            else:
+                assert (np.abs(likl - fval) < 1e-5)
+
+    @staticmethod
+    def test_12():
+        """ Testing if the fused evaluation of the criterion function and its
+        gradient results in the same values as the separate evaluations and
+        if repeated requests are served from the cache. The parameter object
+        needs to reflect the requested point for cache hits as well.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        x = paras_obj.get_values('external', 'free')
+
+        # Separate evaluations
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        likl = crit_obj.evaluate(x, 'function')
+
+        grad = crit_obj.evaluate(x, 'gradient')
+
+        # Fused evaluation
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        likl_fused, grad_fused = crit_obj.evaluate_fused(x)
+
+        assert (np.abs(likl - likl_fused) < SMALL)
+        assert (np.max(np.abs(grad - grad_fused)) < SMALL)
+
+        # Repeated requests
+        num_hits = crit_obj.get_attr('num_hits')
+
+        likl_fused, grad_fused = crit_obj.evaluate_fused(x)
+
+        assert (crit_obj.get_attr('num_hits') == num_hits + 2)
+        assert (np.abs(likl - likl_fused) < SMALL)
+        assert (np.max(np.abs(grad - grad_fused)) < SMALL)
+
+        # Cache hits after an evaluation at another point
+        crit_obj.evaluate_fused(x + 0.01)
+
+        crit_obj.evaluate(x, 'function')
+
+        values = paras_obj.get_values('external', 'free')
+
+        assert (np.max(np.abs(values - x)) < SMALL)
+
+        crit_obj.evaluate_fused(x + 0.01)
+
+        crit_obj.evaluate_fused(x)
+
+        values = paras_obj.get_values('external', 'free')
+
+        assert (np.max(np.abs(values - x)) < SMALL)
+
+    @staticmethod
+    def test_13():
+        """ Testing if the individual scores add up to the analytic gradient
+        and if the outer product of gradients is available for the
+        asymptotics with the POWELL algorithm.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file()
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        num_obs = model_obj.get_attr('num_obs')
+        w = model_obj.get_attr('W')
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        # Evaluate at true values
+        x = paras_obj.get_values('external', 'free')
+
+        scores = crit_obj.evaluate_scores(x)
+
+        grad = crit_obj._evaluate_gradient_analytic(x)
+
+        assert (np.max(np.abs(np.dot(w, scores) / num_obs + grad)) < SMALL)
+
+        # Estimation with the outer product of gradients
+        dict_['ESTIMATION']['algorithm'] = 'powell'
+        dict_['ESTIMATION']['maxiter'] = 1
+        dict_['ESTIMATION']['asymptotics'] = 'true'
+        dict_['ESTIMATION']['hessian'] = 'opg'
+
+        aux.print_dict(dict_)
+
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        assert (np.all(np.isfinite(rslt.get_attr('cov_mat'))))
+
+    @staticmethod
+    def test_14():
+        """ Testing if the scores are summed correctly within clusters and if
+        the cluster-robust covariance matrix agrees with a reference sandwich
+        built with an explicit loop over the clusters.
+        """
+        estimate = importlib.import_module('grmpy.estimate')
+
+        # Summation within clusters
+        num_agents = np.random.randint(1, 1001)
+
+        scores = np.random.randn(num_agents, 5)
+
+        clusters = np.random.randint(0, 21, num_agents).astype('float')
+
+        sums = estimate._get_cluster_scores(scores, clusters)
+
+        for i, cluster in enumerate(np.unique(clusters)):
+            sum_ = np.sum(scores[clusters == cluster, :], axis=0)
+            assert (np.max(np.abs(sums[i, :] - sum_)) < SMALL)
+
+        # Estimation with clustering
+        dict_ = aux.generate_init_file({'cluster': True,
+                                        'version': 'fast'})
+
+        grmpy.simulate('test.grmpy.ini')
+
+        dict_['ESTIMATION']['algorithm'] = 'powell'
+        dict_['ESTIMATION']['maxiter'] = 1
+        dict_['ESTIMATION']['asymptotics'] = 'true'
+        dict_['ESTIMATION']['hessian'] = 'opg'
+
+        aux.print_dict(dict_)
+
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        assert (np.all(np.isfinite(rslt.get_attr('cov_mat'))))
+
+        # Reference sandwich
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        x = paras_obj.get_values('external', 'free')
+
+        clusters = model_obj.get_attr('C')
+
+        num_clusters = len(np.unique(clusters))
+
+        assert (1 < num_clusters < 20)
+
+        num_obs = model_obj.get_attr('num_obs')
+        w = model_obj.get_attr('W')
+
+        scores = crit_obj.evaluate_scores(x)
+
+        bread = np.random.randn(x.shape[0], x.shape[0])
+        bread = np.dot(bread, bread.T)
+
+        meat = np.zeros(bread.shape)
+
+        for cluster in np.unique(clusters):
+            sum_ = np.zeros(x.shape[0])
+            for i in range(scores.shape[0]):
+                if clusters[i] == cluster:
+                    sum_ += w[i] * scores[i, :]
+            meat += np.outer(sum_, sum_)
+
+        meat = meat / num_obs * num_clusters / (num_clusters - 1.0)
+
+        cov_mat = estimate._add_clustering(bread, x, crit_obj, clusters)
+
+        reference = np.dot(np.dot(bread, meat), bread)
+
+        assert (np.allclose(cov_mat, reference, rtol=1e-10, atol=SMALL))
+
+    @staticmethod
+    def test_15():
+        """ Testing if the criterion function and its gradient are the same
+        with and without the compression of duplicate agents.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'starts': 'manual'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Duplicate agents
+        dataset = np.genfromtxt('simulation.dat')
+
+        num_agents = dataset.shape[0]
+
+        idx = np.random.randint(0, num_agents, size=num_agents)
+
+        np.savetxt('simulation.dat', dataset[idx, :], fmt='%15.10f')
+
+        # Evaluate at true values
+        rslt = dict()
+
+        for compress in ['true', 'false']:
+
+            dict_['DATA']['compress'] = compress
+
+            aux.print_dict(dict_)
+
+            model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+            assert (model_obj.get_attr('num_obs') == num_agents)
+
+            crit_obj = opt.CritCls(model_obj, paras_obj)
+
+            crit_obj.lock()
+
+            x = paras_obj.get_values('external', 'free')
+
+            likl = crit_obj.evaluate(x, 'function')
+
+            grad = crit_obj._evaluate_gradient_analytic(x)
+
+            rslt[compress] = (likl, grad, model_obj.get_attr('z_eval'))
+
+            crit_obj.terminate()
+
+        for i in range(3):
+            assert (np.max(np.abs(rslt['true'][i] - rslt['false'][i])) < SMALL)
+
+    @staticmethod
+    def test_16():
+        """ Testing if the subsamples are drawn correctly and if a staged
+        estimation can be handled without complaints.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'stages': [0.25, 0.5], 'maxiter': 5,
+                                        'version': 'fast'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, _, _ = user.initialize('test.grmpy.ini', True)
+
+        # Subsample
+        num_agents = model_obj.get_attr('num_agents')
+
+        sub_obj = model_obj.get_subsample(0.5)
+
+        assert (sub_obj.get_attr('num_agents') == max(int(0.5 * num_agents), 1))
+        assert (sub_obj.get_attr('common_support') ==
+                model_obj.get_attr('common_support'))
+
+        # Estimation
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        max_rslt = rslt.get_attr('max_rslt')
+
+        assert (np.all(np.isfinite(max_rslt['xopt'])))
+
+        if dict_['ESTIMATION']['maxiter'] != 0:
+            assert (len(max_rslt['nit_stages']) == 2)
+
+    @staticmethod
+    def test_17():
+        """ Testing if the best start is selected in a multistart estimation
+        and if hopeless starts are stopped.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'multistart': 3, 'maxiter': 5,
+                                        'version': 'fast', 'workers': 2,
+                                        'stages': None})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Estimation
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        max_rslt = rslt.get_attr('max_rslt')
+
+        summary = max_rslt['multistart']
+
+        assert (len(summary) == 3)
+        assert (max_rslt['fun'] == min([start['fun'] for start in summary]))
+
+        # Early stopping
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        max_obj = opt.MaxCls(model_obj, paras_obj)
+
+        max_obj.lock()
+
+        best = mp.Value('d', -np.inf)
+
+        callback = max_obj._get_callback(best)
+
+        x = paras_obj.get_values('external', 'free')
+
+        for _ in range(clsMax.MULTISTART_PROBE - 1):
+            callback(x)
+
+        try:
+            callback(x)
+            raise AssertionError
+        except clsMax._HopelessStart as stop:
+            assert (stop.args[2] == clsMax.MULTISTART_PROBE)
+
+        max_obj.get_attr('crit_func').terminate()
+
+    @staticmethod
+    def test_18():
+        """ Testing if the product of the Hessian with a direction matches
+        a central difference of the gradient and if all optimizers in the
+        registry run.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'maxiter': 2, 'multistart': 1,
+                                        'version': 'fast', 'workers': 1,
+                                        'stages': None,
+                                        'differences': 'analytic',
+                                        'precision': 'double'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Product of the Hessian with a direction
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        x = paras_obj.get_values('external', 'free')
+
+        p = np.random.randn(x.shape[0])
+
+        upper = crit_obj.evaluate(x + 1e-5 * p, 'gradient')
+        lower = crit_obj.evaluate(x - 1e-5 * p, 'gradient')
+
+        hessp = crit_obj.evaluate_hessp(x, p)
+
+        assert (np.allclose(hessp, (upper - lower) / 2e-5, rtol=1e-3,
+                            atol=1e-3))
+
+        assert (np.all(crit_obj.evaluate_hessp(x, 0.0 * p) == 0.0))
+
+        # Bounds
+        assert (len(paras_obj.get_bounds()) == x.shape[0])
+
+        # Estimation with each optimizer
+        for optimizer in sorted(opt.OPTIMIZERS.keys()):
+
+            dict_['ESTIMATION']['algorithm'] = optimizer
+            dict_['ESTIMATION']['hessian'] = 'numdiff'
+
+            aux.print_dict(dict_)
+
+            rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+            max_rslt = rslt.get_attr('max_rslt')
+
+            assert (np.all(np.isfinite(max_rslt['xopt'])))
+            assert (np.isfinite(max_rslt['fun']))
+
+    @staticmethod
+    def test_19():
+        """ Testing if the checkpoints record the state of the BFGS
+        algorithm and if a resumed estimation continues from the latest one.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'maxiter': 3, 'multistart': 1,
+                                        'version': 'fast', 'workers': 1,
+                                        'stages': None, 'optimizer': 'bfgs',
+                                        'precision': 'double',
+                                        'asymptotics': 'true',
+                                        'hess': 'bfgs'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Estimation
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        max_rslt = rslt.get_attr('max_rslt')
+
+        checkpoint = msc.read_checkpoint()
+
+        assert (not os.path.exists(msc.CHECKPOINT + '.tmp'))
+
+        assert (checkpoint['nit'] == max_rslt['nit'])
+        assert (np.all(checkpoint['x'] == max_rslt['xopt']))
+
+        if max_rslt['nit'] == 3:
+            assert (np.allclose(checkpoint['hess_inv'], max_rslt['covMat']))
+
+        # Resumed estimation
+        dict_['ESTIMATION']['maxiter'] = 5
+
+        aux.print_dict(dict_)
+
+        rslt = grmpy.estimate('test.grmpy.ini', resume=True,
+                              use_simulation=True)
+
+        max_rslt = rslt.get_attr('max_rslt')
+
+        assert (max_rslt['nit'] <= 5)
+        assert (max_rslt['nit'] == msc.read_checkpoint()['nit'])
+        assert (np.all(np.isfinite(max_rslt['xopt'])))
+
+    @staticmethod
+    def test_20():
+        """ Testing if the telemetry callbacks receive the iterations and
+        evaluations of the maximization and if they are written to file.
+        """
+        # Generate a random initialization file.
+        dict_ = aux.generate_init_file({'maxiter': 3, 'multistart': 1,
+                                        'workers': 1, 'stages': None,
+                                        'version': 'fast'})
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        # Estimation
+        events = []
+
+        rslt = grmpy.estimate('test.grmpy.ini', use_simulation=True,
+                              callbacks=[events.append])
+
+        max_rslt = rslt.get_attr('max_rslt')
+
+        # Events
+        types = [event['event'] for event in events]
+
+        assert ('evaluation' in types)
+
+        if max_rslt['nit'] > 0:
+            assert ('iteration' in types)
+
+        num_evals = [event['num_function'] + event['num_gradient']
+                     for event in events if event['event'] == 'evaluation']
+
+        assert (num_evals == list(range(1, len(num_evals) + 1)))
+
+        elapsed = [event['elapsed'] for event in events]
+
+        assert (elapsed == sorted(elapsed))
+
+        # Telemetry file
+        with open(msc.get_telemetry_name(), 'r') as file_:
+            lines = [json.loads(line) for line in file_]
+
+        assert (len(lines) == len(events))
+
+    @staticmethod
+    def test_21():
+        """ Testing if the profiles of the simulation and the estimation are
+        written to file.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'maxiter': 2, 'multistart': 1,
+                                'stages': None})
+
+        # Simulation and estimation
+        grmpy.simulate('test.grmpy.ini', profile=True)
+
+        grmpy.estimate('test.grmpy.ini', use_simulation=True, profile=True)
+
+        # Profiles
+        for name in ['simulate', 'estimate']:
+
+            assert (os.path.exists(name + '.profile.grmpy.out'))
+
+            with open(name + '.trace.grmpy.json', 'r') as file_:
+                events = json.load(file_)['traceEvents']
+
+            names = [event['name'] for event in events]
+
+            assert ('initialize' in names)
+            assert ('process_input' in names)
+
+            for event in events:
+                assert (event['dur'] >= 0.0)
+                assert (event['args']['cpu'] >= 0.0)
+
+        # Stages are not recorded without profiling
+        with msc.stage('initialize'):
+            pass
+
+    @staticmethod
+    def test_22():
+        """ Testing if the parameter objects are views on the values of the
+        parameter class and if the batch transformation matches the update of
+        the parameters.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        grmpy.simulate('test.grmpy.ini')
+
+        _, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        # Views
+        paras = paras_obj.get_values('internal', 'all')
+
+        for count in range(paras_obj.get_attr('num_paras')):
+            para_obj = paras_obj.get_parameter(count)
+            assert (para_obj.get_attr('value') == paras[count])
+
+        for type_, subgroup in paras_obj.get_attr('groups').keys():
+            para_objs = paras_obj.get_parameters(type_, subgroup, is_obj=True)
+            values = paras_obj.get_parameters(type_, subgroup)
+
+            if not isinstance(para_objs, list):
+                para_objs = [para_objs]
+
+            values = np.atleast_1d(values)
+
+            for para_obj, value in zip(para_objs, values):
+                assert (para_obj.get_attr('value') == value)
+
+        # Batch transformation
+        x = paras_obj.get_values('external', 'free')
+
+        x = x + np.random.randn(3, len(x))
+
+        batch = paras_obj.get_values_batch(x)
+
+        for i in range(3):
+            paras_obj.update(x[i, :], 'external', 'free')
+            paras = paras_obj.get_values('internal', 'all')
+            assert (np.all(batch[i, :] == paras))
+
+    @staticmethod
+    def test_23():
+        """ Testing if the structural parameters from the compiled evaluation
+        plan match the parameter groups.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        grmpy.simulate('test.grmpy.ini')
+
+        _, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        x = paras_obj.get_values('external', 'free')
+
+        paras_obj.update(x + 0.1 * np.random.randn(len(x)), 'external', 'free')
+
+        structural = paras_obj.get_structural()
+
+        # Simple groups
+        for subgroup in ['treated', 'untreated']:
+            assert (np.all(structural['outc_' + subgroup] ==
+                           paras_obj.get_parameters('outc', subgroup)))
+
+        for key_, (type_, subgroup) in [('sd_u1', ('sd', 'U1')),
+                                        ('sd_u0', ('sd', 'U0')),
+                                        ('sd_v', ('sd', 'V')),
+                                        ('var_v', ('var', 'V')),
+                                        ('rho_u1_v', ('rho', 'U1,V')),
+                                        ('rho_u0_v', ('rho', 'U0,V'))]:
+            assert (structural[key_] ==
+                    paras_obj.get_parameters(type_, subgroup))
+
+        # Choice coefficients
+        num_covars_excl_cost = paras_obj.get_attr('num_covars_excl_cost')
+        num_covars_excl_bene_ex_ante = \
+            paras_obj.get_attr('num_covars_excl_bene_ex_ante')
+
+        coeffs_bene = np.concatenate(
+            (paras_obj.get_parameters('bene', 'exAnte'),
+             np.zeros(num_covars_excl_cost)))
+        coeffs_cost = np.concatenate(
+            (np.zeros(num_covars_excl_bene_ex_ante),
+             paras_obj.get_parameters('cost', None)))
+
+        assert (np.all(structural['coeffs_choc'] ==
+                       coeffs_bene - coeffs_cost))
+
+        # Batch of parametrizations
+        paras = paras_obj.get_values('internal', 'all')[None, :]
+
+        rslt = opt.CritCls._get_parameters_batch(paras_obj, paras)
+
+        np.testing.assert_allclose(rslt['choice'][0, :],
+                                   structural['coeffs_choc'], rtol=1e-10,
+                                   atol=1e-10)
+
+    @staticmethod
+    def test_24():
+        """ Testing if the batch transformation of the draws of external values
+        matches the update of the parameters, including draws that are
+        clipped at the bounds.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        grmpy.simulate('test.grmpy.ini')
+
+        _, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        x = paras_obj.get_values('external', 'free')
+
+        draws = x + 50.0 * np.random.randn(20, len(x))
+
+        batch = paras_obj.get_values_batch(draws)
+
+        # Fixed parameters
+        is_free = np.array([para_obj.get_attr('is_free') for para_obj in
+                            paras_obj.get_attr('para_objs')])
+
+        assert (np.all(batch[:, ~ is_free] ==
+                       paras_obj.get_values('internal', 'all')[~ is_free]))
+
+        # Draws
+        for i in range(20):
+            paras_obj.update(draws[i, :], 'external', 'free')
+            paras = paras_obj.get_values('internal', 'all')
+
+            assert (np.all(batch[i, :] == paras))
+
+    @staticmethod
+    def test_25():
+        """ Testing if the operator of the prediction step matches the
+        weighted projection of the ex post on the ex ante benefit covariates.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file()
+
+        grmpy.simulate('test.grmpy.ini')
+
+        _, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        if paras_obj.get_attr('without_prediction'):
+            assert (paras_obj.get_attr('operator') is None)
+            return
+
+        # Projection by the normal equations
+        x_ex_post = paras_obj.get_attr('X_ex_post')
+        x_ex_ante = paras_obj.get_attr('X_ex_ante')
+        w = paras_obj.get_attr('W')
+
+        x_ex_ante_w = x_ex_ante.T * w
+
+        pinv = np.linalg.pinv(np.dot(x_ex_ante_w, x_ex_ante))
+
+        idx_bene = np.dot(x_ex_post, paras_obj.get_parameters('bene', 'exPost'))
+
+        coeffs_bene_ex_ante = np.dot(pinv, np.dot(x_ex_ante_w, idx_bene))
+
+        np.testing.assert_allclose(paras_obj.get_parameters('bene', 'exAnte'),
+                                   coeffs_bene_ex_ante, rtol=1e-7, atol=1e-7)
+
+    @staticmethod
+    def test_26():
+        """ Testing if the quantiles of the draws along the first axis match
+        the quantiles of each column.
+        """
+        for num_draws in [1, 2, np.random.randint(3, 1001)]:
+
+            alpha = np.random.uniform(0.01, 0.5)
+
+            prob = [alpha * 0.5, 1.0 - alpha * 0.5]
+
+            values = np.random.randn(num_draws, 10)
+
+            rslt = clsRslt._get_quantiles(values, prob)
+
+            for j in range(10):
+                quantiles = scipy.stats.mstats.mquantiles(values[:, j],
+                                                          prob=prob)
+
+                assert (np.all(rslt[:, j] == quantiles))
+
+    @staticmethod
+    def test_27():
+        """ Testing if the marginal effects of treatment for a batch of
+        parametrizations match the effects for each parametrization.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'maxiter': 0, 'asymptotics': 'false'})
+
+        grmpy.simulate('test.grmpy.ini')
+
+        rslt_obj = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        # Batch of parametrizations
+        x = paras_obj.get_values('external', 'free')
+
+        values = paras_obj.get_values_batch(x + np.random.randn(5, len(x)))
+
+        batch = rslt_obj._construct_marginal_effects(model_obj, paras_obj,
+                                                     values)
+
+        for i in range(5):
+            rslt = rslt_obj._construct_marginal_effects(model_obj, paras_obj,
+                                                        values[i, :])
+
+            for parameter in ['bmte_ex_post', 'smte_ex_ante', 'cmte_ex_ante']:
+                np.testing.assert_allclose(batch[parameter][i, :],
+                                           rslt[parameter], rtol=1e-10,
+                                           atol=1e-10)
+
+        # Smoothness of the curve
+        rslt = rslt_obj._construct_marginal_effects(model_obj, paras_obj,
+                                                    values[0, :])
+
+        assert (np.all(np.diff(rslt['smte_ex_ante']) < 0.0))
+
+    @staticmethod
+    def test_28():
+        """ Testing if the quantiles and p values from the blocks of draws
+        match the quantiles and p values of all draws at once.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'maxiter': 0, 'asymptotics': 'false'})
+
+        grmpy.simulate('test.grmpy.ini')
+
+        rslt_obj = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        # Distribution of the draws
+        rslt_obj.attr['model_obj'] = model_obj
+        rslt_obj.attr['paras_obj'] = paras_obj
+
+        num_draws = np.random.randint(50, 501)
+
+        model_obj.attr['num_draws'] = num_draws
+        model_obj.attr['workers'] = np.random.randint(1, 3)
+
+        mean = paras_obj.get_values('external', 'free')
+        cov = np.diag(np.random.uniform(0.01, 0.1, len(mean)))
+
+        alpha = np.random.uniform(0.01, 0.5)
+
+        prob = [alpha * 0.5, 1.0 - alpha * 0.5]
+
+        # Blocks of draws
+        block_size = np.random.randint(10, 51)
+
+        quantiles, pvalues = rslt_obj._simulate(mean, cov, prob, block_size)
+
+        # All draws at once
+        num_blocks = int(np.ceil(num_draws / float(block_size)))
+
+        stats = np.concatenate([rslt_obj._simulate_block(
+            block, mean, cov, block_size) for block in range(num_blocks)])
+
+        assert (stats.shape[0] == num_draws)
+
+        assert (np.all(quantiles == clsRslt._get_quantiles(stats, prob)))
+
+        num_paras = paras_obj.get_attr('num_paras')
+        estimates = paras_obj.get_values('internal', 'all')
+
+        assert (np.all(pvalues == np.sum(np.sign(stats[:, :num_paras]) !=
+                                         np.sign(estimates), axis=0) /
+                       float(num_draws)))
+
+    @staticmethod
+    def test_29():
+        """ Testing if the gradient in single precision is close to the
+        gradient in double precision for the default step size of the finite
+        differences.
+        """
+        # Generate a random initialization file.
+        differences = np.random.choice(['one-sided', 'two-sided'])
+
+        dict_ = aux.generate_init_file({'precision': 'mixed',
+                                        'differences': differences})
+
+        dict_['ESTIMATION']['epsilon'] = 1.4901161193847656e-08
+
+        aux.print_dict(dict_)
+
+        # Simulation
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        x = paras_obj.get_values('external', 'free')
+
+        x = x + 0.1 * np.random.randn(len(x))
+
+        # Gradients in both precisions
+        grads = []
+
+        for precision in ['double', 'single']:
+
+            crit_obj.unlock()
+
+            crit_obj.set_attr('precision', precision)
+
+            crit_obj.lock()
+
+            grads += [crit_obj.evaluate(x, 'gradient')]
+
+        # Reference, the analytic gradient in double precision
+        crit_obj.unlock()
+
+        crit_obj.set_attr('precision', 'double')
+
+        crit_obj.lock()
+
+        grad = crit_obj._evaluate_gradient_analytic(x)
+
+        np.testing.assert_allclose(grads[1], grad, rtol=1e-3, atol=1e-4)
+        np.testing.assert_allclose(grads[0], grad, rtol=1e-3, atol=1e-4)
+
+    @staticmethod
+    def test_30():
+        """ Testing if the quantiles from several blocks of draws of the
+        default size match the quantiles of all draws at once.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'maxiter': 0, 'asymptotics': 'false'})
+
+        grmpy.simulate('test.grmpy.ini')
+
+        rslt_obj = grmpy.estimate('test.grmpy.ini', use_simulation=True)
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        # Distribution of the draws
+        rslt_obj.attr['model_obj'] = model_obj
+        rslt_obj.attr['paras_obj'] = paras_obj
+
+        block_size = clsRslt.BLOCK_SIZE
+
+        num_draws = np.random.randint(block_size + 1, 3 * block_size + 1)
+
+        model_obj.attr['num_draws'] = num_draws
+        model_obj.attr['workers'] = 1
+
+        mean = paras_obj.get_values('external', 'free')
+        cov = np.diag(np.random.uniform(0.01, 0.1, len(mean)))
+
+        alpha = np.random.uniform(0.01, 0.5)
+
+        prob = [alpha * 0.5, 1.0 - alpha * 0.5]
+
+        # Blocks of draws
+        quantiles, _ = rslt_obj._simulate(mean, cov, prob)
+
+        # All draws at once
+        num_blocks = int(np.ceil(num_draws / float(block_size)))
+
+        assert (num_blocks > 1)
+
+        stats = np.concatenate([rslt_obj._simulate_block(
+            block, mean, cov, block_size) for block in range(num_blocks)])
+
+        assert (stats.shape[0] == num_draws)
+
+        assert (np.all(quantiles == clsRslt._get_quantiles(stats, prob)))
+
+    @staticmethod
+    def test_31():
+        """ Testing if the blocks of treated and untreated agents match the
+        original data and if the individual scores are returned in the order
+        of the agents in the dataset.
+        """
+        # Generate a random initialization file.
+        aux.generate_init_file({'compress': 'false'})
+
+        grmpy.simulate('test.grmpy.ini')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        # Partition
+        d = model_obj.get_attr('D')
+
+        idx = []
+
+        for subgroup in ['treated', 'untreated']:
+
+            for precision in ['double', 'single']:
+
+                if (precision == 'single') and \
+                        (model_obj.get_attr('partition_single') is None):
+                    continue
+
+                block = dict()
+
+                for block_ in model_obj.get_blocks(subgroup, precision):
+                    for type_ in block_.keys():
+                        block.setdefault(type_, []).append(block_[type_])
+
+                block = dict((type_, np.concatenate(block[type_]))
+                             for type_ in block.keys())
+
+                assert (np.all(np.diff(block['idx']) > 0))
+                assert (np.all(d[block['idx']] == (subgroup == 'treated')))
+
+                for type_ in ['Y', 'X_ex_post', 'Z', 'W']:
+
+                    original = model_obj.get_attr(type_)[block['idx']]
+
+                    if (precision == 'single') and (type_ != 'W'):
+                        original = original.astype('float32')
+
+                    assert (np.all(block[type_] == original))
+
+            idx += [block['idx']]
+
+        assert (np.all(np.sort(np.concatenate(idx)) ==
+                       np.arange(model_obj.get_attr('num_agents'))))
+
+        # Order of the individual scores
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        x = paras_obj.get_values('external', 'free')
+
+        scores = crit_obj.evaluate_scores(x)
+
+        dataset = np.genfromtxt('simulation.dat')
+
+        np.savetxt('simulation.dat', dataset[::-1, :], fmt='%15.10f')
+
+        model_obj, paras_obj, _ = user.initialize('test.grmpy.ini', True)
+
+        crit_obj = opt.CritCls(model_obj, paras_obj)
+
+        crit_obj.lock()
+
+        assert (np.allclose(crit_obj.evaluate_scores(x), scores[::-1, :],
+                            rtol=1e-10, atol=SMALL))
+
 
 if __name__ == '__main__':
     runmodule()
@@ -1 +1,5 @@
-from grmpy.tools.msc.shared import update_parameters, create_matrices
+from grmpy.tools.msc.shared import update_parameters, create_matrices, \
+    create_stores, read_checkpoint, write_checkpoint, write_event, \
+    open_telemetry, get_telemetry_name, fit_least_squares, fit_probit, \
+    CHECKPOINT, TELEMETRY
+from grmpy.tools.msc.profiling import start_profiling, stop_profiling, stage
@@ -0,0 +1,170 @@
+""" This module contains the profiling of the stages of the estimation and the
+    simulation. The stages are recorded only while profiling is active, so
+    the instrumentation is free otherwise. The peak resident set size is not
+    available without the RESOURCE package.
+"""
+
+# standard library
+import contextlib
+import json
+import time
+import sys
+import os
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# module variables
+_RECORDS = None
+
+_ORIGIN = None
+
+_DEPTH = 0
+
+
+def start_profiling():
+    """ Start recording the stages.
+    """
+    global _RECORDS, _ORIGIN, _DEPTH
+
+    _RECORDS, _ORIGIN, _DEPTH = [], time.time(), 0
+
+
+def stop_profiling(name):
+    """ Stop recording the stages and write the report and the trace of the
+        stages to file.
+    """
+    global _RECORDS
+
+    # Antibugging
+    assert (_RECORDS is not None)
+    assert (isinstance(name, str))
+
+    # Distribute records
+    records, _RECORDS = _RECORDS, None
+
+    # Write report and trace
+    _write_report(records, name + '.profile.grmpy.out')
+
+    _write_trace(records, name + '.trace.grmpy.json')
+
+    # Finishing
+    return records
+
+
+@contextlib.contextmanager
+def stage(name):
+    """ Record the wall time, the CPU time, and the peak resident set size of
+        a stage. The times do not include the workers of a pool.
+    """
+    global _DEPTH
+
+    # Profiling inactive
+    if _RECORDS is None:
+        yield
+        return
+
+    # Start of stage
+    start_wall, start_cpu = time.time(), time.process_time()
+
+    depth, _DEPTH = _DEPTH, _DEPTH + 1
+
+    try:
+        yield
+
+    finally:
+        _DEPTH = depth
+
+        # Record stage, which is appended once it is completed. The report
+        # lists the stages by their start.
+        record = dict()
+        record['name'] = name
+        record['depth'] = depth
+        record['start'] = start_wall - _ORIGIN
+        record['wall'] = time.time() - start_wall
+        record['cpu'] = time.process_time() - start_cpu
+        record['peak_rss'] = _get_peak_rss()
+
+        _RECORDS.append(record)
+
+
+''' Auxiliary functions
+'''
+
+
+def _get_peak_rss():
+    """ Get the peak resident set size of the process in megabytes.
+    """
+    if resource is None:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # The size is reported in bytes on MacOS and in kilobytes otherwise.
+    if sys.platform == 'darwin':
+        peak_rss = peak_rss / 1024.0
+
+    # Finishing
+    return peak_rss / 1024.0
+
+
+def _write_report(records, file_name):
+    """ Write the table of the stages to file.
+    """
+    # Order by start
+    records = sorted(records, key=lambda record: record['start'])
+
+    with open(file_name, 'w') as file_:
+
+        file_.write('''\n PROFILE \n\n''')
+
+        str_ = '  {0:<35} {1:>12} {2:>12} {3:>15}\n'
+
+        file_.write(str_.format('Stage', 'Wall (s)', 'CPU (s)',
+                                'Peak RSS (MB)'))
+
+        file_.write('\n')
+
+        for record in records:
+
+            name = '  ' * record['depth'] + record['name']
+
+            peak_rss = 'None'
+
+            if record['peak_rss'] is not None:
+                peak_rss = '{:15.1f}'.format(record['peak_rss'])
+
+            file_.write(str_.format(name, '{:12.3f}'.format(record['wall']),
+                                    '{:12.3f}'.format(record['cpu']),
+                                    peak_rss))
+
+        file_.write('\n\n')
+
+
+def _write_trace(records, file_name):
+    """ Write the stages to file in the trace event format of CHROME, with
+        all times in microseconds.
+    """
+    # Construct events
+    events = []
+
+    for record in records:
+        event = dict()
+        event['name'] = record['name']
+        event['ph'] = 'X'
+        event['ts'] = record['start'] * 1e6
+        event['dur'] = record['wall'] * 1e6
+        event['pid'] = os.getpid()
+        event['tid'] = 0
+
+        event['args'] = dict()
+        event['args']['cpu'] = record['cpu']
+        event['args']['peak_rss'] = record['peak_rss']
+
+        events.append(event)
+
+    # Write trace
+    with open(file_name, 'w') as file_:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file_)
@@ -2,11 +2,23 @@
 """
 
 # standard library
+import pickle as pkl
+import tempfile
 import shlex
+import json
 import os
 
+from scipy.special import log_ndtr
+from scipy.stats import norm
 import numpy as np
 
+# module variables
+CHECKPOINT = 'checkpoint.grmpy.pkl'
+
+TELEMETRY = 'telemetry.{}.grmpy.jsonl'
+
+MAX_NEWTON = 100
+
 
 def update_parameters(paras_obj):
     """ Update parameter object if possible.
@@ -50,10 +62,245 @@ def update_parameters(paras_obj):
     return paras_obj
 
 
-def create_matrices(dataset, init_dict):
-    """ Create the data matrices.
+def read_checkpoint():
+    """ Read the latest checkpoint of the maximization, if any.
+    """
+    # Check presence
+    if not os.path.isfile(CHECKPOINT):
+        return None
+
+    # Read checkpoint
+    with open(CHECKPOINT, 'rb') as file_:
+        checkpoint = pkl.load(file_)
+
+    # Finishing
+    return checkpoint
+
+
+def write_checkpoint(checkpoint):
+    """ Write a checkpoint of the maximization. The checkpoint replaces the
+        previous one only once it is completely written, so a run that is
+        killed in between leaves the previous checkpoint intact.
+    """
+    # Antibugging
+    assert (isinstance(checkpoint, dict))
+
+    # Write to a temporary file
+    file_name = CHECKPOINT + '.tmp'
+
+    with open(file_name, 'wb') as file_:
+        pkl.dump(checkpoint, file_)
+
+        file_.flush()
+
+        os.fsync(file_.fileno())
+
+    # Replace previous checkpoint
+    os.replace(file_name, CHECKPOINT)
+
+
+def get_telemetry_name():
+    """ Get the name of the telemetry file of the run. The name contains the
+        identifier of the process, so concurrent runs in the same directory
+        write to separate files.
+    """
+    return TELEMETRY.format(os.getpid())
+
+
+def open_telemetry():
+    """ Open the telemetry file of the run. The file is kept open for the
+        whole run and is line buffered, so each event is written at once and
+        the file can be followed while the estimation is running.
+    """
+    return open(get_telemetry_name(), 'a', buffering=1)
+
+
+def write_event(file_, event):
+    """ Append an event of the maximization to the telemetry file. Each
+        event is written as a single line in JSON format.
+    """
+    # Antibugging
+    assert (isinstance(event, dict))
+
+    # Write event
+    file_.write(json.dumps(event) + '\n')
+
+
+def create_matrices(dataset, init_dict, chunk=None):
+    """ Create the data matrices. If a chunk size is specified, the matrices
+        are constructed in chunks of rows and written to the binary store.
     """
-    # Antibugging 
+    # Antibugging
+    assert (isinstance(init_dict, dict))
+    assert (isinstance(dataset, np.ndarray))
+    assert (dataset.dtype == 'float')
+    assert (dataset.ndim == 2)
+
+    if chunk is not None:
+        assert (isinstance(chunk, int))
+        assert (chunk > 0)
+
+    # Construct matrices
+    if chunk is None:
+        return _create_matrices(dataset, init_dict)
+
+    num_agents = dataset.shape[0]
+
+    chunks = (_create_matrices(dataset[start:start + chunk, :], init_dict)
+              for start in range(0, num_agents, chunk))
+
+    rslt = create_stores(chunks)
+
+    # Finishing
+    return rslt
+
+
+def create_stores(chunks):
+    """ Write a sequence of dictionaries with chunks of rows to the binary
+        store. The arrays for each key are then opened as memory-mapped
+        arrays. Each store is a temporary file with a unique name, which is
+        removed once it is mapped. The disk space is released with the last
+        reference to the array.
+    """
+    # Initialize containers
+    files, shapes, dtypes = dict(), dict(), dict()
+
+    # Write chunks to files
+    for chunk in chunks:
+
+        for key_ in chunk.keys():
+
+            array = np.ascontiguousarray(chunk[key_])
+
+            if key_ not in files.keys():
+                files[key_] = tempfile.NamedTemporaryFile(
+                    prefix='store.' + key_ + '.', suffix='.grmpy.bin',
+                    delete=False)
+                shapes[key_] = [0] + list(array.shape[1:])
+                dtypes[key_] = array.dtype
+
+            array.tofile(files[key_])
+
+            shapes[key_][0] += array.shape[0]
+
+    # Open stores
+    rslt = dict()
+
+    for key_ in files.keys():
+
+        files[key_].close()
+
+        shape = tuple(shapes[key_])
+
+        if shape[0] == 0:
+            rslt[key_] = np.empty(shape, dtype=dtypes[key_])
+        else:
+            rslt[key_] = np.memmap(files[key_].name, dtype=dtypes[key_],
+                                   mode='r', shape=shape)
+
+        os.remove(files[key_].name)
+
+    # Finishing
+    return rslt
+
+
+def fit_least_squares(x, y, w, chunk=None):
+    """ Weighted least-squares coefficients of y on x. The coefficients are
+        obtained from an orthogonal factorization of the covariates rather
+        than the normal equations. The factorization is updated in chunks of
+        rows, so only a single chunk is held in memory at a time.
+    """
+    # Antibugging
+    assert (x.ndim == 2)
+    assert (y.shape[0] == x.shape[0])
+    assert (w.shape == (x.shape[0],))
+
+    num_rows, num_covars = x.shape
+
+    if chunk is None:
+        chunk = max(num_rows, 1)
+
+    # Update factorization
+    r = np.zeros((0, num_covars))
+    qtb = np.zeros((0,) + y.shape[1:])
+
+    for start in range(0, num_rows, chunk):
+
+        root = np.sqrt(w[start:start + chunk])
+
+        a = np.concatenate((r, x[start:start + chunk] * root[:, None]))
+        b = np.concatenate((qtb, (y[start:start + chunk].T * root).T))
+
+        q, r = np.linalg.qr(a)
+
+        qtb = np.dot(q.T, b)
+
+    # Coefficients, which are unique up to collinear covariates
+    rslt = np.linalg.lstsq(r, qtb, rcond=None)[0]
+
+    # Quality checks
+    assert (np.all(np.isfinite(rslt)))
+    assert (rslt.shape == (num_covars,) + y.shape[1:])
+
+    # Finishing
+    return rslt
+
+
+def fit_probit(d, z, w, chunk=None):
+    """ Maximum likelihood estimation of a probit model weighted by the
+        frequency of the agents. The gradient and the Hessian of the
+        log-likelihood are accumulated over chunks of rows for each Newton
+        step, so only a single chunk is held in memory at a time.
+    """
+    # Antibugging
+    assert (z.ndim == 2)
+    assert (d.shape == (z.shape[0],))
+    assert (w.shape == (z.shape[0],))
+
+    num_rows, num_covars = z.shape
+
+    if chunk is None:
+        chunk = max(num_rows, 1)
+
+    # Newton steps, the log-likelihood is globally concave
+    rslt = np.zeros(num_covars)
+
+    for _ in range(MAX_NEWTON):
+
+        grad = np.zeros(num_covars)
+        hess = np.zeros((num_covars, num_covars))
+
+        for start in range(0, num_rows, chunk):
+
+            z_, w_ = z[start:start + chunk], w[start:start + chunk]
+
+            sign = 2.0 * d[start:start + chunk] - 1.0
+
+            indices = sign * np.dot(z_, rslt)
+
+            mills = np.exp(norm.logpdf(indices) - log_ndtr(indices))
+
+            grad += np.dot(w_ * sign * mills, z_)
+            hess += np.dot(z_.T * (w_ * mills * (mills + indices)), z_)
+
+        step = np.linalg.lstsq(hess, grad, rcond=None)[0]
+
+        rslt = rslt + step
+
+        if np.max(np.abs(step)) < 1e-10:
+            break
+
+    # Quality checks
+    assert (np.all(np.isfinite(rslt)))
+
+    # Finishing
+    return rslt
+
+
+def _create_matrices(dataset, init_dict):
+    """ Create the data matrices in memory.
+    """
+    # Antibugging
     assert (isinstance(init_dict, dict))
     assert (isinstance(dataset, np.ndarray))
     assert (dataset.dtype == 'float')
@@ -66,6 +313,7 @@ def create_matrices(dataset, init_dict):
     excl_bene_ex_ante = init_dict['DERIV']['excl_bene']['ex_ante']['pos']
     excl_bene_ex_post = init_dict['DERIV']['excl_bene']['ex_post']['pos']
     excl_cost = init_dict['DERIV']['excl_cost']['pos']
+    cluster = init_dict['ESTIMATION']['cluster']
 
     # Construct auxiliary information 
     num_agents = dataset.shape[0]
@@ -97,5 +345,8 @@ def create_matrices(dataset, init_dict):
     rslt['G'], rslt['Z'] = g, z
     rslt['X_ex_post'], rslt['X_ex_ante'] = x_ex_post, x_ex_ante
 
+    if cluster is not None:
+        rslt['C'] = dataset[:, cluster]
+
     # Finishing.
     return rslt
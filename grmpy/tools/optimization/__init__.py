@@ -1,5 +1,11 @@
 from grmpy.tools.optimization.wrappers import scipy_wrapper_function
 from grmpy.tools.optimization.wrappers import scipy_wrapper_gradient
+from grmpy.tools.optimization.wrappers import scipy_wrapper_fused
+from grmpy.tools.optimization.wrappers import scipy_wrapper_hessp
+from grmpy.tools.optimization.wrappers import scipy_wrapper_scaled
+
+from grmpy.tools.optimization.optimizers import OPTIMIZERS
 
 from grmpy.tools.optimization.clsCrit import CritCls
 from grmpy.tools.optimization.clsMax import MaxCls
+from grmpy.tools.optimization.clsPool import PoolCls
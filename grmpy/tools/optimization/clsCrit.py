@@ -1,6 +1,11 @@
 """ This module contains the criterion function of the GRMPY package.
 """
 # standard library
+from collections import OrderedDict
+import time
+
+from scipy.special import log_ndtr
+from scipy.special import ndtr
 from scipy.stats import norm
 import numpy as np
 
@@ -8,6 +13,18 @@ import numpy as np
 from grmpy.clsMeta import MetaCls
 from grmpy.clsModel import ModelCls
 from grmpy.clsParas import ParasCls
+from grmpy.tools.optimization import compiled
+
+# module variables
+BATCH_SIZE = 8
+
+CACHE_SIZE = 8
+
+LOG_SQRT_TWO_PI = 0.5 * np.log(2.0 * np.pi)
+
+SQRT_TWO_PI = np.sqrt(2.0 * np.pi)
+
+DTYPES = {'double': 'float64', 'single': 'float32'}
 
 
 class CritCls(MetaCls):
@@ -24,6 +41,27 @@ class CritCls(MetaCls):
         self.attr['model_obj'] = model_obj
         self.attr['paras_obj'] = paras_obj
 
+        # Pool of workers for the parallel evaluation of batches
+        self.attr['pool_obj'] = None
+
+        # Precision of the data in the evaluation of the criterion function
+        self.attr['precision'] = 'double'
+
+        # Cache of recent evaluations
+        self.attr['cache'] = OrderedDict()
+        self.attr['num_hits'] = 0
+        self.attr['num_misses'] = 0
+
+        # Evaluation counters
+        self.attr['num_function'] = 0
+        self.attr['num_gradient'] = 0
+        self.attr['num_batch'] = 0
+        self.attr['time_evaluation'] = 0.0
+
+        # Telemetry, the callbacks receive an event for each evaluation
+        self.attr['callbacks'] = []
+        self.attr['start'] = time.time()
+
         # Status
         self.is_locked = False
 
@@ -46,18 +84,387 @@ class CritCls(MetaCls):
     def evaluate(self, x, type_):
         """ Wrapper for function evaluate.
         """
-        rslt = None
+        # Recent evaluations, the parameter object always reflects the
+        # requested point.
+        rslt = self._get_cache(x, type_)
+
+        if rslt is not None:
+            self.update(x)
+            return rslt
+
+        start = time.time()
+
         if type_ == 'function':
             rslt = self._evaluate_function(x)
+        elif type_ == 'gradient' and self._is_analytic():
+            rslt = self._evaluate_gradient_analytic(x)
         elif type_ == 'gradient':
             rslt = self._evaluate_gradient(x)
 
+        self._set_cache(x, type_, rslt)
+
+        # Update counters and telemetry
+        self._record(x, type_, rslt, time.time() - start)
+
+        # Finishing
+        return rslt
+
+    def get_counters(self):
+        """ Get the counters of the evaluations of the criterion function.
+            Cache hits are not counted as evaluations.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+
+        # Collect counters
+        rslt = dict()
+
+        for key_ in ['num_function', 'num_gradient', 'num_batch',
+                     'num_hits', 'num_misses', 'time_evaluation']:
+            rslt[key_] = self.attr[key_]
+
         # Finishing
         return rslt
 
+    def notify(self, event):
+        """ Pass an event to all callbacks. The elapsed time and the
+            evaluation counters are added to the event.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(event, dict))
+
+        # Complete event
+        event['elapsed'] = time.time() - self.attr['start']
+
+        event.update(self.get_counters())
+
+        # Distribute event
+        for callback in self.attr['callbacks']:
+            callback(event)
+
+    def evaluate_scores(self, x):
+        """ Individual contributions to the gradient of the log-likelihood
+            function with respect to the external values of the free
+            parameters. The rows follow the order of the agents in the
+            dataset and are not multiplied by the frequency weights.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(x, np.ndarray))
+        assert (np.all(np.isfinite(x)))
+        assert (x.dtype == 'float')
+        assert (x.ndim == 1)
+
+        # Distribute class attributes
+        paras_obj = self.get_attr('paras_obj')
+        model_obj = self.get_attr('model_obj')
+        precision = self.get_attr('precision')
+
+        num_agents = model_obj.get_attr('num_agents')
+        num_free = paras_obj.get_attr('num_free')
+
+        # Antibugging.
+        assert (x.shape == (num_free,))
+
+        # Update values
+        self.update(x)
+
+        # Derivatives with respect to the internal parameters
+        projection = self._get_projection(paras_obj, model_obj)
+
+        scores = np.tile(np.nan, (num_agents, num_free))
+
+        for subgroup in ['treated', 'untreated']:
+
+            for block in model_obj.get_blocks(subgroup, precision):
+
+                derivs, _ = self._get_derivatives(paras_obj, model_obj,
+                                                  block, subgroup, projection)
+
+                scores[block['idx'], :] = \
+                    self._collect_derivatives(paras_obj, derivs)
+
+        # Chain rule for the transformation of the bounded parameters
+        scores = scores * paras_obj.get_jacobian(x)
+
+        # Check quality
+        assert (np.all(np.isfinite(scores)))
+        assert (scores.shape == (num_agents, num_free))
+
+        # Finishing
+        return scores
+
+    def evaluate_fused(self, x):
+        """ Evaluate the criterion function and its gradient at the same
+            point. The analytic gradient provides the function value from the
+            same pass over the data. Otherwise, the approximation of the
+            gradient reuses the function value.
+        """
+        # Approximation of the gradient
+        if not self._is_analytic():
+            fval = self.evaluate(x, 'function')
+
+            grad = self.evaluate(x, 'gradient')
+
+            return fval, grad
+
+        # Recent evaluations, the parameter object always reflects the
+        # requested point.
+        fval = self._get_cache(x, 'function')
+
+        grad = self._get_cache(x, 'gradient')
+
+        if (fval is not None) and (grad is not None):
+            self.update(x)
+            return fval, grad
+
+        # Evaluation
+        start = time.time()
+
+        fval, grad = self._evaluate_fused(x)
+
+        self._set_cache(x, 'function', fval)
+
+        self._set_cache(x, 'gradient', grad)
+
+        # Update counters and telemetry, the duration is split evenly
+        # between the two evaluations.
+        duration = (time.time() - start) / 2.0
+
+        self._record(x, 'function', fval, duration)
+
+        self._record(x, 'gradient', grad, duration)
+
+        # Finishing
+        return fval, grad
+
+    def evaluate_hessp(self, x, p):
+        """ Evaluate the product of the Hessian of the criterion function
+            with a direction by a finite difference of the gradient.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(p, np.ndarray))
+        assert (np.all(np.isfinite(p)))
+        assert (p.shape == x.shape)
+
+        # Distribute class attributes
+        model_obj = self.get_attr('model_obj')
+
+        epsilon = model_obj.get_attr('epsilon')
+
+        # Special case
+        p_norm = np.linalg.norm(p)
+
+        if p_norm == 0.0:
+            return np.zeros(x.shape)
+
+        # Step size, the analytic gradient allows for a smaller step.
+        if self._is_analytic():
+            step = np.sqrt(np.finfo(float).eps) * max(1.0, np.linalg.norm(x))
+        else:
+            step = epsilon
+
+        step = step / p_norm
+
+        # Approximation
+        lower = self.evaluate(x, 'gradient')
+        upper = self.evaluate(x + step * p, 'gradient')
+
+        rslt = (upper - lower) / step
+
+        # Quality checks
+        assert (np.all(np.isfinite(rslt)))
+
+        # Finishing
+        return rslt
+
+    def evaluate_batch(self, x):
+        """ Evaluate the criterion function at each row of a matrix of
+            external values of the free parameters.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(x, np.ndarray))
+        assert (np.all(np.isfinite(x)))
+        assert (x.dtype == 'float')
+        assert (x.ndim == 2)
+
+        # Distribute class attributes
+        paras_obj = self.get_attr('paras_obj')
+        pool_obj = self.get_attr('pool_obj')
+        precision = self.get_attr('precision')
+
+        num_free = paras_obj.get_attr('num_free')
+
+        # Antibugging
+        assert (x.shape[1] == num_free)
+
+        # Update counters
+        self.attr['num_batch'] += x.shape[0]
+
+        # Evaluation in blocks of parameter values to bound memory usage. The
+        # blocks do not depend on the number of workers, so the parallel
+        # evaluation is identical to the serial one.
+        blocks = []
+
+        for start in range(0, x.shape[0], BATCH_SIZE):
+            blocks.append(x[start:start + BATCH_SIZE, :])
+
+        if pool_obj is None:
+            rslt = [self.evaluate_block(block) for block in blocks]
+        else:
+            rslt = pool_obj.map(blocks, precision)
+
+        # Type conversion
+        rslt = np.concatenate(rslt)
+
+        # Quality checks
+        assert (np.all(np.isfinite(rslt)))
+        assert (rslt.shape == (x.shape[0],))
+
+        # Finishing
+        return rslt
+
+    def evaluate_block(self, x):
+        """ Evaluate the criterion function for a single block of a batch.
+        """
+        # Distribute class attributes
+        model_obj = self.get_attr('model_obj')
+        paras_obj = self.get_attr('paras_obj')
+        precision = self.get_attr('precision')
+
+        version = model_obj.get_attr('version')
+
+        # Evaluation, the compiled version shares the batch evaluation with
+        # the fast version.
+        if version in ['fast', 'log', 'jit']:
+            paras = paras_obj.get_values_batch(x)
+            rslt = self._evaluate_batch(paras_obj, model_obj, paras, version,
+                                        precision)
+        else:
+            rslt = np.array([self._evaluate_function(row) for row in x])
+
+        # Finishing
+        return rslt
+
+    def terminate(self):
+        """ Shut down the pool of workers, if any.
+        """
+        # Distribute class attributes
+        pool_obj = self.get_attr('pool_obj')
+
+        # Shutdown
+        if pool_obj is not None:
+            pool_obj.terminate()
+
+    def _check_integrity(self):
+        """ Check integrity of class instance.
+        """
+        # Distribute class attributes
+        model_obj = self.attr['model_obj']
+
+        # Precision
+        assert (self.attr['precision'] in ['double', 'single'])
+
+        if self.attr['precision'] == 'single':
+            assert (model_obj.get_attr('precision') == 'mixed')
+
     ''' Private methods for the calculation of the gradient and function.
     '''
 
+    def _is_analytic(self):
+        """ Check if the gradient is evaluated analytically. This is always
+            the case in single precision, where the finite differences are
+            dominated by the rounding of the data.
+        """
+        # Distribute class attributes
+        model_obj = self.get_attr('model_obj')
+
+        differences = model_obj.get_attr('differences')
+
+        # Finishing
+        return (differences == 'analytic') or \
+            (self.attr['precision'] == 'single')
+
+    def _record(self, x, type_, rslt, duration):
+        """ Update the counters after an evaluation and pass it on to the
+            callbacks.
+        """
+        # Update counters
+        self.attr['num_' + type_] += 1
+
+        self.attr['time_evaluation'] += duration
+
+        # Telemetry
+        if not self.attr['callbacks']:
+            return
+
+        event = dict()
+        event['event'] = 'evaluation'
+        event['type'] = type_
+        event['x'] = x.tolist()
+        event['fun'], event['grad_norm'] = None, None
+        event['duration'] = duration
+
+        if type_ == 'function':
+            event['fun'] = float(rslt)
+        else:
+            event['grad_norm'] = float(np.linalg.norm(rslt))
+
+        self.notify(event)
+
+    def _get_cache(self, x, type_):
+        """ Get a recent evaluation at the same point, if any.
+        """
+        # Distribute class attributes
+        cache = self.attr['cache']
+
+        # Lookup
+        key_ = (self.attr['precision'], x.tobytes())
+
+        if (key_ in cache.keys()) and (type_ in cache[key_].keys()):
+
+            self.attr['num_hits'] += 1
+
+            cache.move_to_end(key_)
+
+            rslt = cache[key_][type_]
+
+            if isinstance(rslt, np.ndarray):
+                rslt = rslt.copy()
+
+            return rslt
+
+        self.attr['num_misses'] += 1
+
+        # Finishing
+        return None
+
+    def _set_cache(self, x, type_, rslt):
+        """ Store an evaluation, the oldest point is discarded once the
+            cache is full.
+        """
+        # Distribute class attributes
+        cache = self.attr['cache']
+
+        # Update
+        key_ = (self.attr['precision'], x.tobytes())
+
+        if key_ not in cache.keys():
+            cache[key_] = dict()
+
+        if isinstance(rslt, np.ndarray):
+            rslt = rslt.copy()
+
+        cache[key_][type_] = rslt
+
+        cache.move_to_end(key_)
+
+        while len(cache) > CACHE_SIZE:
+            cache.popitem(last=False)
+
     def _evaluate_gradient(self, x):
         """ Numerical approximation of gradient.
         """
@@ -79,42 +486,110 @@ class CritCls(MetaCls):
         # Antibugging.
         assert (x.shape == (num_free,))
 
-        # Calculate baseline
-        f0 = self.evaluate(x, 'function')
+        # Calculate step sizes
+        d = epsilon * np.identity(num_free)
 
-        # Initialization
-        grad = np.zeros(num_free, dtype='float')
-        ei = np.zeros(num_free, dtype='float')
+        # Gradient approximations, all perturbations are evaluated at once
+        grad = None
 
-        # Gradient loop
-        for k in range(num_free):
+        if differences == 'one-sided':
+            upper = self.evaluate_batch(x + d)
+            lower = self.evaluate(x, 'function')
+            grad = (upper - lower) / epsilon
 
-            # Calculate step size
-            ei[k] = 1.0
-            d = epsilon * ei
+        if differences == 'two-sided':
+            upper = self.evaluate_batch(np.concatenate((x + d, x - d)))
+            upper, lower = upper[:num_free], upper[num_free:]
+            grad = (upper - lower) / (2.0 * epsilon)
 
-            # Gradient approximations
-            if differences == 'one-sided':
-                upper = self._evaluate_function(x + d)
-                lower = f0
-                grad[k] = (upper - lower) / d[k]
+        # Check quality
+        assert (isinstance(grad, np.ndarray))
+        assert (np.all(np.isfinite(grad)))
+        assert (grad.shape == (num_free,))
+        assert (grad.dtype == 'float')
+
+        # Finishing
+        return grad
+
+    def _evaluate_gradient_analytic(self, x):
+        """ Analytic gradient of the negative log-likelihood function with
+            respect to the external values of the free parameters.
+        """
+        # Evaluation
+        _, grad = self._evaluate_fused(x)
+
+        # Finishing
+        return grad
+
+    def _evaluate_fused(self, x):
+        """ Negative log-likelihood function and its analytic gradient with
+            respect to the external values of the free parameters from a
+            single pass over the data. The individual contributions are
+            evaluated in log space and in double precision.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(x, np.ndarray))
+        assert (np.all(np.isfinite(x)))
+        assert (x.dtype == 'float')
+        assert (x.ndim == 1)
 
-            if differences == 'two-sided':
-                upper = self._evaluate_function(x + d)
-                lower = self._evaluate_function(x - d)
-                grad[k] = (upper - lower) / (2.0 * d[k])
+        # Distribute class attributes
+        paras_obj = self.get_attr('paras_obj')
+        model_obj = self.get_attr('model_obj')
+        precision = self.get_attr('precision')
 
-            # Reset step size
-            ei[k] = 0.0
+        num_obs = model_obj.get_attr('num_obs')
+        num_free = paras_obj.get_attr('num_free')
+
+        # Antibugging.
+        assert (x.shape == (num_free,))
+
+        # Update values
+        self.update(x)
+
+        # Log-likelihood contributions and their derivatives with respect to
+        # the internal parameters, aggregated across the agents in each
+        # chunk with their frequency weights
+        projection = self._get_projection(paras_obj, model_obj)
+
+        likl, grad_int = 0.0, dict()
+
+        for subgroup in ['treated', 'untreated']:
+
+            for block in model_obj.get_blocks(subgroup, precision):
+
+                derivs, contribs = self._get_derivatives(
+                    paras_obj, model_obj, block, subgroup, projection)
+
+                likl += np.dot(block['W'], contribs)
+
+                for key_ in derivs.keys():
+                    if key_ not in grad_int.keys():
+                        grad_int[key_] = 0.0
+                    grad_int[key_] -= np.dot(block['W'], derivs[key_])
+
+        likl = -float(likl) / num_obs
+
+        for key_ in grad_int.keys():
+            grad_int[key_] = grad_int[key_] / num_obs
+
+        # Chain rule for the transformation of the bounded parameters
+        grad = self._collect_derivatives(paras_obj, grad_int)
+
+        grad = grad * paras_obj.get_jacobian(x)
 
         # Check quality
+        assert (isinstance(likl, float))
+        assert (np.isfinite(likl))
+
         assert (isinstance(grad, np.ndarray))
         assert (np.all(np.isfinite(grad)))
         assert (grad.shape == (num_free,))
         assert (grad.dtype == 'float')
 
         # Finishing
-        return grad
+        return likl, grad
 
     def _evaluate_function(self, x):
         """ Negative log-likelihood function.
@@ -129,24 +604,37 @@ class CritCls(MetaCls):
         # Distribute class attributes
         paras_obj = self.get_attr('paras_obj')
         model_obj = self.get_attr('model_obj')
+        precision = self.get_attr('precision')
 
         # Auxiliary objects
         version = model_obj.get_attr('version')
+        num_obs = model_obj.get_attr('num_obs')
+        w = model_obj.get_attr('W')
 
         # Update values
         self.update(x)
 
-        # Likelihood calculation
+        # Likelihood calculation, the fast and log versions accumulate the
+        # weighted sum of the individual log-likelihood contributions. The
+        # slow version always works in double precision.
         if version == 'slow':
             likl = self._evaluate_function_slow(paras_obj, model_obj)
+            likl = -np.dot(w, np.log(np.clip(likl, 1e-20, np.inf))) / num_obs
         elif version == 'fast':
-            likl = self._evaluate_function_fast(paras_obj, model_obj)
+            likl = self._evaluate_function_fast(paras_obj, model_obj,
+                                                precision)
+            likl = -likl / num_obs
+        elif version == 'log':
+            likl = self._evaluate_function_log(paras_obj, model_obj,
+                                               precision)
+            likl = -likl / num_obs
+        elif version == 'jit':
+            likl = self._evaluate_function_jit(paras_obj, model_obj,
+                                               precision)
+            likl = -likl / num_obs
         else:
             raise AssertionError
 
-        # Transformations
-        likl = -np.mean(np.log(np.clip(likl, 1e-20, np.inf)))
-
         # Quality checks
         assert (isinstance(likl, float))
         assert (np.isfinite(likl))
@@ -158,46 +646,388 @@ class CritCls(MetaCls):
     '''
 
     @staticmethod
-    def _evaluate_function_fast(paras_obj, model_obj):
-        """ Evaluate the criterion function in a fast fashion.
+    def _get_projection(paras_obj, model_obj):
+        """ Get the projection of the ex post on the ex ante benefit
+            covariates, which is required for the derivatives with respect to
+            the outcome parameters in the prediction step.
+        """
+        # Distribute class attributes
+        without_prediction = model_obj.get_attr('without_prediction')
+
+        if without_prediction:
+            return None
+
+        # Finishing, the operator of the prediction step is the projection.
+        return paras_obj.get_attr('operator')
+
+    @staticmethod
+    def _get_derivatives(paras_obj, model_obj, block, subgroup, projection):
+        """ Calculate the derivatives of the individual log-likelihood
+            contributions with respect to the internal parameters for a chunk
+            of agents with the same treatment status. The contributions of
+            agents with a likelihood below the clipping threshold are set to
+            zero. The individual log-likelihood contributions are returned as
+            well, clipped at the same threshold as in the criterion function.
         """
         # Distribute model information
-        x_ex_post = model_obj.get_attr('X_ex_post')
-        y = model_obj.get_attr('Y')
-        d = model_obj.get_attr('D')
-        z = model_obj.get_attr('Z')
+        num_covars_excl_bene_ex_ante = \
+            model_obj.get_attr('num_covars_excl_bene_ex_ante')
+        without_prediction = model_obj.get_attr('without_prediction')
+
+        y, x_ex_post, z = block['Y'], block['X_ex_post'], block['Z']
+
+        num_agents = y.shape[0]
+
+        # Distribute current parametrization
+        structural = paras_obj.get_structural()
+
+        outc = structural['outc_' + subgroup]
+        coeffs_choc = structural['coeffs_choc']
+
+        sd_v = structural['sd_v']
+
+        if subgroup == 'treated':
+            sd, sign = structural['sd_u1'], 1.0
+            rho = structural['rho_u1_v']
+        else:
+            sd, sign = structural['sd_u0'], -1.0
+            rho = structural['rho_u0_v']
+
+        root = np.sqrt(1.0 - rho ** 2)
+
+        # Construct indices
+        choice_indices = np.dot(z, coeffs_choc)
+
+        arg_one = (y - np.dot(x_ex_post, outc)) / sd
+        arg_two = (choice_indices - sd_v * rho * arg_one) / (root * sd_v)
+
+        # Inverse Mills ratio and individual log-likelihood
+        log_cdf_evals = log_ndtr(sign * arg_two)
+        mills = np.exp(norm.logpdf(arg_two) - log_cdf_evals)
+
+        likl = norm.logpdf(arg_one) + log_cdf_evals - np.log(sd)
+
+        if model_obj.get_attr('version') == 'log':
+            is_relevant = np.ones(likl.shape)
+        else:
+            is_relevant = (likl > np.log(1e-20)).astype('float')
+            likl = np.maximum(likl, np.log(1e-20))
+
+        # Derivatives of the log-likelihood with respect to the indices
+        deriv_arg_two = is_relevant * sign * mills
+        deriv_arg_one = is_relevant * (-arg_one) - \
+                        deriv_arg_two * rho / root
+        deriv_choice = deriv_arg_two / (root * sd_v)
+
+        # Derivatives with respect to the outcome parameters
+        deriv_outc = -(deriv_arg_one / sd)[:, None] * x_ex_post
+
+        deriv_sd = -is_relevant / sd - deriv_arg_one * arg_one / sd
+
+        deriv_rho = deriv_arg_two * (
+            choice_indices * rho / sd_v - arg_one) / root ** 3
+
+        # Derivatives with respect to the choice parameters
+        deriv_coeffs_choc = deriv_choice[:, None] * z
+
+        deriv_cost = -deriv_coeffs_choc[:, num_covars_excl_bene_ex_ante:]
+
+        deriv_bene_ex_ante = deriv_coeffs_choc[:, :x_ex_post.shape[1]]
+
+        if not without_prediction:
+            num_covars_ex_ante = projection.shape[0]
+            deriv_bene_ex_ante = deriv_choice[:, None] * np.dot(
+                z[:, :num_covars_ex_ante], projection)
+
+        # Collect results
+        zeros = np.zeros((num_agents, 1))
+
+        rslt = dict()
+
+        if subgroup == 'treated':
+            rslt[('outc', 'treated')] = deriv_outc + deriv_bene_ex_ante
+            rslt[('outc', 'untreated')] = -deriv_bene_ex_ante
+            rslt[('sd', 'U1')], rslt[('sd', 'U0')] = deriv_sd[:, None], zeros
+            rslt[('rho', 'U1,V')] = deriv_rho[:, None]
+            rslt[('rho', 'U0,V')] = zeros
+        else:
+            rslt[('outc', 'treated')] = deriv_bene_ex_ante
+            rslt[('outc', 'untreated')] = deriv_outc - deriv_bene_ex_ante
+            rslt[('sd', 'U1')], rslt[('sd', 'U0')] = zeros, deriv_sd[:, None]
+            rslt[('rho', 'U1,V')] = zeros
+            rslt[('rho', 'U0,V')] = deriv_rho[:, None]
+
+        rslt[('cost', None)] = deriv_cost
+
+        rslt[('sd', 'V')] = (-deriv_arg_two * choice_indices / (
+            root * sd_v ** 2))[:, None]
+
+        # Finishing
+        return rslt, likl
+
+    @staticmethod
+    def _collect_derivatives(paras_obj, derivs):
+        """ Arrange the derivatives with respect to all parameter groups in
+            the order of the free parameters. The last axis of each group
+            refers to the parameters within the group.
+        """
+        # Distribute class attributes
+        groups = paras_obj.get_attr('groups')
+        num_paras = paras_obj.get_attr('num_paras')
+        free = paras_obj.get_attr('free')
+
+        # Initialize container
+        shape = derivs[('sd', 'V')].shape[:-1] + (num_paras,)
+
+        rslt = np.empty(shape)
+
+        for key_, idx in groups.items():
+            rslt[..., idx] = derivs[key_]
+
+        # Finishing
+        return rslt[..., free]
+
+    @staticmethod
+    def _get_parameters_batch(paras_obj, paras):
+        """ Distribute the internal values of all parameters for a batch of
+            parametrizations. The first axis refers to the parametrizations.
+        """
+        # Distribute class attributes
+        groups = paras_obj.get_attr('groups')
+
+        # Collect parameter groups
+        rslt = dict()
+
+        for key_, idx in groups.items():
+            rslt[key_] = paras[:, idx]
+
+        for key_ in [('sd', 'U1'), ('sd', 'U0'), ('sd', 'V'),
+                     ('rho', 'U1,V'), ('rho', 'U0,V')]:
+            rslt[key_] = rslt[key_][:, 0]
+
+        # Choice coefficients
+        rslt['choice'] = paras_obj.get_structural(paras)['coeffs_choc']
+
+        # Finishing
+        return rslt
+
+    def _evaluate_batch(self, paras_obj, model_obj, paras, version,
+                        precision):
+        """ Evaluate the criterion function for a batch of parametrizations,
+            where each linear index is computed by a single matrix product.
+        """
+        # Distribute model information
+        num_obs = model_obj.get_attr('num_obs')
+
+        dtype = DTYPES[precision]
+
+        # Distribute current parametrizations
+        paras = self._get_parameters_batch(paras_obj, paras)
+
+        for key_ in paras.keys():
+            paras[key_] = paras[key_].astype(dtype)
+
+        coeffs_choc = paras['choice']
+
+        sd_v = paras[('sd', 'V')]
+
+        # Initialize containers
+        likl = np.zeros(coeffs_choc.shape[0])
+
+        for subgroup in ['treated', 'untreated']:
+
+            # Distribute subgroup information
+            outc = paras[('outc', subgroup)]
+
+            if subgroup == 'treated':
+                sd, rho = paras[('sd', 'U1')], paras[('rho', 'U1,V')]
+                sign = 1.0
+            else:
+                sd, rho = paras[('sd', 'U0')], paras[('rho', 'U0,V')]
+                sign = -1.0
+
+            for block in model_obj.get_blocks(subgroup, precision):
+
+                # Construct indices
+                choice_indices = np.dot(block['Z'], coeffs_choc.T)
+
+                arg_one = (block['Y'][:, None] -
+                           np.dot(block['X_ex_post'], outc.T)) / sd
+                arg_two = (choice_indices - sd_v * rho * arg_one) / np.sqrt(
+                    (1.0 - rho ** 2) * sd_v ** 2)
+
+                # Calculate individual log-likelihoods
+                if version == 'log':
+                    contribs = -0.5 * arg_one ** 2 - LOG_SQRT_TWO_PI - \
+                               np.log(sd) + log_ndtr(sign * arg_two)
+
+                else:
+                    cdf_evals = ndtr(sign * arg_two)
+                    pdf_evals = np.exp(-0.5 * arg_one ** 2) / SQRT_TWO_PI
+
+                    contribs = (1.0 / sd) * pdf_evals * cdf_evals
+
+                    contribs = np.log(np.clip(contribs, 1e-20, np.inf))
+
+                likl += np.dot(block['W'], contribs)
+
+        # Transformations
+        likl = -likl / num_obs
+
+        # Finishing
+        return likl
+
+    @staticmethod
+    def _evaluate_function_fast(paras_obj, model_obj, precision):
+        """ Evaluate the criterion function in a fast fashion. Each branch of
+            the likelihood is only evaluated for the agents in the
+            corresponding treatment status. The weighted sum of the individual
+            log-likelihood contributions is accumulated over chunks of agents
+            in double precision.
+        """
+        # Distribute model information
+        dtype = DTYPES[precision]
+
+        # Distribute current parametrization
+        structural = paras_obj.get_structural()
+
+        coeffs_choc = structural['coeffs_choc'].astype(dtype)
+
+        sd_v, var_v = structural['sd_v'], structural['var_v']
+
+        # Initialize containers
+        likl = 0.0
+
+        for subgroup in ['treated', 'untreated']:
+
+            # Distribute subgroup information
+            outc = structural['outc_' + subgroup].astype(dtype)
+
+            if subgroup == 'treated':
+                sd, sign = structural['sd_u1'], 1.0
+                rho = structural['rho_u1_v']
+            else:
+                sd, sign = structural['sd_u0'], -1.0
+                rho = structural['rho_u0_v']
+
+            for block in model_obj.get_blocks(subgroup, precision):
+
+                # Construct choice index
+                choice_indices = np.dot(block['Z'], coeffs_choc)
+
+                # Calculate densities
+                arg_one = (block['Y'] - np.dot(block['X_ex_post'], outc)) / sd
+                arg_two = (choice_indices - sd_v * rho * arg_one) / np.sqrt(
+                    (1.0 - rho ** 2) * var_v)
+
+                # Evaluate densities, the upper tail of the distribution is
+                # evaluated directly to avoid cancellation in single precision.
+                cdf_evals = ndtr(sign * arg_two)
+                pdf_evals = np.exp(-0.5 * arg_one ** 2) / SQRT_TWO_PI
+
+                # Calculate individual likelihoods
+                contribs = (1.0 / sd) * pdf_evals * cdf_evals
+
+                contribs = np.log(np.clip(contribs, 1e-20, np.inf))
+
+                likl += np.dot(block['W'], contribs)
+
+        # Finishing
+        return likl
+
+    @staticmethod
+    def _evaluate_function_log(paras_obj, model_obj, precision):
+        """ Evaluate the individual log-likelihood contributions directly in
+            log space. This avoids the underflow of the likelihood in the
+            tails of the distribution. The weighted sum of the contributions
+            is accumulated over chunks of agents in double precision.
+        """
+        # Distribute model information
+        dtype = DTYPES[precision]
 
         # Distribute current parametrization
-        outc_treated = paras_obj.get_parameters('outc', 'treated')
-        outc_untreated = paras_obj.get_parameters('outc', 'untreated')
-        coeffs_choc = paras_obj.get_parameters('choice', None)
+        structural = paras_obj.get_structural()
+
+        coeffs_choc = structural['coeffs_choc'].astype(dtype)
 
-        sd_u1 = paras_obj.get_parameters('sd', 'U1')
-        sd_u0 = paras_obj.get_parameters('sd', 'U0')
-        sd_v = paras_obj.get_parameters('sd', 'V')
-        var_v = paras_obj.get_parameters('var', 'V')
+        sd_v = structural['sd_v']
 
-        rho_u1_v = paras_obj.get_parameters('rho', 'U1,V')
-        rho_u0_v = paras_obj.get_parameters('rho', 'U0,V')
+        # Initialize containers
+        likl = 0.0
+
+        for subgroup in ['treated', 'untreated']:
 
-        # Construct choice index
-        choice_indices = np.dot(coeffs_choc, z.T)
+            # Distribute subgroup information
+            outc = structural['outc_' + subgroup].astype(dtype)
 
-        # Calculate densities
-        arg_one = d * (y - np.dot(outc_treated, x_ex_post.T)) / sd_u1 + \
-                  (1 - d) * (y - np.dot(outc_untreated, x_ex_post.T)) / sd_u0
-        arg_two = d * (choice_indices - sd_v * rho_u1_v * arg_one) / np.sqrt(
-            (1.0 -
-             rho_u1_v ** 2) * var_v) + (1 - d) * (choice_indices -
-                                                  sd_v * rho_u0_v * arg_one) / np.sqrt(
-            (1.0 - rho_u0_v ** 2) * var_v)
+            if subgroup == 'treated':
+                sd, sign = structural['sd_u1'], 1.0
+                rho = structural['rho_u1_v']
+            else:
+                sd, sign = structural['sd_u0'], -1.0
+                rho = structural['rho_u0_v']
 
-        # Evaluate densities
-        cdf_evals, pdf_evals = norm.cdf(arg_two), norm.pdf(arg_one)
+            for block in model_obj.get_blocks(subgroup, precision):
 
-        # Calculate individual likelihoods
-        likl = d * (1.0 / sd_u1) * pdf_evals * cdf_evals + \
-               (1 - d) * (1.0 / sd_u0) * pdf_evals * (1.0 - cdf_evals)
+                # Calculate arguments
+                choice_indices = np.dot(block['Z'], coeffs_choc)
+
+                arg_one = (block['Y'] - np.dot(block['X_ex_post'], outc)) / sd
+                arg_two = (choice_indices - sd_v * rho * arg_one) / (
+                    np.sqrt(1.0 - rho ** 2) * sd_v)
+
+                # Calculate individual log-likelihoods
+                contribs = -0.5 * arg_one ** 2 - LOG_SQRT_TWO_PI - \
+                    np.log(sd) + log_ndtr(sign * arg_two)
+
+                likl += np.dot(block['W'], contribs)
+
+        # Finishing
+        return likl
+
+    @staticmethod
+    def _evaluate_function_jit(paras_obj, model_obj, precision):
+        """ Evaluate the criterion function with a compiled kernel, which
+            fuses the evaluation of all individual log-likelihood
+            contributions in a single pass over the agents. Without NUMBA,
+            the fast version is used instead.
+        """
+        # Select kernel, the agents are only split across threads without a
+        # pool of workers. The threads do not survive the fork of the workers.
+        evaluate_block = compiled.get_kernel(
+            model_obj.get_attr('workers') == 1)
+
+        # Fallback
+        if evaluate_block is None:
+            return CritCls._evaluate_function_fast(paras_obj, model_obj,
+                                                   precision)
+
+        # Distribute current parametrization
+        structural = paras_obj.get_structural()
+
+        coeffs_choc = structural['coeffs_choc']
+
+        sd_v, var_v = structural['sd_v'], structural['var_v']
+
+        # Initialize containers
+        likl = 0.0
+
+        for subgroup in ['treated', 'untreated']:
+
+            # Distribute subgroup information
+            outc = structural['outc_' + subgroup]
+
+            if subgroup == 'treated':
+                sd, rho = structural['sd_u1'], structural['rho_u1_v']
+            else:
+                sd, rho = structural['sd_u0'], structural['rho_u0_v']
+
+            for block in model_obj.get_blocks(subgroup, precision):
+
+                likl += evaluate_block(
+                    block['Y'], block['X_ex_post'], block['Z'], block['W'],
+                    outc, coeffs_choc, float(sd), float(rho), float(sd_v),
+                    float(var_v), subgroup == 'treated')
 
         # Finishing
         return likl
@@ -214,16 +1044,18 @@ class CritCls(MetaCls):
         z = model_obj.get_attr('Z')
 
         # Distribute current parametrization
-        outc_treated = paras_obj.get_parameters('outc', 'treated')
-        outc_untreated = paras_obj.get_parameters('outc', 'untreated')
-        coeffs_choc = paras_obj.get_parameters('choice', None)
+        structural = paras_obj.get_structural()
+
+        outc_treated = structural['outc_treated']
+        outc_untreated = structural['outc_untreated']
+        coeffs_choc = structural['coeffs_choc']
 
-        sd_u1 = paras_obj.get_parameters('sd', 'U1')
-        sd_u0 = paras_obj.get_parameters('sd', 'U0')
-        sd_v = paras_obj.get_parameters('sd', 'V')
+        sd_u1 = structural['sd_u1']
+        sd_u0 = structural['sd_u0']
+        sd_v = structural['sd_v']
 
-        rho_u1_v = paras_obj.get_parameters('rho', 'U1,V')
-        rho_u0_v = paras_obj.get_parameters('rho', 'U0,V')
+        rho_u1_v = structural['rho_u1_v']
+        rho_u0_v = structural['rho_u0_v']
 
         # Initialize containers
         likl = np.tile(np.nan, num_agents)
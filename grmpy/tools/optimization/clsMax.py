@@ -2,20 +2,42 @@
 """
 
 # standard library.
-from scipy.optimize import fmin_bfgs
-from scipy.optimize import fmin_powell
+from scipy.optimize import minimize
 
+import multiprocessing as mp
 import numpy as np
+import time
 
 # project library
 from grmpy.tools.optimization.wrappers import scipy_wrapper_function
-from grmpy.tools.optimization.wrappers import scipy_wrapper_gradient
+from grmpy.tools.optimization.wrappers import scipy_wrapper_fused
+from grmpy.tools.optimization.wrappers import scipy_wrapper_hessp
+from grmpy.tools.optimization.wrappers import scipy_wrapper_scaled
+from grmpy.tools.optimization.optimizers import OPTIMIZERS
 from grmpy.tools.optimization.clsCrit import CritCls
+from grmpy.tools.optimization.clsPool import PoolCls
 
 from grmpy.clsMeta import MetaCls
 from grmpy.clsModel import ModelCls
 from grmpy.clsParas import ParasCls
 
+import grmpy.tools.msc as msc
+
+# module variables
+TOL = 0.0000000001
+
+TOL_SINGLE = 0.0001
+
+MULTISTART_SCALE = 0.5
+
+MULTISTART_PROBE = 5
+
+MULTISTART_MARGIN = 0.1
+
+_MAX_OBJ = None
+
+_BEST = None
+
 
 class MaxCls(MetaCls):
     def __init__(self, model_obj, paras_obj):
@@ -35,6 +57,17 @@ class MaxCls(MetaCls):
         # Results container
         self.attr['max_rslt'] = None
 
+        # Evaluation without a pool of workers
+        self.attr['is_serial'] = False
+
+        # Latest checkpoint of the maximization
+        self.attr['checkpoint'] = None
+
+        # Telemetry, the callbacks receive an event for each iteration and
+        # each evaluation of the criterion function.
+        self.attr['callbacks'] = []
+        self.attr['start'] = None
+
         # Status
         self.is_locked = False
 
@@ -48,30 +81,35 @@ class MaxCls(MetaCls):
         crit_func = self.get_attr('crit_func')
         paras_obj = self.get_attr('paras_obj')
         model_obj = self.get_attr('model_obj')
-        algorithm = model_obj.get_attr('algorithm')
         maxiter = model_obj.get_attr('maxiter')
+        multistart = model_obj.get_attr('multistart')
+
+        # Starting values
+        x = paras_obj.get_values('external', 'free')
 
         # Maximization
         max_rslt = None
 
         if maxiter == 0:
-            x = paras_obj.get_values('external', 'free')
-
             max_rslt = dict()
-            max_rslt['fun'] = scipy_wrapper_function(x, crit_func)
-            max_rslt['grad'] = scipy_wrapper_gradient(x, crit_func)
+            max_rslt['fun'], max_rslt['grad'] = scipy_wrapper_fused(x, crit_func)
             max_rslt['xopt'] = x
             max_rslt['success'] = False
+            max_rslt['nit_stages'] = []
 
             # Message:
             max_rslt['message'] = 'Single function evaluation at ' \
                                   'starting values.'
 
-        elif algorithm == 'bfgs':
-            max_rslt = self._bfgs()
+        elif multistart > 1:
+            max_rslt = self._multistart(x)
 
-        elif algorithm == 'powell':
-            max_rslt = self._powell()
+        else:
+            max_rslt = self._local(x)
+
+        # Usage of the cache of recent evaluations
+        max_rslt['cache_hits'] = crit_func.get_attr('num_hits')
+        max_rslt['cache_misses'] = crit_func.get_attr('num_misses')
 
         # Finishing.
         return max_rslt
@@ -86,103 +124,651 @@ class MaxCls(MetaCls):
         model_obj = self.get_attr('model_obj')
         paras_obj = self.get_attr('paras_obj')
 
-        # Criterion function
-        crit_func = CritCls(model_obj, paras_obj)
-
-        crit_func.lock()
+        # Start of the maximization
+        self.attr['start'] = time.time()
 
-        self.attr['crit_func'] = crit_func
+        # Criterion function
+        self.attr['crit_func'] = self._get_crit_func(model_obj, paras_obj)
 
     ''' Private Methods.
     '''
 
-    def _powell(self):
-        """ Method that performs the Powell maximization.
+    def _local(self, x, best=None):
+        """ Method that performs a single local maximization. As part of a
+            multistart maximization, the maximization is stopped early if it
+            falls behind the best completed start. Otherwise, a checkpoint is
+            written after each iteration and the maximization continues from
+            the latest checkpoint, if any.
         """
         # Antibugging
         assert (self.get_status() is True)
 
         # Distribute class attributes
         model_obj = self.get_attr('model_obj')
-        paras_obj = self.get_attr('paras_obj')
+        algorithm = model_obj.get_attr('algorithm')
         maxiter = model_obj.get_attr('maxiter')
-        crit_func = self.get_attr('crit_func')
+        precision = model_obj.get_attr('precision')
+        stages = model_obj.get_attr('stages')
+        gtol = model_obj.get_attr('gtol')
 
-        # Staring values
-        starting_values = paras_obj.get_values('external', 'free')
+        checkpoint = self.get_attr('checkpoint')
 
-        rslt = fmin_powell(func=scipy_wrapper_function, x0=starting_values,
-                           args=(crit_func,), xtol=0.0000000001,
-                           ftol=0.0000000001, maxiter=maxiter, maxfun=None,
-                           full_output=True, disp=1, callback=None)
+        # Checkpoints
+        is_checkpoint = (best is None)
 
-        # Prepare result dictionary
-        max_rslt = dict()
+        # Warm start on subsamples, which is skipped when continuing from a
+        # checkpoint.
+        nit_stages, num_iter = [], 0
 
-        max_rslt['xopt'] = np.array(rslt[0], ndmin=1)
-        max_rslt['fun'] = rslt[1]
-        max_rslt['grad'] = None
-        max_rslt['success'] = (rslt[5] == 0)
+        if is_checkpoint and (checkpoint is not None):
+            x, num_iter = checkpoint['x'], checkpoint['nit']
 
-        # Message
-        max_rslt['message'] = rslt[5]
+        elif stages is not None:
+            x, nit_stages = self._stages(x)
+
+        # Remaining iterations
+        if maxiter is not None:
+            maxiter = max(maxiter - num_iter, 0)
 
-        if max_rslt['message'] == 1:
-            max_rslt['message'] = 'Maximum number of function evaluations.'
+        # Early stopping
+        callback = None
 
-        if max_rslt['message'] == 0:
-            max_rslt['message'] = 'None'
+        if best is not None:
+            callback = self._get_callback(best)
+
+        # Maximization
+        try:
 
-        if max_rslt['message'] == 2:
-            max_rslt['message'] = 'Maximum number of iterations.'
+            if precision == 'mixed':
+                max_rslt = self._mixed(x, maxiter, callback, is_checkpoint)
 
-            # Finishing.
+            elif OPTIMIZERS[algorithm]['gradient']:
+                max_rslt = self._minimize(x, maxiter, gtol, callback,
+                                          is_checkpoint)
+
+            else:
+                max_rslt = self._minimize(x, maxiter, TOL, callback,
+                                          is_checkpoint)
+
+            max_rslt['nit'] += num_iter
+
+            max_rslt['stopped'] = False
+
+        except _HopelessStart as stop:
+
+            max_rslt = dict()
+
+            max_rslt['xopt'], max_rslt['fun'], max_rslt['nit'] = stop.args
+            max_rslt['grad'] = None
+            max_rslt['success'] = False
+            max_rslt['stopped'] = True
+
+            # Message
+            max_rslt['message'] = 'Stopped behind the best start.'
+
+        # Iterations on the subsamples
+        max_rslt['nit_stages'] = nit_stages
+
+        # Finishing.
         return max_rslt
 
-    def _bfgs(self):
-        """ Method that performs a BFGS maximization.
+    def _multistart(self, x):
+        """ Method that performs local maximizations from randomly
+            perturbed starting values, the first start uses the original
+            starting values. The starts run concurrently in a pool of
+            workers, which inherit the data from the parent process.
         """
         # Antibugging
         assert (self.get_status() is True)
 
+        # Distribute class attributes
+        model_obj = self.get_attr('model_obj')
+        multistart = model_obj.get_attr('multistart')
+        workers = model_obj.get_attr('workers')
+
+        # Starting values
+        starts = [x]
+
+        for _ in range(multistart - 1):
+            starts += [x + MULTISTART_SCALE * np.random.randn(len(x))]
+
+        # Best criterion value across the completed starts
+        best = mp.Value('d', np.inf)
+
+        # Maximizations
+        if workers == 1:
+            rslts = [self._start(start, best) for start in starts]
+
+        else:
+            pool = mp.Pool(min(workers, multistart), _initialize_worker,
+                           (self, best))
+
+            rslts = pool.map(_run_start, starts, chunksize=1)
+
+            pool.close()
+
+            pool.join()
+
+        # Summary of all starts
+        summary = []
+
+        for count, rslt in enumerate(rslts):
+            summary += [dict()]
+            summary[-1]['start'] = count
+            for key_ in ['fun', 'nit', 'success', 'stopped']:
+                summary[-1][key_] = rslt[key_]
+
+        # Select best start
+        max_rslt = min(rslts, key=lambda rslt: rslt['fun'])
+
+        max_rslt['multistart'] = summary
+
+        # Finishing.
+        return max_rslt
+
+    def _start(self, x, best):
+        """ Method that performs a single start of a multistart
+            maximization and updates the best criterion value.
+        """
+        # Maximization
+        max_rslt = self._local(x, best)
+
+        # Update
+        if not max_rslt['stopped']:
+            with best.get_lock():
+                best.value = min(best.value, max_rslt['fun'])
+
+        # Finishing.
+        return max_rslt
+
+    def _get_callback(self, best):
+        """ Construct the callback, which stops a start whose criterion
+            value exceeds the best completed start by more than a margin
+            after the initial iterations.
+        """
+        # Distribute class attributes
+        crit_func = self.get_attr('crit_func')
+
+        # Count iterations
+        num_iter = [0]
+
+        def _callback(x):
+            num_iter[0] += 1
+
+            if num_iter[0] < MULTISTART_PROBE:
+                return
+
+            fval = scipy_wrapper_function(x, crit_func)
+
+            if fval > best.value + MULTISTART_MARGIN:
+                raise _HopelessStart(np.array(x, ndmin=1), fval, num_iter[0])
+
+        # Finishing
+        return _callback
+
+    def _set_serial(self):
+        """ Evaluate the criterion function without a pool of workers. This
+            is required within the workers of a multistart maximization.
+        """
         # Distribute class attributes
         model_obj = self.get_attr('model_obj')
         paras_obj = self.get_attr('paras_obj')
+
+        # Update
+        self.attr['is_serial'] = True
+
+        self.attr['crit_func'] = self._get_crit_func(model_obj, paras_obj)
+
+    def _get_crit_func(self, model_obj, paras_obj):
+        """ Construct the criterion function, which is evaluated by a pool
+            of workers if requested.
+        """
+        # Distribute model information
+        with_asymptotics = model_obj.get_attr('with_asymptotics')
+        differences = model_obj.get_attr('differences')
+        algorithm = model_obj.get_attr('algorithm')
+        hessian = model_obj.get_attr('hessian')
+        workers = model_obj.get_attr('workers')
+
+        # Batch evaluations, the pool of workers is only started if the
+        # maximization or the approximation of the hessian requests them.
+        is_batch = OPTIMIZERS[algorithm]['batch'] and \
+            (differences != 'analytic')
+
+        is_batch = is_batch or (with_asymptotics and (hessian == 'numdiff'))
+
+        # Criterion function
+        crit_func = CritCls(model_obj, paras_obj)
+
+        crit_func.set_attr('callbacks', self.attr['callbacks'])
+        crit_func.set_attr('start', self.attr['start'])
+
+        if (workers > 1) and is_batch and (not self.attr['is_serial']):
+            pool_obj = PoolCls(model_obj, paras_obj)
+
+            pool_obj.lock()
+
+            crit_func.set_attr('pool_obj', pool_obj)
+
+        crit_func.lock()
+
+        # Finishing
+        return crit_func
+
+    def _stages(self, x):
+        """ Method that performs the maximization on a sequence of random
+            subsamples of increasing size. Each stage starts from the
+            solution of the previous one, so the maximization on the full
+            sample is warm-started close to the optimum.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+
+        # Distribute class attributes
         crit_func = self.get_attr('crit_func')
+        model_obj = self.get_attr('model_obj')
+        paras_obj = self.get_attr('paras_obj')
         maxiter = model_obj.get_attr('maxiter')
+        stages = model_obj.get_attr('stages')
+        stage_tol = model_obj.get_attr('stage_tol')
+
+        operator = paras_obj.get_attr('operator')
+
+        # Maximization on the subsamples
+        nit_stages = []
+
+        for fraction in stages:
+
+            sub_obj = model_obj.get_subsample(fraction)
+
+            self._set_sample(sub_obj, None)
+
+            self.attr['crit_func'] = self._get_crit_func(sub_obj, paras_obj)
+
+            max_rslt = self._minimize(x, maxiter, stage_tol)
+
+            self.attr['crit_func'].terminate()
+
+            x = max_rslt['xopt']
+
+            nit_stages.append(max_rslt['nit'])
+
+        # Restore full sample
+        self._set_sample(model_obj, operator)
+
+        self.attr['crit_func'] = crit_func
+
+        # Finishing
+        return x, nit_stages
+
+    def _set_sample(self, model_obj, operator):
+        """ Set the sample that is used for the prediction step of the
+            parameter object.
+        """
+        # Distribute class attributes
+        paras_obj = self.get_attr('paras_obj')
+
+        # Update
+        paras_obj.unlock()
+
+        paras_obj.set_attr('model_obj', model_obj)
+
+        for key_ in ['X_ex_post', 'X_ex_ante', 'W', 'num_agents']:
+            paras_obj.set_attr(key_, model_obj.get_attr(key_))
+
+        paras_obj.set_attr('operator', operator)
+
+        paras_obj.lock()
+
+    def _mixed(self, x, maxiter, callback=None, is_checkpoint=False):
+        """ Method that performs the early iterations in single precision
+            and finishes the maximization in double precision.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+
+        # Distribute class attributes
+        model_obj = self.get_attr('model_obj')
+        algorithm = model_obj.get_attr('algorithm')
         gtol = model_obj.get_attr('gtol')
-        epsilon = model_obj.get_attr('epsilon')
 
-        # Staring values
-        starting_values = paras_obj.get_values(version='external', which='free')
+        # Split of iterations, at least half are left for double precision
+        maxiter_single, maxiter_double = None, None
+
+        if maxiter is not None:
+            maxiter_single = maxiter // 2
+
+        # Iterations
+        num_iter = 0
+
+        # Maximization in single precision
+        if maxiter_single != 0:
+
+            self._set_precision('single')
+
+            if OPTIMIZERS[algorithm]['gradient']:
+                max_rslt = self._minimize(x, maxiter_single,
+                                          max(gtol, TOL_SINGLE), callback,
+                                          is_checkpoint)
+            else:
+                max_rslt = self._minimize(x, maxiter_single, TOL_SINGLE,
+                                          callback, is_checkpoint)
+
+            self._set_precision('double')
+
+            x, num_iter = max_rslt['xopt'], max_rslt['nit']
+
+        # Maximization in double precision
+        if maxiter is not None:
+            maxiter_double = maxiter - num_iter
+
+        if OPTIMIZERS[algorithm]['gradient']:
+            max_rslt = self._minimize(x, maxiter_double, gtol, callback,
+                                      is_checkpoint)
+        else:
+            max_rslt = self._minimize(x, maxiter_double, TOL, callback,
+                                      is_checkpoint)
+
+        max_rslt['nit'] += num_iter
+
+        # Finishing.
+        return max_rslt
+
+    def _set_precision(self, precision):
+        """ Set the precision of the evaluation of the criterion function.
+        """
+        # Distribute class attributes
+        crit_func = self.get_attr('crit_func')
+
+        # Update
+        crit_func.unlock()
+
+        crit_func.set_attr('precision', precision)
+
+        crit_func.lock()
+
+    def _minimize(self, starting_values, maxiter, tol, callback=None,
+                  is_checkpoint=False):
+        """ Method that performs the maximization with the selected
+            algorithm from the registry. The function value and gradient are
+            requested in a single call by the gradient-based algorithms. When
+            continuing from a checkpoint, BFGS works on scaled values of the
+            free parameters. Starting from the identity matrix for the scaled
+            values is equivalent to starting from the approximation of the
+            inverse Hessian in the checkpoint.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+
+        # Distribute class attributes
+        crit_func = self.get_attr('crit_func')
+        model_obj = self.get_attr('model_obj')
+        paras_obj = self.get_attr('paras_obj')
+        algorithm = model_obj.get_attr('algorithm')
+
+        optimizer = OPTIMIZERS[algorithm]
+
+        # Options
+        options = dict()
+        options['disp'] = optimizer['disp']
+
+        if maxiter is not None:
+            options['maxiter'] = maxiter
+
+        for key_ in optimizer['tol']:
+            options[key_] = tol
+
+        # Evaluators
+        kwargs = dict()
+
+        if optimizer['gradient']:
+            kwargs['fun'], kwargs['jac'] = scipy_wrapper_fused, True
+        else:
+            kwargs['fun'] = scipy_wrapper_function
+
+        if optimizer['hessian']:
+            kwargs['hessp'] = scipy_wrapper_hessp
+
+        if optimizer['bounds']:
+            kwargs['bounds'] = paras_obj.get_bounds()
+
+        # Checkpoints
+        scale = None
+
+        if is_checkpoint:
+            checkpoint = self.get_attr('checkpoint')
+
+            if optimizer['warm_start'] and (checkpoint is not None):
+                if checkpoint['hess_inv'] is not None:
+                    scale = self._get_scale(checkpoint['hess_inv'])
+
+            callback = self._get_checkpoint_callback(starting_values,
+                                                     callback)
+
+        # Telemetry
+        if self.get_attr('callbacks'):
+            callback = self._get_telemetry_callback(callback)
+
+        # Scaling
+        x0, args = starting_values, (crit_func,)
+
+        if scale is not None:
+            x0 = np.zeros(len(starting_values))
+
+            args = (crit_func, starting_values, scale)
+
+            kwargs['fun'] = scipy_wrapper_scaled
+
+            callback_scaled = callback
+
+            def callback(y):
+                callback_scaled(starting_values + np.dot(scale, y))
 
         # Maximization
-        rslt = fmin_bfgs(f=scipy_wrapper_function,
-                         fprime=scipy_wrapper_gradient, x0=starting_values,
-                         args=(crit_func,), gtol=gtol, epsilon=epsilon,
-                         maxiter=maxiter, full_output=True, disp=1, retall=0,
-                         callback=None)
+        rslt = minimize(x0=x0, args=args, method=optimizer['method'],
+                        callback=callback, options=options, **kwargs)
 
         # Prepare result dictionary
         max_rslt = dict()
 
-        max_rslt['xopt'] = np.array(rslt[0], ndmin=1)
-        max_rslt['fun'] = rslt[1]
-        max_rslt['grad'] = rslt[2]
-        max_rslt['covMat'] = rslt[3]
-        max_rslt['success'] = (rslt[6] == 0)
+        max_rslt['xopt'] = np.array(rslt['x'], ndmin=1)
+        max_rslt['fun'] = float(rslt['fun'])
+        max_rslt['grad'] = None
+        max_rslt['success'] = bool(rslt['success'])
+        max_rslt['nit'] = int(rslt['nit'])
 
-        # Message
-        max_rslt['message'] = rslt[6]
+        if optimizer['gradient']:
+            max_rslt['grad'] = rslt['jac']
 
-        if max_rslt['message'] == 1:
-            max_rslt['message'] = 'Maximum number of function evaluations.'
+        if optimizer['hess_inv']:
+            max_rslt['covMat'] = rslt['hess_inv']
+            if not isinstance(max_rslt['covMat'], np.ndarray):
+                max_rslt['covMat'] = max_rslt['covMat'].todense()
 
-        if max_rslt['message'] == 0:
-            max_rslt['message'] = 'None'
+        # Undo scaling
+        if scale is not None:
+            xopt = starting_values + np.dot(scale, max_rslt['xopt'])
 
-        if max_rslt['message'] == 2:
-            max_rslt['message'] = 'Gradient and/or function calls not changing.'
+            max_rslt['xopt'] = xopt
+            max_rslt['grad'] = crit_func.evaluate(xopt, 'gradient')
+            max_rslt['covMat'] = np.dot(scale, np.dot(max_rslt['covMat'],
+                                                      scale.T))
+
+        # Message
+        max_rslt['message'] = 'None'
+
+        if not max_rslt['success']:
+            max_rslt['message'] = str(rslt['message'])
 
         # Finishing.
         return max_rslt
+
+    def _get_checkpoint_callback(self, x, callback=None):
+        """ Construct the callback, which writes a checkpoint after each
+            iteration. For BFGS, the checkpoint includes the approximation of
+            the inverse Hessian, which is updated with the same formula.
+        """
+        # Distribute class attributes
+        crit_func = self.get_attr('crit_func')
+        model_obj = self.get_attr('model_obj')
+        checkpoint = self.get_attr('checkpoint')
+
+        algorithm = model_obj.get_attr('algorithm')
+
+        # Initial state
+        state = dict()
+        state['x'], state['grad'] = x, None
+        state['nit'], state['hess_inv'] = 0, None
+
+        if checkpoint is not None:
+            state['nit'] = checkpoint['nit']
+
+        if OPTIMIZERS[algorithm]['warm_start']:
+            state['hess_inv'] = np.identity(len(x))
+            if checkpoint is not None:
+                if checkpoint['hess_inv'] is not None:
+                    state['hess_inv'] = checkpoint['hess_inv']
+
+        def _callback(x_):
+            x_ = np.array(x_, ndmin=1)
+
+            # Update approximation of the inverse Hessian
+            if state['hess_inv'] is not None:
+                if state['grad'] is None:
+                    state['grad'] = crit_func.evaluate(state['x'], 'gradient')
+
+                grad = crit_func.evaluate(x_, 'gradient')
+
+                sk, yk = x_ - state['x'], grad - state['grad']
+
+                state['hess_inv'] = self._update_hess_inv(state['hess_inv'],
+                                                          sk, yk)
+
+                state['grad'] = grad
+
+            state['x'] = x_
+
+            state['nit'] += 1
+
+            # Write checkpoint
+            checkpoint_ = dict()
+            checkpoint_['x'] = x_
+            checkpoint_['fun'] = crit_func.evaluate(x_, 'function')
+            checkpoint_['nit'] = state['nit']
+            checkpoint_['hess_inv'] = state['hess_inv']
+
+            msc.write_checkpoint(checkpoint_)
+
+            self.attr['checkpoint'] = checkpoint_
+
+            if callback is not None:
+                callback(x_)
+
+        # Finishing
+        return _callback
+
+    def _get_telemetry_callback(self, callback=None):
+        """ Construct the callback, which passes an event for each iteration
+            to the telemetry callbacks.
+        """
+        # Distribute class attributes
+        crit_func = self.get_attr('crit_func')
+        model_obj = self.get_attr('model_obj')
+
+        algorithm = model_obj.get_attr('algorithm')
+
+        # Count iterations
+        num_iter = [0]
+
+        def _callback(x):
+            x = np.array(x, ndmin=1)
+
+            num_iter[0] += 1
+
+            # Construct event
+            event = dict()
+            event['event'] = 'iteration'
+            event['nit'] = num_iter[0]
+            event['x'] = x.tolist()
+            event['fun'] = crit_func.evaluate(x, 'function')
+            event['grad_norm'] = None
+
+            if OPTIMIZERS[algorithm]['gradient']:
+                grad = crit_func.evaluate(x, 'gradient')
+                event['grad_norm'] = float(np.linalg.norm(grad))
+
+            crit_func.notify(event)
+
+            if callback is not None:
+                callback(x)
+
+        # Finishing
+        return _callback
+
+    @staticmethod
+    def _update_hess_inv(hess_inv, sk, yk):
+        """ Update the approximation of the inverse Hessian as in the BFGS
+            implementation of SCIPY.
+        """
+        # Auxiliary objects
+        identity = np.identity(len(sk))
+
+        rhok_inv = np.dot(yk, sk)
+
+        if rhok_inv == 0.0:
+            rhok = 1000.0
+        else:
+            rhok = 1.0 / rhok_inv
+
+        # Update
+        a1 = identity - rhok * np.outer(sk, yk)
+        a2 = identity - rhok * np.outer(yk, sk)
+
+        rslt = np.dot(a1, np.dot(hess_inv, a2)) + rhok * np.outer(sk, sk)
+
+        # Finishing
+        return rslt
+
+    @staticmethod
+    def _get_scale(hess_inv):
+        """ Get the scaling of the free parameters from the approximation of
+            the inverse Hessian. No scaling is applied if the approximation
+            is not positive definite.
+        """
+        # Antibugging
+        assert (isinstance(hess_inv, np.ndarray))
+
+        # Factorization
+        try:
+            scale = np.linalg.cholesky(hess_inv)
+        except np.linalg.LinAlgError:
+            scale = None
+
+        # Finishing
+        return scale
+
+
+class _HopelessStart(Exception):
+    """ Stop a start of a multistart maximization that falls behind.
+    """
+
+
+''' Private functions executed by the workers.
+'''
+
+
+def _initialize_worker(max_obj, best):
+    """ Attach the maximization object and the best criterion value to the
+        worker.
+    """
+    global _MAX_OBJ, _BEST
+
+    _MAX_OBJ, _BEST = max_obj, best
+
+    _MAX_OBJ._set_serial()
+
+
+def _run_start(x):
+    """ Perform a single start of a multistart maximization.
+    """
+    return _MAX_OBJ._start(x, _BEST)
@@ -0,0 +1,125 @@
+""" This module contains the pool of workers for the parallel evaluation of
+    the criterion function.
+"""
+# standard library
+import multiprocessing as mp
+
+# project library
+from grmpy.clsMeta import MetaCls
+from grmpy.clsModel import ModelCls
+from grmpy.clsParas import ParasCls
+from grmpy.tools.optimization.clsCrit import CritCls
+
+# module variables
+_CRIT_OBJ = None
+
+
+class PoolCls(MetaCls):
+    """ Persistent pool of workers. Each worker holds its own copy of the
+        model and parameter objects, which are passed only once at startup.
+    """
+
+    def __init__(self, model_obj, paras_obj):
+
+        # Antibugging
+        assert (isinstance(model_obj, ModelCls))
+        assert (isinstance(paras_obj, ParasCls))
+
+        assert (model_obj.get_status() is True)
+        assert (paras_obj.get_status() is True)
+
+        # Attributes
+        self.attr = dict()
+        self.attr['model_obj'] = model_obj
+        self.attr['paras_obj'] = paras_obj
+
+        self.attr['num_workers'] = model_obj.get_attr('workers')
+
+        # Constructed objects
+        self.attr['pool'] = None
+
+        # Status
+        self.is_locked = False
+
+    def map(self, blocks, precision='double'):
+        """ Evaluate the criterion function for each block of parameter values.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+        assert (isinstance(blocks, list))
+        assert (precision in ['double', 'single'])
+
+        # Distribute class attributes
+        pool = self.get_attr('pool')
+
+        # Evaluation, results are returned in the order of the blocks
+        tasks = [(block, precision) for block in blocks]
+
+        rslt = pool.map(_evaluate_block, tasks, chunksize=1)
+
+        # Finishing
+        return rslt
+
+    def terminate(self):
+        """ Shut down the pool of workers.
+        """
+        # Antibugging
+        assert (self.get_status() is True)
+
+        # Distribute class attributes
+        pool = self.get_attr('pool')
+
+        # Shutdown
+        pool.close()
+
+        pool.join()
+
+    def derived_attributes(self):
+        """ Start the pool of workers.
+        """
+        # Distribute class attributes
+        model_obj = self.attr['model_obj']
+        paras_obj = self.attr['paras_obj']
+        num_workers = self.attr['num_workers']
+
+        # Startup
+        self.attr['pool'] = mp.Pool(num_workers, _initialize_worker,
+                                    (model_obj, paras_obj))
+
+    def _check_integrity(self):
+        """ Check integrity of class instance.
+        """
+        # Number of workers
+        assert (isinstance(self.attr['num_workers'], int))
+        assert (self.attr['num_workers'] > 1)
+
+
+''' Private functions executed by the workers.
+'''
+
+
+def _initialize_worker(model_obj, paras_obj):
+    """ Construct the criterion function for the worker.
+    """
+    global _CRIT_OBJ
+
+    _CRIT_OBJ = CritCls(model_obj, paras_obj)
+
+    _CRIT_OBJ.lock()
+
+
+def _evaluate_block(task):
+    """ Evaluate a single block of parameter values at the requested
+        precision.
+    """
+    x, precision = task
+
+    if _CRIT_OBJ.get_attr('precision') != precision:
+
+        _CRIT_OBJ.unlock()
+
+        _CRIT_OBJ.set_attr('precision', precision)
+
+        _CRIT_OBJ.lock()
+
+    return _CRIT_OBJ.evaluate_block(x)
@@ -0,0 +1,144 @@
+""" This module contains the compiled evaluation of the criterion function. It
+    requires the optional NUMBA package, the criterion function falls back to
+    the fast version otherwise. The parallel kernel uses the threading layer
+    configured for NUMBA. With the TBB layer, the interpreter may not exit
+    once a pool of workers was forked, which is avoided by setting the
+    environment variable NUMBA_THREADING_LAYER to workqueue or omp.
+"""
+# standard library
+import math
+
+try:
+    import numba
+    from numba import prange
+except ImportError:
+    numba = None
+    prange = range
+
+# module variables
+SQRTH = math.sqrt(0.5)
+
+LOG_SQRT_TWO_PI = 0.5 * math.log(2.0 * math.pi)
+
+LOG_CLIP = math.log(1e-20)
+
+# Compiled kernels, which are only built on request
+_KERNELS = dict()
+
+
+def get_kernel(is_parallel):
+    """ Get the compiled kernel, which is built on the first request. The
+        parallel version splits the agents across threads. Without NUMBA, no
+        kernel is available.
+    """
+    # Check availability
+    if numba is None:
+        return None
+
+    # Compilation
+    if is_parallel not in _KERNELS.keys():
+        _KERNELS[is_parallel] = numba.njit(parallel=is_parallel)(
+            _evaluate_block)
+
+    # Finishing
+    return _KERNELS[is_parallel]
+
+
+def _ndtr(arg):
+    """ Cumulative distribution function of the standard normal distribution,
+        computed as in scipy.special.ndtr.
+    """
+    x = arg * SQRTH
+    z = abs(x)
+
+    if z < SQRTH:
+        return 0.5 + 0.5 * math.erf(x)
+
+    y = 0.5 * math.erfc(z)
+
+    if x > 0.0:
+        y = 1.0 - y
+
+    return y
+
+
+def _log_ndtr(arg):
+    """ Logarithm of the cumulative distribution function of the standard
+        normal distribution, computed as in scipy.special.log_ndtr. The
+        asymptotic series is used far in the lower tail.
+    """
+    if arg > 6.0:
+        return -_ndtr(-arg)
+
+    if arg > -20.0:
+        return math.log(_ndtr(arg))
+
+    log_lhs = -0.5 * arg ** 2 - math.log(-arg) - LOG_SQRT_TWO_PI
+
+    last_total, right_hand_side = 0.0, 1.0
+    numerator, denom_factor = 1.0, 1.0
+    denom_cons, sign, i = 1.0 / arg ** 2, 1.0, 0
+
+    while abs(last_total - right_hand_side) > 2.220446049250313e-16:
+        i += 1
+        last_total = right_hand_side
+        sign = -sign
+        denom_factor *= denom_cons
+        numerator *= 2 * i - 1
+        right_hand_side += sign * numerator * denom_factor
+
+    return log_lhs + math.log(right_hand_side)
+
+
+def _evaluate_block(y, x_ex_post, z, w, outc, coeffs_choc, sd, rho, sd_v,
+                    var_v, is_treated):
+    """ Weighted sum of the individual log-likelihood contributions for a
+        block of agents with the same treatment status. The contributions are
+        evaluated in log space in a single pass over the rows without any
+        intermediate arrays. They are clipped as in the fast version.
+    """
+    # Auxiliary objects
+    num_agents, num_covars_ex_post = x_ex_post.shape
+
+    num_covars_choice = z.shape[1]
+
+    scale = math.sqrt((1.0 - rho ** 2) * var_v)
+
+    sign = 1.0
+    if not is_treated:
+        sign = -1.0
+
+    log_sd = math.log(sd)
+
+    # Loop over agents
+    likl = 0.0
+
+    for i in prange(num_agents):
+
+        # Construct indices
+        choice_idx = 0.0
+        for j in range(num_covars_choice):
+            choice_idx += z[i, j] * coeffs_choc[j]
+
+        outc_idx = 0.0
+        for j in range(num_covars_ex_post):
+            outc_idx += x_ex_post[i, j] * outc[j]
+
+        # Calculate arguments
+        arg_one = (y[i] - outc_idx) / sd
+        arg_two = (choice_idx - sd_v * rho * arg_one) / scale
+
+        # Individual log-likelihood
+        contrib = -0.5 * arg_one ** 2 - LOG_SQRT_TWO_PI - log_sd + \
+            _log_ndtr(sign * arg_two)
+
+        likl += w[i] * max(contrib, LOG_CLIP)
+
+    # Finishing
+    return likl
+
+
+# Compilation of the auxiliary functions, which are called by the kernel
+if numba is not None:
+    _ndtr = numba.njit(_ndtr)
+    _log_ndtr = numba.njit(_log_ndtr)
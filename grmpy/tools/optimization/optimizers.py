@@ -0,0 +1,56 @@
+""" This module contains the registry of the optimization algorithms. Each
+    algorithm declares the evaluations of the criterion function it uses,
+    so the maximization provides the best available evaluator, and whether
+    it continues from an approximation of the inverse Hessian. Algorithms
+    with batch evaluations request the numerical gradient as a batch of
+    perturbed parameter values, which a pool of workers evaluates in
+    parallel. The Fortran code of L-BFGS-B writes its progress report
+    directly to the standard output of the process, so it is disabled.
+"""
+
+# module variables
+OPTIMIZERS = dict()
+
+OPTIMIZERS['bfgs'] = dict()
+OPTIMIZERS['bfgs']['method'] = 'BFGS'
+OPTIMIZERS['bfgs']['gradient'] = True
+OPTIMIZERS['bfgs']['hessian'] = False
+OPTIMIZERS['bfgs']['bounds'] = False
+OPTIMIZERS['bfgs']['batch'] = True
+OPTIMIZERS['bfgs']['warm_start'] = True
+OPTIMIZERS['bfgs']['hess_inv'] = True
+OPTIMIZERS['bfgs']['tol'] = ['gtol']
+OPTIMIZERS['bfgs']['disp'] = True
+
+OPTIMIZERS['lbfgsb'] = dict()
+OPTIMIZERS['lbfgsb']['method'] = 'L-BFGS-B'
+OPTIMIZERS['lbfgsb']['gradient'] = True
+OPTIMIZERS['lbfgsb']['hessian'] = False
+OPTIMIZERS['lbfgsb']['bounds'] = True
+OPTIMIZERS['lbfgsb']['batch'] = True
+OPTIMIZERS['lbfgsb']['warm_start'] = False
+OPTIMIZERS['lbfgsb']['hess_inv'] = True
+OPTIMIZERS['lbfgsb']['tol'] = ['gtol']
+OPTIMIZERS['lbfgsb']['disp'] = False
+
+OPTIMIZERS['trust-ncg'] = dict()
+OPTIMIZERS['trust-ncg']['method'] = 'trust-ncg'
+OPTIMIZERS['trust-ncg']['gradient'] = True
+OPTIMIZERS['trust-ncg']['hessian'] = True
+OPTIMIZERS['trust-ncg']['bounds'] = False
+OPTIMIZERS['trust-ncg']['batch'] = True
+OPTIMIZERS['trust-ncg']['warm_start'] = False
+OPTIMIZERS['trust-ncg']['hess_inv'] = False
+OPTIMIZERS['trust-ncg']['tol'] = ['gtol']
+OPTIMIZERS['trust-ncg']['disp'] = True
+
+OPTIMIZERS['powell'] = dict()
+OPTIMIZERS['powell']['method'] = 'Powell'
+OPTIMIZERS['powell']['gradient'] = False
+OPTIMIZERS['powell']['hessian'] = False
+OPTIMIZERS['powell']['bounds'] = False
+OPTIMIZERS['powell']['batch'] = False
+OPTIMIZERS['powell']['warm_start'] = False
+OPTIMIZERS['powell']['hess_inv'] = False
+OPTIMIZERS['powell']['tol'] = ['xtol', 'ftol']
+OPTIMIZERS['powell']['disp'] = True
@@ -44,3 +44,69 @@ def scipy_wrapper_function(x, crit_func):
 
     # Finishing
     return likl
+
+
+def scipy_wrapper_fused(x, crit_func):
+    """ Wrapper for the SCIPY maximization algorithms that request the
+        function value and the gradient in a single call.
+    """
+    # Antibugging
+    assert (isinstance(x, np.ndarray))
+    assert (np.all(np.isfinite(x)))
+    assert (x.dtype == 'float')
+    assert (x.ndim == 1)
+
+    # Evaluate likelihood and gradient
+    likl, grad = crit_func.evaluate_fused(x)
+
+    # Quality checks
+    assert (isinstance(likl, float))
+    assert (np.isfinite(likl))
+
+    assert (isinstance(grad, np.ndarray))
+    assert (np.all(np.isfinite(grad)))
+    assert (grad.dtype == 'float')
+
+    # Finishing
+    return likl, grad
+
+
+def scipy_wrapper_scaled(y, crit_func, shift, scale):
+    """ Wrapper for the SCIPY maximization algorithms that request the
+        function value and the gradient in a single call. The algorithm
+        works on the scaled values y of the free parameters, where
+        x = shift + scale y.
+    """
+    # Antibugging
+    assert (isinstance(y, np.ndarray))
+    assert (np.all(np.isfinite(y)))
+    assert (y.dtype == 'float')
+    assert (y.ndim == 1)
+
+    # Evaluate likelihood and gradient
+    likl, grad = scipy_wrapper_fused(shift + np.dot(scale, y), crit_func)
+
+    # Finishing
+    return likl, np.dot(scale.T, grad)
+
+
+def scipy_wrapper_hessp(x, p, crit_func):
+    """ Wrapper for the SCIPY maximization algorithms that request the
+        product of the Hessian with a direction.
+    """
+    # Antibugging
+    assert (isinstance(x, np.ndarray))
+    assert (np.all(np.isfinite(x)))
+    assert (x.dtype == 'float')
+    assert (x.ndim == 1)
+
+    # Evaluate product
+    hessp = crit_func.evaluate_hessp(x, p)
+
+    # Quality checks
+    assert (isinstance(hessp, np.ndarray))
+    assert (np.all(np.isfinite(hessp)))
+    assert (hessp.shape == x.shape)
+
+    # Finishing
+    return hessp
@@ -150,6 +150,14 @@ def _check_msc(init_dict):
         assert (len(obj.intersection(y)) == 0)
         assert (len(obj.intersection(d)) == 0)
 
+    ''' Check that the cluster identifiers are neither the outcome nor the
+        treatment.
+    '''
+    c = {init_dict['ESTIMATION']['cluster']}
+
+    assert (len(c.intersection(y)) == 0)
+    assert (len(c.intersection(d)) == 0)
+
     ''' Check that at least one regressor in choice, either ex ante benefit
         or cost shifters.
     '''
@@ -280,7 +288,7 @@ def _check_data(init_dict):
     assert (isinstance(init_dict, dict))
 
     # Check keys.
-    keys = {'source', 'agents', 'outcome', 'treatment'}
+    keys = {'source', 'agents', 'outcome', 'treatment', 'chunk', 'compress'}
 
     assert (keys == set(init_dict['DATA'].keys()))
 
@@ -289,13 +297,18 @@ def _check_data(init_dict):
     agents = init_dict['DATA']['agents']
     outcome = init_dict['DATA']['outcome']
     treatment = init_dict['DATA']['treatment']
+    chunk = init_dict['DATA']['chunk']
+    compress = init_dict['DATA']['compress']
 
     # Checks.
     assert (isinstance(source, str))
 
-    if agents is not None:
-        assert (isinstance(agents, int))
-        assert (agents > 0)
+    assert (compress in [True, False])
+
+    for obj in [agents, chunk]:
+        if obj is not None:
+            assert (isinstance(obj, int))
+            assert (obj > 0)
 
     for obj in [outcome, treatment]:
         assert (isinstance(obj, int))
@@ -343,7 +356,8 @@ def _check_estimation(init_dict):
 
     # Check keys.
     keys = {'algorithm', 'maxiter', 'start', 'gtol', 'epsilon', 'asymptotics',
-            'hessian', 'draws', 'alpha', 'differences', 'version'}
+            'hessian', 'draws', 'alpha', 'differences', 'version', 'workers',
+            'precision', 'cluster', 'stages', 'stage_tol', 'multistart'}
 
     assert (keys == set(init_dict['ESTIMATION'].keys()))
 
@@ -358,11 +372,17 @@ def _check_estimation(init_dict):
     draws = init_dict['ESTIMATION']['draws']
     alpha = init_dict['ESTIMATION']['alpha']
     differences = init_dict['ESTIMATION']['differences']
+    workers = init_dict['ESTIMATION']['workers']
+    multistart = init_dict['ESTIMATION']['multistart']
+    precision = init_dict['ESTIMATION']['precision']
+    cluster = init_dict['ESTIMATION']['cluster']
+    stages = init_dict['ESTIMATION']['stages']
+    stage_tol = init_dict['ESTIMATION']['stage_tol']
 
     # Checks
     assert (start in ['manual', 'auto'])
 
-    assert (algorithm in ['bfgs', 'powell'])
+    assert (algorithm in ['bfgs', 'lbfgsb', 'trust-ncg', 'powell'])
 
     if maxiter is not None:
         assert (isinstance(maxiter, int))
@@ -375,23 +395,38 @@ def _check_estimation(init_dict):
     for obj in [asymptotics]:
         assert (obj in [True, False])
 
-    assert (hessian in ['numdiff', 'bfgs'])
+    assert (hessian in ['numdiff', 'bfgs', 'opg'])
 
-    for obj in [draws]:
+    for obj in [draws, workers, multistart]:
         assert (isinstance(obj, int))
         assert (obj > 0)
 
     assert (isinstance(alpha, float))
     assert (0 < alpha < 1.00)
 
-    assert (differences in ['one-sided', 'two-sided'])
+    assert (differences in ['one-sided', 'two-sided', 'analytic'])
+
+    assert (precision in ['double', 'mixed'])
+
+    if cluster is not None:
+        assert (isinstance(cluster, int))
+        assert (cluster >= 0)
+
+    if stages is not None:
+        assert (isinstance(stages, list))
+        assert (len(stages) > 0)
+        assert (all(0.0 < stage < 1.0 for stage in stages))
+        assert (stages == sorted(stages))
+
+    assert (isinstance(stage_tol, float))
+    assert (stage_tol > 0)
 
     # Implications.
-    if algorithm == 'powell':
-        assert (hessian == 'numdiff')
+    if algorithm in ['trust-ncg', 'powell']:
+        assert (hessian in ['numdiff', 'opg'])
 
     if (maxiter == 0) and (asymptotics is True):
-        assert (hessian == 'numdiff')
+        assert (hessian in ['numdiff', 'opg'])
 
     # Finishing
     return True
@@ -3,6 +3,8 @@
 """
 
 # standard library
+from itertools import islice
+
 import numpy as np
 
 # project library
@@ -29,10 +31,24 @@ def construct_model(init_dict):
 
     num_covars_excl_cost = init_dict['DERIV']['excl_cost']['num']
 
+    chunk = init_dict['DATA']['chunk']
+
+    compress = init_dict['DATA']['compress']
+
     # Construct data array
-    dataset = _process_dataset(init_dict)
+    with msc.stage('process_dataset'):
+        if chunk is None:
+            dataset = _process_dataset(init_dict)
+        else:
+            dataset = _process_dataset_chunks(init_dict)
+
+    # Compression of duplicate agents
+    weights = None
 
-    rslt = msc.create_matrices(dataset, init_dict)
+    if compress:
+        dataset, weights = _compress_dataset(dataset, init_dict)
+
+    rslt = msc.create_matrices(dataset, init_dict, chunk)
 
     # Initialize model object
     model_obj = ModelCls()
@@ -49,6 +65,11 @@ def construct_model(init_dict):
 
     model_obj.set_attr('Z', rslt['Z'])
 
+    if init_dict['ESTIMATION']['cluster'] is not None:
+        model_obj.set_attr('C', rslt['C'])
+
+    model_obj.set_attr('W', weights)
+
     model_obj.set_attr('num_covars_excl_bene_ex_post',
                        num_covars_excl_bene_ex_post)
 
@@ -78,6 +99,18 @@ def construct_model(init_dict):
 
     model_obj.set_attr('alpha', init_dict['ESTIMATION']['alpha'])
 
+    model_obj.set_attr('workers', init_dict['ESTIMATION']['workers'])
+
+    model_obj.set_attr('multistart', init_dict['ESTIMATION']['multistart'])
+
+    model_obj.set_attr('precision', init_dict['ESTIMATION']['precision'])
+
+    model_obj.set_attr('chunk', chunk)
+
+    model_obj.set_attr('stages', init_dict['ESTIMATION']['stages'])
+
+    model_obj.set_attr('stage_tol', init_dict['ESTIMATION']['stage_tol'])
+
     model_obj.lock()
 
     # Finishing.
@@ -122,3 +155,94 @@ def _process_dataset(init_dict):
 
     # Finishing
     return dataset
+
+
+def _process_dataset_chunks(init_dict):
+    """ Processing of dataset in chunks of rows. The selected agents are
+        written to the binary store, so the full source is never held in
+        memory at once.
+    """
+    # Antibugging
+    assert (isinstance(init_dict, dict))
+
+    # Distribute initialization file
+    file_name = init_dict['DATA']['source']
+
+    num_obs = init_dict['DATA']['agents']
+
+    chunk = init_dict['DATA']['chunk']
+
+    all_pos = init_dict['DERIV']['pos']['all']
+
+    # Auxiliary function
+    def _read_chunks():
+        """ Read the source in chunks of rows and restrict to non-missing
+            agents of the subset.
+        """
+        num_selected = 0
+
+        with open(file_name, 'r') as file_:
+
+            while (num_obs is None) or (num_selected < num_obs):
+
+                lines = list(islice(file_, chunk))
+
+                if not lines:
+                    break
+
+                dataset = np.atleast_2d(np.genfromtxt(lines))
+
+                # Restrict to non-missing
+                is_valid = np.all(np.isfinite(dataset[:, all_pos]), axis=1)
+
+                dataset = dataset[is_valid, :]
+
+                # Subset selection
+                if num_obs is not None:
+                    dataset = dataset[:(num_obs - num_selected), :]
+
+                num_selected += dataset.shape[0]
+
+                yield {'dataset': dataset}
+
+    # Load source
+    dataset = msc.create_stores(_read_chunks())['dataset']
+
+    # Quality checks
+    assert (dataset.ndim == 2)
+
+    # Finishing
+    return dataset
+
+
+def _compress_dataset(dataset, init_dict):
+    """ Collapse agents with identical outcomes, treatment status and
+        covariates into a single row. The number of agents represented by
+        each row is returned as its frequency weight. The rows retain the
+        order of their first occurrence.
+    """
+    # Antibugging
+    assert (isinstance(init_dict, dict))
+    assert (dataset.ndim == 2)
+
+    # Distribute initialization file
+    all_pos = sorted(init_dict['DERIV']['pos']['all'])
+
+    # Identify duplicate agents
+    _, idx, counts = np.unique(dataset[:, all_pos], axis=0, return_index=True,
+                               return_counts=True)
+
+    order = np.argsort(idx)
+
+    idx, counts = idx[order], counts[order]
+
+    dataset = dataset[idx, :]
+
+    weights = counts.astype('float')
+
+    # Quality checks
+    assert (dataset.shape[0] == weights.shape[0])
+    assert (np.all(weights >= 1.0))
+
+    # Finishing
+    return dataset, weights
@@ -11,7 +11,8 @@ import numpy as np
 
 # project library.
 from grmpy.clsParas import ParasCls
-from grmpy.clsModel import ModelCls
+from grmpy.clsModel import ModelCls, PROBIT
+import grmpy.tools.msc as msc
 
 """ Main function.
 """
@@ -32,7 +33,8 @@ def construct_paras(init_dict, model_obj, is_simulation):
 
     # Update with automatic starting values
     if start == 'auto' and (not is_simulation):
-        paras_obj = _auto_start(paras_obj, model_obj)
+        with msc.stage('auto_start'):
+            paras_obj = _auto_start(paras_obj, model_obj)
 
     # Quality
     assert (paras_obj.get_status() is True)
@@ -267,8 +269,45 @@ def _auto_start(paras_obj, model_obj):
     """ Get automatic starting values.
     """
 
+    def _compute_starting_values_chunks(model_obj, which):
+        """ Get starting values in chunks of rows. The agents outside the
+            subset enter the regressions with a weight of zero.
+        """
+        # Data selection.
+        y = model_obj.get_attr('Y')
+        d = model_obj.get_attr('D')
+        x = model_obj.get_attr('X_ex_post')
+        g = model_obj.get_attr('G')
+        w = model_obj.get_attr('W')
+
+        chunk = model_obj.get_attr('chunk')
+
+        # Subset selection
+        if which == 'treated':
+            w = w * (d == 1)
+        elif which == 'untreated':
+            w = w * (d == 0)
+
+        # Model selection
+        if which in ['treated', 'untreated']:
+            coeffs = msc.fit_least_squares(x, y, w, chunk)
+            ssr = 0.0
+            for start in range(0, len(y), chunk):
+                resid = y[start:start + chunk] - \
+                    np.dot(x[start:start + chunk], coeffs)
+                ssr += np.sum(w[start:start + chunk] * resid ** 2)
+            sd = np.array(np.sqrt(ssr / (np.sum(w) - x.shape[1])))
+        else:
+            coeffs = -msc.fit_probit(d, g, w, chunk)
+            sd = np.array(1.0)
+
+        # Finishing.
+        return coeffs, sd
+
     def _compute_starting_values(model_obj, which):
-        """ Get starting values.
+        """ Get starting values. The regressions are weighted by the
+            frequency of the agents. The out-of-core data is processed in
+            chunks of rows.
         """
         # Antibugging
         assert (model_obj.get_status() is True)
@@ -279,26 +318,33 @@ def _auto_start(paras_obj, model_obj):
         d = model_obj.get_attr('D')
         x = model_obj.get_attr('X_ex_post')
         g = model_obj.get_attr('G')
+        w = model_obj.get_attr('W')
+
+        is_chunked = (model_obj.get_attr('chunk') is not None)
 
         # Subset selection 
-        if which == 'treated':
-            y = y[d == 1]
+        if which == 'treated' and (not is_chunked):
+            y, w = y[d == 1], w[d == 1]
             x = x[(d == 1), :]
 
-        elif which == 'untreated':
-            y = y[d == 0]
+        elif which == 'untreated' and (not is_chunked):
+            y, w = y[d == 0], w[d == 0]
             x = x[(d == 0), :]
 
         # Model selection
         coeffs, sd = None, None
-        if which in ['treated', 'untreated']:
-            ols_rslt = sm.OLS(y, x).fit()
+        if is_chunked:
+            coeffs, sd = _compute_starting_values_chunks(model_obj, which)
+        elif which in ['treated', 'untreated']:
+            ols_rslt = sm.WLS(y, x, weights=w).fit()
             coeffs = ols_rslt.params
-            sd = np.array(np.sqrt(ols_rslt.scale))
+            resid = y - np.dot(x, coeffs)
+            sd = np.array(np.sqrt(np.sum(w * resid ** 2) /
+                                  (np.sum(w) - x.shape[1])))
         elif which == 'cost':
             stdout_current = sys.stdout
             sys.stdout = open('/dev/null', 'w')
-            probit_rslt = sm.Probit(d, g).fit()
+            probit_rslt = sm.GLM(d, g, family=PROBIT, freq_weights=w).fit()
             coeffs = -probit_rslt.params
             sd = np.array(1.0)
             sys.stdout = stdout_current
@@ -14,6 +14,7 @@ import numpy as np
 from grmpy.tools.user.create_model import construct_model
 from grmpy.tools.user.create_paras import construct_paras
 from grmpy.tools.user.check_input import check_input
+import grmpy.tools.msc as msc
 
 ''' Main function.
 '''
@@ -27,7 +28,8 @@ def initialize(init_file, use_simulation=False, is_simulation=False):
     assert (os.path.exists(init_file))
 
     # Process initialization file
-    init_dict = process_input(init_file)
+    with msc.stage('process_input'):
+        init_dict = process_input(init_file)
 
     # Use SIMULATION info
     if use_simulation:
@@ -135,9 +137,14 @@ def _add_deriv(init_dict):
 
     g_pos = init_dict['COST']['coeffs']['pos']
 
+    c_pos = init_dict['ESTIMATION']['cluster']
+
     # Construct derived information
     all_ = list(set([y_pos] + [d_pos] + b_pos + g_pos))
 
+    if c_pos is not None:
+        all_ = list(set(all_ + [c_pos]))
+
     max_ = int(max(all_))
 
     # Collect
@@ -299,6 +306,8 @@ def _construct_dictionary():
     init_dict['BENE']['UNTREATED']['sd']['free'] = []
 
     init_dict['DATA'] = {}
+    init_dict['DATA']['chunk'] = None
+    init_dict['DATA']['compress'] = False
 
     init_dict['RHO'] = {}
     init_dict['RHO']['treated'] = {}
@@ -306,6 +315,14 @@ def _construct_dictionary():
 
     init_dict['ESTIMATION'] = {}
 
+    # Default values for optional keywords
+    init_dict['ESTIMATION']['workers'] = 1
+    init_dict['ESTIMATION']['multistart'] = 1
+    init_dict['ESTIMATION']['precision'] = 'double'
+    init_dict['ESTIMATION']['cluster'] = None
+    init_dict['ESTIMATION']['stages'] = None
+    init_dict['ESTIMATION']['stage_tol'] = 0.0001
+
     init_dict['SIMULATION'] = {}
 
     return init_dict
@@ -498,7 +515,7 @@ def _process_estimation(init_dict, current_line):
     flag = current_line[1]
 
     # Special treatments.
-    if keyword in ['gtol', 'epsilon']:
+    if keyword in ['gtol', 'epsilon', 'stage_tol']:
         flag = float(flag)
 
     if keyword == 'maxiter':
@@ -518,9 +535,21 @@ def _process_estimation(init_dict, current_line):
     if keyword == 'alpha':
         flag = float(flag)
 
-    if keyword in ['draws']:
+    if keyword in ['draws', 'workers', 'multistart']:
         flag = int(flag)
 
+    if keyword == 'cluster':
+        if flag.upper() == 'NONE':
+            flag = None
+        else:
+            flag = int(flag)
+
+    if keyword == 'stages':
+        if flag.upper() == 'NONE':
+            flag = None
+        else:
+            flag = [float(stage) for stage in flag.split(',')]
+
     # Construct dictionary.
     init_dict['ESTIMATION'][keyword] = flag
 
@@ -567,12 +596,16 @@ def _process_data(init_dict, current_line):
     if keyword in ['outcome', 'treatment']:
         flag = int(flag)
 
-    if keyword == 'agents':
+    if keyword in ['agents', 'chunk']:
         if flag.upper() == 'NONE':
             flag = None
         else:
             flag = int(flag)
 
+    if keyword in ['compress']:
+        assert (flag.upper() in ['TRUE', 'FALSE'])
+        flag = (flag.upper() == 'TRUE')
+
     # Construct dictionary
     init_dict['DATA'][keyword] = flag
 